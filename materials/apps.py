@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'materials'
+
+    def ready(self):
+        """Registriert die Signal-Handler für den materialisierten Bestand."""
+        from . import signals  # noqa: F401
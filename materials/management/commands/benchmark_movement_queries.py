@@ -0,0 +1,170 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.models import Workshop
+from materials.models import Delivery, Material, MaterialMovement
+from materials.stock import signed_quantity_expression
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark der häufigsten MaterialMovement-Abfragen mit und ohne '
+        'Indizes. Die Testdaten werden in einer Transaktion angelegt und '
+        'anschließend zurückgerollt.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--movements', type=int, default=100000,
+            help='Anzahl der anzulegenden Bewegungen (Standard: 100000)'
+        )
+        parser.add_argument(
+            '--materials', type=int, default=200,
+            help='Anzahl der Test-Materialien (Standard: 200)'
+        )
+        parser.add_argument(
+            '--workshops', type=int, default=3,
+            help='Anzahl der Test-Werkstätten (Standard: 3)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Wiederholungen je Abfrage (Standard: 20)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options)
+
+            with_indexes = self.run_queries(options['repeat'])
+            self.drop_indexes()
+            without_indexes = self.run_queries(options['repeat'])
+
+            self.report(with_indexes, without_indexes)
+            # Testdaten und entfernte Indizes zurückrollen
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        self.stdout.write(
+            f"Lege {options['movements']} Bewegungen an "
+            f"({connection.vendor}) ..."
+        )
+        self.workshops = [
+            Workshop.objects.create(name=f'Benchmark {i}')
+            for i in range(options['workshops'])
+        ]
+        self.materials = Material.objects.bulk_create([
+            Material(bezeichnung=f'Benchmark Material {i}')
+            for i in range(options['materials'])
+        ])
+        self.delivery_type = ContentType.objects.get_for_model(Delivery)
+
+        self.movement_count = options['movements']
+
+        # bulk_create umgeht bewusst die Bestandsbuchung (Signale),
+        # die Testdaten werden ohnehin zurückgerollt
+        now = timezone.now()
+        change_types = ['lieferung', 'verbrauch', 'korrektur', 'transfer']
+        batch = []
+        for i in range(options['movements']):
+            # Jede zweite Bewegung gehört zu einem "Beleg" mit ~20 Zeilen
+            linked = i % 2 == 0
+            batch.append(MaterialMovement(
+                workshop=random.choice(self.workshops),
+                material=random.choice(self.materials),
+                change_type=random.choice(change_types),
+                quantity=Decimal(random.randint(1, 20)),
+                content_type=self.delivery_type if linked else None,
+                object_id=i // 40 if linked else None,
+            ))
+            if len(batch) >= 5000:
+                MaterialMovement.objects.bulk_create(batch)
+                batch = []
+        MaterialMovement.objects.bulk_create(batch)
+
+        # created_at monatsweise über ein Jahr streuen
+        ids = list(MaterialMovement.objects.filter(
+            material__in=self.materials
+        ).order_by('id').values_list('id', flat=True))
+        chunk = max(1, len(ids) // 12)
+        for month, start in enumerate(range(0, len(ids), chunk)):
+            MaterialMovement.objects.filter(
+                id__gte=ids[start],
+                id__lte=ids[min(start + chunk, len(ids)) - 1]
+            ).update(created_at=now - timedelta(days=30 * (12 - month)))
+        self.as_of = now - timedelta(days=60)
+
+    def queries(self):
+        material = random.choice(self.materials)
+        workshop = random.choice(self.workshops)
+        return {
+            'Bestand (material, workshop)': lambda: (
+                MaterialMovement.objects.filter(
+                    material=material, workshop=workshop
+                ).aggregate(total=Sum(signed_quantity_expression()))
+            ),
+            'Historie (material, workshop, created_at)': lambda: list(
+                MaterialMovement.objects.filter(
+                    material=material, workshop=workshop
+                ).order_by('-created_at')[:50]
+            ),
+            'Verknüpfte Bewegungen (content_type, object_id)': lambda: list(
+                MaterialMovement.objects.filter(
+                    content_type=self.delivery_type,
+                    object_id=random.randrange(self.movement_count // 40 + 1)
+                )
+            ),
+            'Stichtag (workshop, created_at)': lambda: list(
+                MaterialMovement.objects.filter(
+                    workshop=workshop, created_at__gte=self.as_of
+                ).values('material_id').annotate(
+                    total=Sum(signed_quantity_expression())
+                )
+            ),
+        }
+
+    def run_queries(self, repeat):
+        timings = {}
+        for name in self.queries():
+            samples = []
+            for _ in range(repeat):
+                query = self.queries()[name]
+                started = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = statistics.median(samples)
+        return timings
+
+    def drop_indexes(self):
+        # SQL direkt ausführen: der SQLite-Schema-Editor lässt sich nicht
+        # innerhalb von transaction.atomic() betreten
+        editor = connection.schema_editor()
+        table = editor.quote_name(MaterialMovement._meta.db_table)
+        with connection.cursor() as cursor:
+            for index in MaterialMovement._meta.indexes:
+                cursor.execute(editor.sql_delete_index % {
+                    'table': table,
+                    'name': editor.quote_name(index.name),
+                })
+
+    def report(self, with_indexes, without_indexes):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'Abfrage':<50} {'ohne Index':>12} {'mit Index':>12} {'Faktor':>8}"
+        )
+        for name, indexed in with_indexes.items():
+            plain = without_indexes[name]
+            factor = plain / indexed if indexed else 0
+            self.stdout.write(
+                f"{name:<50} {plain:>10.2f}ms {indexed:>10.2f}ms "
+                f"{factor:>7.1f}x"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
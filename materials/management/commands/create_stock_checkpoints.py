@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from materials.stock import CHECKPOINT_INTERVALS, create_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Schreibt Bestands-Checkpoints je Werkstatt und Material an den '
+        'Periodengrenzen (z.B. Monatsanfang) für historische Abfragen'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            choices=CHECKPOINT_INTERVALS,
+            default=getattr(
+                settings, 'MATERIAL_STOCK_CHECKPOINT_INTERVAL', 'month'
+            ),
+            help='Abstand der Checkpoints (Standard: month)'
+        )
+        parser.add_argument(
+            '--workshop', type=int, action='append', dest='workshops',
+            help='Nur diese Werkstatt(en) berücksichtigen'
+        )
+
+    def handle(self, *args, **options):
+        count = create_checkpoints(
+            interval=options['interval'],
+            workshop_ids=options.get('workshops'),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} Checkpoint-Zeilen geschrieben.')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from materials.stock import rebuild_stock
+
+
+class Command(BaseCommand):
+    help = (
+        'Berechnet den materialisierten Bestand (MaterialStock) aus allen '
+        'Materialbewegungen neu'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workshop', type=int, help='Nur diese Werkstatt neu berechnen'
+        )
+        parser.add_argument(
+            '--material', type=int, help='Nur dieses Material neu berechnen'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_stock(
+            workshop_id=options.get('workshop'),
+            material_id=options.get('material'),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} Bestandszeilen neu berechnet.')
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_remove_duplicate_productmaterials'),
+        ('materials', '0025_add_material_url_to_orderitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_movement_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocks', to='materials.material')),
+                ('workshop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='material_stocks', to='core.workshop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('workshop', 'material'), name='unique_workshop_material_stock')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Case, DecimalField, F, Max, Sum, Value, When
+
+
+def backfill_material_stock(apps, schema_editor):
+    """Initialen Bestand je Werkstatt/Material aus allen Bewegungen berechnen"""
+    MaterialMovement = apps.get_model('materials', 'MaterialMovement')
+    MaterialStock = apps.get_model('materials', 'MaterialStock')
+
+    signed = Case(
+        When(
+            change_type__in=['lieferung', 'korrektur', 'transfer'],
+            then=F('quantity')
+        ),
+        When(change_type__in=['verbrauch', 'verlust'], then=-F('quantity')),
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    totals = MaterialMovement.objects.values(
+        'workshop_id', 'material_id'
+    ).annotate(total=Sum(signed), last_id=Max('id'))
+
+    MaterialStock.objects.bulk_create([
+        MaterialStock(
+            workshop_id=row['workshop_id'],
+            material_id=row['material_id'],
+            quantity=row['total'] or Decimal('0'),
+            last_movement_id=row['last_id'],
+        )
+        for row in totals
+    ])
+
+
+def clear_material_stock(apps, schema_editor):
+    MaterialStock = apps.get_model('materials', 'MaterialStock')
+    MaterialStock.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0026_materialstock'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_material_stock, clear_material_stock),
+    ]
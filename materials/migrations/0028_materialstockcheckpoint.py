@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_remove_duplicate_productmaterials'),
+        ('materials', '0027_backfill_materialstock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialStockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_movement_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='materials.material')),
+                ('workshop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='core.workshop')),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['workshop', 'taken_at'], name='materials_m_worksho_27dbb9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('workshop', 'material', 'taken_at'), name='unique_workshop_material_checkpoint')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0002_remove_duplicate_productmaterials'),
+        ('materials', '0028_materialstockcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='materialmovement',
+            index=models.Index(fields=['material', 'workshop', 'created_at'], name='matmove_mat_ws_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialmovement',
+            index=models.Index(fields=['content_type', 'object_id'], name='matmove_source_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialmovement',
+            index=models.Index(fields=['workshop', 'created_at'], name='matmove_ws_created_idx'),
+        ),
+    ]
@@ -2,7 +2,7 @@
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, transaction
 from core.models import Workshop
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -71,6 +71,102 @@ class MaterialMovement(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     source_object = GenericForeignKey('content_type', 'object_id')
 
+    class Meta:
+        indexes = [
+            # Bestandsberechnung und Bewegungshistorie je Material/Werkstatt
+            models.Index(
+                fields=['material', 'workshop', 'created_at'],
+                name='matmove_mat_ws_created_idx'
+            ),
+            # Verknüpfte Bewegungen einer Lieferung / eines Transfers
+            models.Index(
+                fields=['content_type', 'object_id'],
+                name='matmove_source_object_idx'
+            ),
+            # Stichtagsabfragen und Checkpoints je Werkstatt
+            models.Index(
+                fields=['workshop', 'created_at'],
+                name='matmove_ws_created_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Bewegung und Bestandsbuchung (MaterialStock) in einer Transaktion
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class MaterialStock(models.Model):
+    """
+    Materialisierter Bestand je Werkstatt und Material.
+
+    Wird bei jedem Anlegen, Ändern und Löschen einer MaterialMovement
+    in derselben Transaktion fortgeschrieben (siehe materials/signals.py),
+    damit Bestandsabfragen nicht die gesamte Bewegungshistorie summieren
+    müssen.
+    """
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='material_stocks'
+    )
+    material = models.ForeignKey(
+        Material, on_delete=models.CASCADE, related_name='stocks'
+    )
+    quantity = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0
+    )
+    last_movement_id = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workshop', 'material'],
+                name='unique_workshop_material_stock'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.workshop} – {self.material}: {self.quantity}"
+
+class MaterialStockCheckpoint(models.Model):
+    """
+    Bestand je Werkstatt und Material zu einem Stichtag.
+
+    ``quantity`` umfasst alle Bewegungen mit ``created_at`` vor
+    ``taken_at``. Checkpoints werden periodisch per Management-Command
+    (create_stock_checkpoints) geschrieben und dienen als Startpunkt für
+    historische Bestandsabfragen (``as_of``).
+    """
+    workshop = models.ForeignKey(
+        Workshop, on_delete=models.CASCADE, related_name='stock_checkpoints'
+    )
+    material = models.ForeignKey(
+        Material, on_delete=models.CASCADE, related_name='stock_checkpoints'
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    last_movement_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workshop', 'material', 'taken_at'],
+                name='unique_workshop_material_checkpoint'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['workshop', 'taken_at']),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.workshop} – {self.material} @ {self.taken_at:%Y-%m-%d}: "
+            f"{self.quantity}"
+        )
+
+
 class MaterialTransfer(models.Model):
     source_workshop = models.ForeignKey(Workshop, related_name='outgoing_transfers', on_delete=models.CASCADE)
     target_workshop = models.ForeignKey(Workshop, related_name='incoming_transfers', on_delete=models.CASCADE)
@@ -1,6 +1,5 @@
 # serializers.py (in materials)
 
-from decimal import Decimal
 from rest_framework import serializers
 
 from core.models import Workshop
@@ -17,9 +16,9 @@ from .models import (
     Supplier,
     MaterialSupplierPrice
 )
-from .validators import validate_stock_movement
+from .stock import batched_stock_updates, book_movements
+from .validators import get_material_stock, validate_stock_movements
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Sum
 
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -97,8 +96,7 @@ class MaterialMovementSerializer(serializers.ModelSerializer):
             material = self.context["material"]  # vom View übergeben (s. unten)
 
             # Aktuellen Bestand berechnen
-            bestand = MaterialMovement.objects.filter(workshop=workshop, material=material).aggregate(
-                total=Sum("quantity"))["total"] or Decimal("0.00")
+            bestand = get_material_stock(material.id, workshop.id)
 
             zielwert = validated_data["quantity"]
             differenz = zielwert - bestand
@@ -146,125 +144,119 @@ class MaterialTransferSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        
-        # Validiere alle Transfers BEVOR der Transfer erstellt wird
-        for item_data in items_data:
-            material = item_data['material']
-            quantity = item_data['quantity']
-            
-            # Prüfe ob genug Material in der Quellwerkstatt vorhanden ist
-            is_valid, current_stock, message = validate_stock_movement(
-                material.id,
-                validated_data['source_workshop'].id,
-                -quantity  # Negativ, weil Abgang
-            )
-            
-            if not is_valid:
-                raise serializers.ValidationError({
-                    'items': f"Material '{material.bezeichnung}' in "
-                    f"'{validated_data['source_workshop'].name}': {message}"
-                })
-        
-        # Alle Validierungen erfolgreich - Transfer erstellen
-        transfer = MaterialTransfer.objects.create(**validated_data)
-        for item_data in items_data:
-            MaterialTransferItem.objects.create(transfer=transfer, **item_data)
 
-            # Jetzt MaterialMovements erzeugen (Verbrauch + Lieferung)
-            material = item_data['material']
-            quantity = item_data['quantity']
-            note = item_data.get('note', '')
+        with batched_stock_updates():
+            # Validiere alle Transfers BEVOR der Transfer erstellt wird
+            self._validate_stock(validated_data['source_workshop'], items_data)
 
-            # Verbrauch im Quell-Workshop (change_type = 'transfer')
-            MaterialMovement.objects.create(
-                workshop=transfer.source_workshop,
-                material=material,
-                change_type='transfer',
-                quantity=-quantity,  # <<< Abgang = negatives Lager
-                note=f"Transfer #{transfer.id} - {note}",
-                content_type=ContentType.objects.get_for_model(transfer),
-                object_id=transfer.id
-            )
-
-            # Zugang im Ziel-Workshop (change_type = 'transfer')
-            MaterialMovement.objects.create(
-                workshop=transfer.target_workshop,
-                material=material,
-                change_type='transfer',
-                quantity=quantity,  # <<< Zugang = positives Lager
-                note=f"Transfer #{transfer.id} - {note}",
-                content_type=ContentType.objects.get_for_model(transfer),
-                object_id=transfer.id
-            )
+            # Alle Validierungen erfolgreich - Transfer erstellen
+            transfer = MaterialTransfer.objects.create(**validated_data)
+            self._create_items_and_movements(transfer, items_data)
         return transfer
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', [])
 
-        # Validiere alle Transfers BEVOR die Bewegungen erstellt werden
-        for item_data in items_data:
-            material = item_data['material']
-            quantity = item_data['quantity']
-            
-            # Prüfe ob genug Material in der Quellwerkstatt vorhanden ist
-            # Berücksichtige dabei die alten Bewegungen, die gelöscht werden
-            is_valid, current_stock, message = validate_stock_movement(
-                material.id,
-                validated_data.get('source_workshop', instance.source_workshop).id,
-                -quantity  # Negativ, weil Abgang
+        with batched_stock_updates():
+            # Validiere alle Transfers BEVOR die Bewegungen erstellt werden
+            self._validate_stock(
+                validated_data.get('source_workshop', instance.source_workshop),
+                items_data
             )
-            
-            if not is_valid:
-                raise serializers.ValidationError({
-                    'items': f"Material '{material.bezeichnung}': {message}"
-                })
-
-        # Update Basisdaten
-        instance.source_workshop = validated_data.get(
-            'source_workshop', instance.source_workshop
-        )
-        instance.target_workshop = validated_data.get(
-            'target_workshop', instance.target_workshop
+
+            # Update Basisdaten
+            instance.source_workshop = validated_data.get(
+                'source_workshop', instance.source_workshop
+            )
+            instance.target_workshop = validated_data.get(
+                'target_workshop', instance.target_workshop
+            )
+            instance.note = validated_data.get('note', instance.note)
+            instance.save()
+
+            # Bisherige Items und zugehörige Bewegungen löschen
+            instance.items.all().delete()
+            MaterialMovement.objects.filter(
+                content_type=ContentType.objects.get_for_model(MaterialTransfer),
+                object_id=instance.id
+            ).delete()
+
+            # Neue Items und Bewegungen anlegen
+            self._create_items_and_movements(instance, items_data)
+
+        return instance
+
+    def _validate_stock(self, source_workshop, items_data):
+        """
+        Prüft, ob die Quellwerkstatt alle Positionen zusammen abgeben kann.
+
+        Sperrt die betroffenen Bestände bis zum Ende der Transaktion und
+        meldet alle Materialien mit zu wenig Bestand gemeinsam.
+        """
+        violations = validate_stock_movements(
+            source_workshop.id,
+            [
+                (item_data['material'].id, -item_data['quantity'])  # Abgang
+                for item_data in items_data
+            ]
         )
-        instance.note = validated_data.get('note', instance.note)
-        instance.save()
+        if not violations:
+            return
 
-        # Bisherige Items und zugehörige Bewegungen löschen
-        instance.items.all().delete()
-        MaterialMovement.objects.filter(
-            content_type=ContentType.objects.get_for_model(MaterialTransfer),
-            object_id=instance.id
-        ).delete()
+        materials = {
+            item_data['material'].id: item_data['material']
+            for item_data in items_data
+        }
+        raise serializers.ValidationError({
+            'items': [
+                f"Material '{materials[material_id].bezeichnung}' in "
+                f"'{source_workshop.name}': {message}"
+                for material_id, (_, message) in violations.items()
+            ]
+        })
+
+    def _create_items_and_movements(self, transfer, items_data):
+        """
+        Legt Items und Bewegungen (Abgang + Zugang) per bulk_create an.
 
-        # Neue Items und Bewegungen anlegen
-        for item_data in items_data:
-            MaterialTransferItem.objects.create(transfer=instance, **item_data)
+        Muss innerhalb von batched_stock_updates() aufgerufen werden.
+        """
+        content_type = ContentType.objects.get_for_model(MaterialTransfer)
 
+        MaterialTransferItem.objects.bulk_create([
+            MaterialTransferItem(transfer=transfer, **item_data)
+            for item_data in items_data
+        ])
+
+        movements = []
+        for item_data in items_data:
             material = item_data['material']
             quantity = item_data['quantity']
-            note = item_data.get('note', '')
+            note = f"Transfer #{transfer.id} - {item_data.get('note', '')}"
 
-            MaterialMovement.objects.create(
-                workshop=instance.source_workshop,
+            # Abgang im Quell-Workshop (change_type = 'transfer')
+            movements.append(MaterialMovement(
+                workshop=transfer.source_workshop,
                 material=material,
                 change_type='transfer',
-                quantity=-quantity,
-                note=f"Transfer #{instance.id} - {note}",
-                content_type=ContentType.objects.get_for_model(instance),
-                object_id=instance.id
-            )
+                quantity=-quantity,  # <<< Abgang = negatives Lager
+                note=note,
+                content_type=content_type,
+                object_id=transfer.id
+            ))
 
-            MaterialMovement.objects.create(
-                workshop=instance.target_workshop,
+            # Zugang im Ziel-Workshop (change_type = 'transfer')
+            movements.append(MaterialMovement(
+                workshop=transfer.target_workshop,
                 material=material,
                 change_type='transfer',
-                quantity=quantity,
-                note=f"Transfer #{instance.id} - {note}",
-                content_type=ContentType.objects.get_for_model(instance),
-                object_id=instance.id
-            )
+                quantity=quantity,  # <<< Zugang = positives Lager
+                note=note,
+                content_type=content_type,
+                object_id=transfer.id
+            ))
 
-        return instance
+        book_movements(MaterialMovement.objects.bulk_create(movements))
 
 class DeliveryItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -300,76 +292,77 @@ class DeliverySerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        delivery = Delivery.objects.create(**validated_data)
-        
-        # Check if this delivery is historical OR linked to a historical order
-        is_historical = (
-            delivery.is_historical or
-            (delivery.order and delivery.order.is_historical)
-        )
-        
-        for item_data in items_data:
-            DeliveryItem.objects.create(delivery=delivery, **item_data)
-
-            # Only create MaterialMovement if not historical
-            if not is_historical:
-                MaterialMovement.objects.create(
-                    workshop=delivery.workshop,
-                    material=item_data['material'],
-                    change_type='lieferung',
-                    quantity=item_data['quantity'],
-                    note=f"Lieferung #{delivery.id} - {item_data.get('note', '')}",
-                    content_type=ContentType.objects.get_for_model(delivery),
-                    object_id=delivery.id
-                )
+
+        with batched_stock_updates():
+            delivery = Delivery.objects.create(**validated_data)
+            self._create_items_and_movements(delivery, items_data)
 
         return delivery
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', [])
 
-        instance.note = validated_data.get('note', instance.note)
-        instance.workshop = validated_data.get('workshop', instance.workshop)
-        instance.order = validated_data.get('order', instance.order)
-        instance.is_historical = validated_data.get(
-            'is_historical', instance.is_historical
-        )
-        instance.save()
-
-        # Check if this delivery is historical OR linked to a historical order
-        is_historical = (
-            instance.is_historical or
-            (instance.order and instance.order.is_historical)
-        )
+        with batched_stock_updates():
+            instance.note = validated_data.get('note', instance.note)
+            instance.workshop = validated_data.get(
+                'workshop', instance.workshop
+            )
+            instance.order = validated_data.get('order', instance.order)
+            instance.is_historical = validated_data.get(
+                'is_historical', instance.is_historical
+            )
+            instance.save()
 
-        # Alte Items und zugehörige Bewegungen löschen
-        instance.items.all().delete()
-        MaterialMovement.objects.filter(
-            content_type=ContentType.objects.get_for_model(Delivery),
-            object_id=instance.id
-        ).delete()
+            # Alte Items und zugehörige Bewegungen löschen
+            instance.items.all().delete()
+            MaterialMovement.objects.filter(
+                content_type=ContentType.objects.get_for_model(Delivery),
+                object_id=instance.id
+            ).delete()
 
-        # Neue Items und Bewegungen anlegen
-        for item_data in items_data:
-            DeliveryItem.objects.create(delivery=instance, **item_data)
-
-            # Only create MaterialMovement if not historical
-            if not is_historical:
-                MaterialMovement.objects.create(
-                    workshop=instance.workshop,
-                    material=item_data['material'],
-                    change_type='lieferung',
-                    quantity=item_data['quantity'],
-                    note=(
-                        f"Lieferung #{instance.id} - "
-                        f"{item_data.get('note', '')}"
-                    ),
-                    content_type=ContentType.objects.get_for_model(instance),
-                    object_id=instance.id
-                )
+            # Neue Items und Bewegungen anlegen
+            self._create_items_and_movements(instance, items_data)
 
         return instance
 
+    def _create_items_and_movements(self, delivery, items_data):
+        """
+        Legt Items und Lieferbewegungen per bulk_create an.
+
+        Muss innerhalb von batched_stock_updates() aufgerufen werden.
+        """
+        DeliveryItem.objects.bulk_create([
+            DeliveryItem(delivery=delivery, **item_data)
+            for item_data in items_data
+        ])
+
+        # Check if this delivery is historical OR linked to a historical order
+        is_historical = (
+            delivery.is_historical or
+            (delivery.order and delivery.order.is_historical)
+        )
+        # Only create MaterialMovements if not historical
+        if is_historical:
+            return
+
+        content_type = ContentType.objects.get_for_model(Delivery)
+        movements = MaterialMovement.objects.bulk_create([
+            MaterialMovement(
+                workshop=delivery.workshop,
+                material=item_data['material'],
+                change_type='lieferung',
+                quantity=item_data['quantity'],
+                note=(
+                    f"Lieferung #{delivery.id} - "
+                    f"{item_data.get('note', '')}"
+                ),
+                content_type=content_type,
+                object_id=delivery.id
+            )
+            for item_data in items_data
+        ])
+        book_movements(movements)
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     # material_url kann eingegeben oder aus MaterialSupplierPrice geladen
@@ -0,0 +1,64 @@
+# materials/signals.py
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import MaterialMovement
+from .stock import apply_stock_delta, invalidate_checkpoints, signed_quantity
+
+
+@receiver(pre_save, sender=MaterialMovement)
+def remember_previous_movement(sender, instance, raw=False, **kwargs):
+    """Merkt sich den gespeicherten Stand einer Bewegung vor dem Update."""
+    instance._stock_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._stock_previous = sender.objects.filter(
+        pk=instance.pk
+    ).values(
+        'workshop_id', 'material_id', 'change_type', 'quantity', 'created_at'
+    ).first()
+
+
+@receiver(post_save, sender=MaterialMovement)
+def book_movement_into_stock(sender, instance, created, raw=False, **kwargs):
+    """Schreibt die Bewegung in den materialisierten Bestand fort."""
+    if raw:
+        return
+
+    previous = getattr(instance, '_stock_previous', None)
+    if previous:
+        apply_stock_delta(
+            previous['workshop_id'],
+            previous['material_id'],
+            -signed_quantity(previous['change_type'], previous['quantity']),
+        )
+        # Nachträgliche Änderung: betroffene Checkpoints verwerfen
+        invalidate_checkpoints(previous['workshop_id'], previous['created_at'])
+        if previous['workshop_id'] != instance.workshop_id:
+            invalidate_checkpoints(instance.workshop_id, previous['created_at'])
+
+    apply_stock_delta(
+        instance.workshop_id,
+        instance.material_id,
+        signed_quantity(instance.change_type, instance.quantity),
+        movement_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=MaterialMovement)
+def remove_movement_from_stock(sender, instance, origin=None, **kwargs):
+    """Bucht eine gelöschte Bewegung aus dem Bestand aus."""
+    apply_stock_delta(
+        instance.workshop_id,
+        instance.material_id,
+        -signed_quantity(instance.change_type, instance.quantity),
+        create=False,
+    )
+
+    # Beim kaskadierenden Löschen von Material/Werkstatt werden deren
+    # Checkpoints mitgelöscht – nur direkte Löschungen invalidieren.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is sender:
+        invalidate_checkpoints(instance.workshop_id, instance.created_at)
@@ -0,0 +1,497 @@
+# materials/stock.py
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import (
+    Case, DecimalField, F, Max, Min, OuterRef, PositiveIntegerField, Q,
+    Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+
+# Vorzeichenregeln der Bestandsberechnung je change_type
+STOCK_INCREASING_TYPES = ('lieferung', 'korrektur', 'transfer')
+STOCK_DECREASING_TYPES = ('verbrauch', 'verlust')
+
+
+def signed_quantity(change_type, quantity):
+    """
+    Liefert den Bestandseffekt einer Bewegung.
+
+    Lieferung, Korrektur und Transfer zählen mit ihrem Vorzeichen,
+    Verbrauch und Verlust werden abgezogen, alle übrigen Typen
+    (z.B. Inventur) wirken sich nicht auf den Bestand aus.
+    """
+    quantity = Decimal(str(quantity))
+    if change_type in STOCK_INCREASING_TYPES:
+        return quantity
+    if change_type in STOCK_DECREASING_TYPES:
+        return -quantity
+    return Decimal('0')
+
+
+def signed_quantity_expression(prefix=''):
+    """
+    ORM-Ausdruck für signed_quantity(), z.B. für Sum()-Aggregate.
+
+    Args:
+        prefix: Optionaler Lookup-Pfad zur MaterialMovement
+            (z.B. 'materialmovement__')
+    """
+    quantity = F(f'{prefix}quantity')
+    return Case(
+        When(
+            **{f'{prefix}change_type__in': STOCK_INCREASING_TYPES},
+            then=quantity
+        ),
+        When(
+            **{f'{prefix}change_type__in': STOCK_DECREASING_TYPES},
+            then=-quantity
+        ),
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+# Gesammelte Bestandsänderungen innerhalb von batched_stock_updates()
+_pending = threading.local()
+
+
+def apply_stock_delta(workshop_id, material_id, delta, movement_id=None,
+                      create=True):
+    """
+    Schreibt eine Bestandsänderung in die MaterialStock-Tabelle fort.
+
+    Die Änderung erfolgt als F()-Inkrement, damit parallele Buchungen
+    keine Updates verlieren. Innerhalb von batched_stock_updates() wird
+    die Änderung nur vorgemerkt und am Ende gebündelt geschrieben.
+
+    Args:
+        workshop_id: ID der Werkstatt
+        material_id: ID des Materials
+        delta: Bestandsänderung (signed)
+        movement_id: ID der auslösenden Bewegung (optional)
+        create: Fehlende Bestandszeile anlegen (False beim Löschen,
+            damit kaskadierende Deletes keine neuen Zeilen erzeugen)
+    """
+    pending = getattr(_pending, 'deltas', None)
+    if pending is not None:
+        key = (int(workshop_id), int(material_id))
+        total, last_id, creates = pending.get(key, (Decimal('0'), None, False))
+        if movement_id is not None:
+            last_id = max(last_id or 0, movement_id)
+        pending[key] = (total + delta, last_id, creates or create)
+        return
+
+    _write_stock_deltas({
+        (workshop_id, material_id): (delta, movement_id, create)
+    })
+
+
+def book_movements(movements):
+    """
+    Bucht per bulk_create angelegte Bewegungen in den Bestand.
+
+    bulk_create() löst keine Signale aus – Aufrufer müssen die neuen
+    Bewegungen deshalb explizit hierüber fortschreiben.
+    """
+    for movement in movements:
+        apply_stock_delta(
+            movement.workshop_id,
+            movement.material_id,
+            signed_quantity(movement.change_type, movement.quantity),
+            movement_id=movement.pk,
+        )
+
+
+@contextmanager
+def batched_stock_updates():
+    """
+    Bündelt Bestandsänderungen in einer Transaktion.
+
+    Alle Bewegungen, die innerhalb des Blocks angelegt, geändert oder
+    gelöscht werden, werden je Werkstatt/Material aufsummiert und am Ende
+    mit einem INSERT und einem UPDATE in MaterialStock geschrieben.
+    Verschachtelte Aufrufe schreiben erst beim äußersten Block.
+    """
+    if getattr(_pending, 'deltas', None) is not None:
+        yield
+        return
+
+    _pending.deltas = {}
+    _pending.invalidations = {}
+    try:
+        with transaction.atomic():
+            yield
+            deltas, _pending.deltas = _pending.deltas, None
+            invalidations, _pending.invalidations = _pending.invalidations, None
+            _write_stock_deltas(deltas)
+            for workshop_id, since in invalidations.items():
+                invalidate_checkpoints(workshop_id, since)
+    finally:
+        _pending.deltas = None
+        _pending.invalidations = None
+
+
+def _write_stock_deltas(deltas):
+    """Schreibt {(workshop_id, material_id): (delta, last_id, create)}."""
+    from materials.models import MaterialStock
+
+    deltas = {
+        key: value for key, value in deltas.items()
+        if value[0] != 0 or value[1] is not None
+    }
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        updated = _update_stock_rows(deltas)
+        if updated == len(deltas):
+            return
+
+        # Fehlende Bestandszeilen anlegen und nur diese nachbuchen
+        existing = set(
+            MaterialStock.objects.filter(_stock_rows(deltas)).values_list(
+                'workshop_id', 'material_id'
+            )
+        )
+        missing = {
+            key: value for key, value in deltas.items()
+            if value[2] and key not in existing
+        }
+        if missing:
+            MaterialStock.objects.bulk_create([
+                MaterialStock(workshop_id=workshop_id, material_id=material_id)
+                for workshop_id, material_id in missing
+            ], ignore_conflicts=True)
+            _update_stock_rows(missing)
+
+
+def _stock_rows(deltas):
+    rows = Q()
+    for workshop_id, material_id in deltas:
+        rows |= Q(workshop_id=workshop_id, material_id=material_id)
+    return rows
+
+
+def _update_stock_rows(deltas):
+    """Ein UPDATE für alle Bestandszeilen, liefert die Anzahl der Zeilen."""
+    from materials.models import MaterialStock
+
+    quantity_cases = []
+    last_id_cases = []
+    for (workshop_id, material_id), (delta, last_id, _) in deltas.items():
+        match = Q(workshop_id=workshop_id, material_id=material_id)
+        quantity_cases.append(When(match, then=Value(delta)))
+        if last_id is not None:
+            last_id_cases.append(When(match, then=Value(last_id)))
+
+    updates = {
+        'quantity': F('quantity') + Case(
+            *quantity_cases,
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        'updated_at': timezone.now(),
+    }
+    if last_id_cases:
+        updates['last_movement_id'] = Case(
+            *last_id_cases,
+            default=F('last_movement_id'),
+            output_field=PositiveIntegerField(),
+        )
+    return MaterialStock.objects.filter(_stock_rows(deltas)).update(**updates)
+
+
+def get_stock(material_id, workshop_id):
+    """
+    Liest den aktuellen Bestand aus der MaterialStock-Tabelle.
+
+    Returns:
+        Decimal: Aktueller Bestand (0, falls noch keine Bewegung existiert)
+    """
+    from materials.models import MaterialStock
+
+    quantity = MaterialStock.objects.filter(
+        material_id=material_id,
+        workshop_id=workshop_id
+    ).values_list('quantity', flat=True).first()
+
+    return quantity if quantity is not None else Decimal('0')
+
+
+def get_stock_map(workshop_id, material_ids=None, for_update=False):
+    """
+    Liest die Bestände mehrerer Materialien einer Werkstatt in einer Abfrage.
+
+    Args:
+        for_update: Bestandszeilen per select_for_update bis zum Ende der
+            Transaktion sperren (nur innerhalb von transaction.atomic())
+
+    Returns:
+        dict: {material_id: Decimal} – fehlende Materialien haben Bestand 0
+    """
+    from materials.models import MaterialStock
+
+    stocks = MaterialStock.objects.filter(workshop_id=workshop_id)
+    if material_ids is not None:
+        stocks = stocks.filter(material_id__in=list(material_ids))
+    if for_update:
+        # Feste Sperrreihenfolge verhindert Deadlocks paralleler Buchungen
+        stocks = stocks.select_for_update().order_by('material_id')
+
+    return dict(stocks.values_list('material_id', 'quantity'))
+
+
+def annotate_current_stock(materials_queryset, workshop_id):
+    """
+    Annotiert ``current_stock`` je Material einer Werkstatt.
+
+    Der Bestand wird als korrelierte Subquery auf MaterialStock in die
+    Material-Abfrage eingebettet, sodass die gesamte Liste inklusive
+    Beständen mit einer Abfrage geladen wird.
+    """
+    from materials.models import MaterialStock
+
+    stock = MaterialStock.objects.filter(
+        workshop_id=workshop_id,
+        material_id=OuterRef('pk')
+    ).values('quantity')[:1]
+
+    return materials_queryset.annotate(
+        current_stock=Coalesce(
+            Subquery(stock),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+def rebuild_stock(workshop_id=None, material_id=None):
+    """
+    Baut die MaterialStock-Tabelle aus der Bewegungshistorie neu auf.
+
+    Dient als Reparatur, falls Bewegungen am ORM vorbei (z.B. per
+    QuerySet.update() oder SQL) geändert wurden.
+
+    Returns:
+        int: Anzahl der geschriebenen Bestandszeilen
+    """
+    from materials.models import MaterialMovement, MaterialStock
+
+    movements = MaterialMovement.objects.all()
+    stocks = MaterialStock.objects.all()
+    if workshop_id is not None:
+        movements = movements.filter(workshop_id=workshop_id)
+        stocks = stocks.filter(workshop_id=workshop_id)
+    if material_id is not None:
+        movements = movements.filter(material_id=material_id)
+        stocks = stocks.filter(material_id=material_id)
+
+    totals = movements.values('workshop_id', 'material_id').annotate(
+        total=Sum(signed_quantity_expression()),
+        last_id=Max('id'),
+    )
+
+    with transaction.atomic():
+        stocks.delete()
+        MaterialStock.objects.bulk_create([
+            MaterialStock(
+                workshop_id=row['workshop_id'],
+                material_id=row['material_id'],
+                quantity=row['total'] or Decimal('0'),
+                last_movement_id=row['last_id'],
+            )
+            for row in totals
+        ])
+
+    return len(totals)
+
+
+# ============================================================================
+# HISTORISCHE BESTÄNDE (CHECKPOINTS)
+# ============================================================================
+
+CHECKPOINT_INTERVALS = ('day', 'week', 'month')
+
+
+def checkpoint_boundaries(start, end, interval='month'):
+    """
+    Liefert die Periodengrenzen (00:00 Uhr) zwischen ``start`` und ``end``.
+
+    Die erste Grenze liegt nach ``start``, die letzte nicht nach ``end``.
+    """
+    if interval not in CHECKPOINT_INTERVALS:
+        raise ValueError(f"Unbekanntes Intervall: {interval}")
+
+    day = timezone.localtime(start).date()
+    if interval == 'month':
+        boundary = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    elif interval == 'week':
+        boundary = day + timedelta(days=7 - day.weekday())
+    else:
+        boundary = day + timedelta(days=1)
+
+    boundaries = []
+    while True:
+        moment = timezone.make_aware(
+            datetime.combine(boundary, datetime.min.time())
+        )
+        if moment > end:
+            return boundaries
+        boundaries.append(moment)
+        if interval == 'month':
+            boundary = (boundary + timedelta(days=32)).replace(day=1)
+        elif interval == 'week':
+            boundary += timedelta(days=7)
+        else:
+            boundary += timedelta(days=1)
+
+
+def create_checkpoints(interval='month', workshop_ids=None, until=None):
+    """
+    Schreibt fehlende Bestands-Checkpoints je Werkstatt.
+
+    Ausgehend vom letzten vorhandenen Checkpoint (bzw. der ersten
+    Bewegung) wird für jede Periodengrenze bis ``until`` der Bestand
+    fortgeschrieben – pro Grenze wird nur das Bewegungsdelta der Periode
+    aggregiert.
+
+    Returns:
+        int: Anzahl der geschriebenen Checkpoint-Zeilen
+    """
+    from core.models import Workshop
+    from materials.models import MaterialMovement, MaterialStockCheckpoint
+
+    until = until or timezone.now()
+    workshops = Workshop.objects.all()
+    if workshop_ids is not None:
+        workshops = workshops.filter(id__in=list(workshop_ids))
+
+    written = 0
+    for workshop_id in workshops.values_list('id', flat=True):
+        movements = MaterialMovement.objects.filter(workshop_id=workshop_id)
+        checkpoints = MaterialStockCheckpoint.objects.filter(
+            workshop_id=workshop_id
+        )
+
+        last_taken_at = checkpoints.aggregate(
+            latest=Max('taken_at')
+        )['latest']
+        if last_taken_at:
+            start = last_taken_at
+            balances = dict(
+                checkpoints.filter(taken_at=last_taken_at).values_list(
+                    'material_id', 'quantity'
+                )
+            )
+            last_ids = dict(
+                checkpoints.filter(taken_at=last_taken_at).values_list(
+                    'material_id', 'last_movement_id'
+                )
+            )
+        else:
+            start = movements.aggregate(first=Min('created_at'))['first']
+            balances, last_ids = {}, {}
+        if start is None:
+            continue
+
+        previous = last_taken_at
+        for boundary in checkpoint_boundaries(start, until, interval):
+            delta = movements.filter(created_at__lt=boundary)
+            if previous is not None:
+                delta = delta.filter(created_at__gte=previous)
+            for row in delta.values('material_id').annotate(
+                total=Sum(signed_quantity_expression()), last_id=Max('id')
+            ):
+                material_id = row['material_id']
+                balances[material_id] = (
+                    balances.get(material_id, Decimal('0')) + row['total']
+                )
+                last_ids[material_id] = row['last_id']
+
+            MaterialStockCheckpoint.objects.bulk_create([
+                MaterialStockCheckpoint(
+                    workshop_id=workshop_id,
+                    material_id=material_id,
+                    taken_at=boundary,
+                    quantity=quantity,
+                    last_movement_id=last_ids.get(material_id),
+                )
+                for material_id, quantity in balances.items()
+            ])
+            written += len(balances)
+            previous = boundary
+
+    return written
+
+
+def invalidate_checkpoints(workshop_id, since):
+    """
+    Verwirft Checkpoints, die eine nachträglich geänderte Bewegung enthalten.
+
+    Gelöscht werden ganze Stichtage einer Werkstatt, damit ein vorhandener
+    Checkpoint-Stichtag immer vollständig ist.
+    """
+    from materials.models import MaterialStockCheckpoint
+
+    pending = getattr(_pending, 'invalidations', None)
+    if pending is not None:
+        earliest = pending.get(workshop_id)
+        pending[workshop_id] = since if earliest is None else min(earliest, since)
+        return
+
+    MaterialStockCheckpoint.objects.filter(
+        workshop_id=workshop_id, taken_at__gt=since
+    ).delete()
+
+
+def get_stock_map_as_of(workshop_id, as_of, material_ids=None):
+    """
+    Bestände einer Werkstatt zum Zeitpunkt ``as_of``.
+
+    Startet beim letzten Checkpoint vor ``as_of`` und addiert nur die
+    Bewegungen zwischen Checkpoint und ``as_of`` (exklusiv).
+
+    Returns:
+        dict: {material_id: Decimal}
+    """
+    from materials.models import MaterialMovement, MaterialStockCheckpoint
+
+    checkpoints = MaterialStockCheckpoint.objects.filter(
+        workshop_id=workshop_id
+    )
+    movements = MaterialMovement.objects.filter(
+        workshop_id=workshop_id, created_at__lt=as_of
+    )
+    if material_ids is not None:
+        material_ids = list(material_ids)
+        checkpoints = checkpoints.filter(material_id__in=material_ids)
+        movements = movements.filter(material_id__in=material_ids)
+
+    taken_at = MaterialStockCheckpoint.objects.filter(
+        workshop_id=workshop_id, taken_at__lte=as_of
+    ).aggregate(latest=Max('taken_at'))['latest']
+
+    stock_map = {}
+    if taken_at is not None:
+        stock_map = dict(
+            checkpoints.filter(taken_at=taken_at).values_list(
+                'material_id', 'quantity'
+            )
+        )
+        movements = movements.filter(created_at__gte=taken_at)
+
+    for material_id, total in movements.values('material_id').annotate(
+        total=Sum(signed_quantity_expression())
+    ).values_list('material_id', 'total'):
+        stock_map[material_id] = (
+            stock_map.get(material_id, Decimal('0')) + total
+        )
+
+    return stock_map
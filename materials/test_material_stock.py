@@ -0,0 +1,421 @@
+# materials/test_material_stock.py
+
+from datetime import datetime
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.models import Workshop
+from materials.models import (
+    Delivery, Material, MaterialCategory, MaterialMovement, MaterialStock,
+    MaterialStockCheckpoint, Supplier
+)
+from materials.serializers import DeliverySerializer, MaterialTransferSerializer
+from materials.stock import (
+    create_checkpoints, get_stock_map_as_of, rebuild_stock
+)
+
+
+User = get_user_model()
+
+
+class MaterialStockLedgerTestCase(TestCase):
+    """Tests für den materialisierten Bestand (MaterialStock)"""
+
+    def setUp(self):
+        self.potsdam = Workshop.objects.create(name='Potsdam')
+        self.rauen = Workshop.objects.create(name='Rauen')
+        self.category = MaterialCategory.objects.create(name='Teile', order=1)
+        self.material = Material.objects.create(
+            bezeichnung='Schraube', category=self.category
+        )
+
+    def stock(self, workshop, material=None):
+        material = material or self.material
+        return MaterialStock.objects.get(
+            workshop=workshop, material=material
+        ).quantity
+
+    def test_create_movement_updates_stock(self):
+        """Test: Anlegen einer Bewegung schreibt den Bestand fort"""
+        movement = MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+        MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='verbrauch', quantity=Decimal('3.00')
+        )
+
+        self.assertEqual(self.stock(self.potsdam), Decimal('7.00'))
+        stock = MaterialStock.objects.get(
+            workshop=self.potsdam, material=self.material
+        )
+        self.assertGreater(stock.last_movement_id, movement.id)
+
+    def test_update_movement_moves_stock(self):
+        """Test: Ändern einer Bewegung bucht alten Wert aus, neuen ein"""
+        movement = MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+
+        movement.quantity = Decimal('4.00')
+        movement.workshop = self.rauen
+        movement.save()
+
+        self.assertEqual(self.stock(self.potsdam), Decimal('0.00'))
+        self.assertEqual(self.stock(self.rauen), Decimal('4.00'))
+
+    def test_delete_movement_reverts_stock(self):
+        """Test: Löschen (auch per QuerySet) bucht die Bewegung aus"""
+        MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+        movement = MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='verlust', quantity=Decimal('2.00')
+        )
+
+        movement.delete()
+        self.assertEqual(self.stock(self.potsdam), Decimal('10.00'))
+
+        MaterialMovement.objects.filter(material=self.material).delete()
+        self.assertEqual(self.stock(self.potsdam), Decimal('0.00'))
+
+    def test_delete_material_cascades_without_errors(self):
+        """Test: Kaskadierendes Löschen legt keine neuen Bestandszeilen an"""
+        MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+
+        self.material.delete()
+
+        self.assertFalse(MaterialStock.objects.exists())
+
+    def test_delivery_and_transfer_serializers_update_stock(self):
+        """Test: Lieferungen und Transfers buchen in MaterialStock"""
+        delivery = DeliverySerializer(data={
+            'workshop': self.potsdam.id,
+            'items': [{'material': self.material.id, 'quantity': 10}]
+        })
+        self.assertTrue(delivery.is_valid(), delivery.errors)
+        delivery = delivery.save()
+
+        transfer = MaterialTransferSerializer(data={
+            'source_workshop': self.potsdam.id,
+            'target_workshop': self.rauen.id,
+            'items': [{'material': self.material.id, 'quantity': 4}]
+        })
+        self.assertTrue(transfer.is_valid(), transfer.errors)
+        transfer.save()
+
+        self.assertEqual(self.stock(self.potsdam), Decimal('6.00'))
+        self.assertEqual(self.stock(self.rauen), Decimal('4.00'))
+
+        # Update der Lieferung ersetzt die Bewegungen
+        update = DeliverySerializer(delivery, data={
+            'workshop': self.potsdam.id,
+            'items': [{'material': self.material.id, 'quantity': 7}]
+        })
+        self.assertTrue(update.is_valid(), update.errors)
+        update.save()
+
+        self.assertEqual(self.stock(self.potsdam), Decimal('3.00'))
+
+    def test_delivery_query_count_independent_of_items(self):
+        """Test: Lieferungen werden gebündelt angelegt und gebucht"""
+        materials = [
+            Material.objects.create(bezeichnung=f'Teil {i}')
+            for i in range(10)
+        ]
+        # ContentType-Cache vorwärmen, damit beide Läufe vergleichbar sind
+        ContentType.objects.get_for_model(Delivery)
+
+        def create_delivery(items):
+            serializer = DeliverySerializer(data={
+                'workshop': self.potsdam.id,
+                'items': [
+                    {'material': material.id, 'quantity': 5}
+                    for material in items
+                ]
+            })
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            with CaptureQueriesContext(connection) as queries:
+                serializer.save()
+            return len(queries)
+
+        small = create_delivery(materials[:2])
+        large = create_delivery(materials)
+
+        self.assertEqual(small, large)
+        self.assertEqual(self.stock(self.potsdam, materials[0]), Decimal('10.00'))
+        self.assertEqual(self.stock(self.potsdam, materials[9]), Decimal('5.00'))
+        self.assertEqual(
+            MaterialStock.objects.get(
+                workshop=self.potsdam, material=materials[9]
+            ).last_movement_id,
+            MaterialMovement.objects.get(material=materials[9]).id
+        )
+
+    def test_rebuild_stock_matches_ledger(self):
+        """Test: Neuberechnung aus der Historie ergibt denselben Bestand"""
+        MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+        MaterialMovement.objects.create(
+            workshop=self.potsdam, material=self.material,
+            change_type='verbrauch', quantity=Decimal('2.50')
+        )
+        MaterialStock.objects.update(quantity=Decimal('999'))
+
+        rebuild_stock()
+
+        self.assertEqual(self.stock(self.potsdam), Decimal('7.50'))
+
+
+class MaterialStockEndpointTestCase(APITestCase):
+    """Tests für die Bestands-Endpunkte auf Basis von MaterialStock"""
+
+    def setUp(self):
+        self.workshop = Workshop.objects.create(name='Potsdam')
+        self.user = User.objects.create_user(
+            username='stockuser', password='testpass123',
+            workshop=self.workshop
+        )
+        self.client.force_authenticate(user=self.user)
+        self.material = Material.objects.create(bezeichnung='Mutter')
+        MaterialMovement.objects.create(
+            workshop=self.workshop, material=self.material,
+            change_type='lieferung', quantity=Decimal('12.00')
+        )
+        MaterialMovement.objects.create(
+            workshop=self.workshop, material=self.material,
+            change_type='verbrauch', quantity=Decimal('2.00')
+        )
+
+    def test_material_stock_view(self):
+        """Test: Einzelbestand wird aus MaterialStock gelesen"""
+        response = self.client.get(
+            f'/api/materials/{self.material.id}/stock/',
+            {'workshop_id': self.workshop.id}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_stock'], 10.0)
+
+    def test_inventory_correction_uses_ledger(self):
+        """Test: Inventur-Korrektur rechnet gegen den gebuchten Bestand"""
+        response = self.client.post(
+            f'/api/materials/{self.material.id}/inventory-correction/',
+            {'workshop_id': self.workshop.id, 'inventory_count': 8},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['old_stock'], 10.0)
+        self.assertEqual(response.data['correction_quantity'], -2.0)
+        self.assertEqual(
+            MaterialStock.objects.get(material=self.material).quantity,
+            Decimal('8.00')
+        )
+
+    def test_workshop_material_stock(self):
+        """Test: Gesamtübersicht liefert annotierte Bestände"""
+        response = self.client.get(
+            f'/api/workshops/{self.workshop.id}/material-stock/'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        materials = [
+            m for group in response.data for m in group['materials']
+        ]
+        self.assertEqual(len(materials), 1)
+        self.assertEqual(materials[0]['current_stock'], Decimal('10.00'))
+
+    def test_workshop_material_stock_query_count_is_constant(self):
+        """Test: Anzahl der Abfragen wächst nicht mit dem Katalog"""
+        url = f'/api/workshops/{self.workshop.id}/material-stock/'
+        category = MaterialCategory.objects.create(name='Teile', order=1)
+        supplier = Supplier.objects.create(name='Lieferant')
+
+        def add_materials(count):
+            for i in range(count):
+                material = Material.objects.create(
+                    bezeichnung=f'Material {Material.objects.count()}',
+                    category=category
+                )
+                material.suppliers.add(supplier)
+                material.alternatives.add(self.material)
+                MaterialMovement.objects.create(
+                    workshop=self.workshop, material=material,
+                    change_type='lieferung', quantity=Decimal('1.00')
+                )
+
+        add_materials(3)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        add_materials(20)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 5)
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class MaterialStockCheckpointTestCase(APITestCase):
+    """Tests für historische Bestände über Checkpoints"""
+
+    def setUp(self):
+        self.workshop = Workshop.objects.create(name='Potsdam')
+        self.user = User.objects.create_user(
+            username='historyuser', password='testpass123',
+            workshop=self.workshop
+        )
+        self.client.force_authenticate(user=self.user)
+        self.material = Material.objects.create(bezeichnung='Kabel')
+
+        self.book('lieferung', '10.00', aware(2025, 11, 15, 12))
+        self.book('verbrauch', '3.00', aware(2025, 12, 20, 9))
+        self.book('lieferung', '5.00', aware(2026, 1, 10, 9))
+
+    def book(self, change_type, quantity, created_at):
+        movement = MaterialMovement.objects.create(
+            workshop=self.workshop, material=self.material,
+            change_type=change_type, quantity=Decimal(quantity)
+        )
+        MaterialMovement.objects.filter(pk=movement.pk).update(
+            created_at=created_at
+        )
+        return movement
+
+    def test_create_checkpoints_per_month(self):
+        """Test: Checkpoints je Monatsanfang mit fortgeschriebenem Bestand"""
+        create_checkpoints('month', until=aware(2026, 2, 15))
+
+        checkpoints = dict(
+            MaterialStockCheckpoint.objects.values_list('taken_at', 'quantity')
+        )
+        self.assertEqual(checkpoints, {
+            aware(2025, 12, 1): Decimal('10.00'),
+            aware(2026, 1, 1): Decimal('7.00'),
+            aware(2026, 2, 1): Decimal('12.00'),
+        })
+
+        # Erneuter Aufruf schreibt keine Duplikate
+        self.assertEqual(create_checkpoints('month', until=aware(2026, 2, 15)), 0)
+
+    def test_as_of_replays_only_after_checkpoint(self):
+        """Test: Stichtagsbestand = Checkpoint + spätere Bewegungen"""
+        create_checkpoints('month', until=aware(2026, 2, 15))
+        # Checkpoint verfälschen, um zu prüfen, dass er verwendet wird
+        MaterialStockCheckpoint.objects.filter(
+            taken_at=aware(2025, 12, 1)
+        ).update(quantity=Decimal('100.00'))
+
+        stock = get_stock_map_as_of(self.workshop.id, aware(2025, 12, 31))
+
+        self.assertEqual(stock[self.material.id], Decimal('97.00'))
+
+    def test_changing_old_movement_invalidates_checkpoints(self):
+        """Test: Nachträgliche Änderung verwirft betroffene Checkpoints"""
+        movement = MaterialMovement.objects.get(change_type='verbrauch')
+        create_checkpoints('month', until=aware(2026, 2, 15))
+
+        movement.quantity = Decimal('4.00')
+        movement.save()
+
+        self.assertEqual(
+            list(MaterialStockCheckpoint.objects.values_list(
+                'taken_at', flat=True
+            )),
+            [aware(2025, 12, 1)]
+        )
+        stock = get_stock_map_as_of(self.workshop.id, aware(2026, 1, 31))
+        self.assertEqual(stock[self.material.id], Decimal('11.00'))
+
+    def test_material_stock_view_as_of(self):
+        """Test: as_of Parameter am Einzelbestand"""
+        create_checkpoints('month', until=aware(2026, 2, 15))
+
+        response = self.client.get(
+            f'/api/materials/{self.material.id}/stock/',
+            {'workshop_id': self.workshop.id, 'as_of': '2025-12-31'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_stock'], 7.0)
+
+    def test_workshop_material_stock_as_of(self):
+        """Test: as_of Parameter an der Werkstatt-Übersicht"""
+        response = self.client.get(
+            f'/api/workshops/{self.workshop.id}/material-stock/',
+            {'as_of': '2025-11-30'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        materials = [
+            m for group in response.data for m in group['materials']
+        ]
+        self.assertEqual(materials[0]['current_stock'], Decimal('10.00'))
+
+    def test_as_of_date_includes_movements_of_that_day(self):
+        """Test: Ein Datum als Stichtag umfasst den ganzen Tag"""
+        self.book('lieferung', '2.00', aware(2025, 12, 31, 15))
+
+        response = self.client.get(
+            f'/api/materials/{self.material.id}/stock/',
+            {'workshop_id': self.workshop.id, 'as_of': '2025-12-31'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_stock'], 9.0)
+
+    def test_as_of_datetime_is_used_exactly(self):
+        """Test: Ein Zeitpunkt als Stichtag schneidet den Tag ab"""
+        self.book('lieferung', '2.00', aware(2025, 12, 31, 15))
+
+        response = self.client.get(
+            f'/api/materials/{self.material.id}/stock/',
+            {'workshop_id': self.workshop.id, 'as_of': '2025-12-31T12:00:00'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_stock'], 7.0)
+
+    def test_invalid_as_of(self):
+        response = self.client.get(
+            f'/api/materials/{self.material.id}/stock/',
+            {'workshop_id': self.workshop.id, 'as_of': 'gestern'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_impossible_as_of_date(self):
+        """Test: Unmögliche Daten liefern 400 statt 500"""
+        for value in ('2024-02-30', '2024-02-30T10:00:00'):
+            response = self.client.get(
+                f'/api/materials/{self.material.id}/stock/',
+                {'workshop_id': self.workshop.id, 'as_of': value}
+            )
+            self.assertEqual(response.status_code, 400)
+
+            response = self.client.get(
+                f'/api/workshops/{self.workshop.id}/material-stock/',
+                {'as_of': value}
+            )
+            self.assertEqual(response.status_code, 400)
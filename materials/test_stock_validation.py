@@ -1,13 +1,17 @@
 # materials/test_stock_validation.py
 
 from decimal import Decimal
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.serializers import ValidationError
 
 from core.models import Workshop
 from materials.models import Material, MaterialCategory, MaterialMovement
 from materials.serializers import MaterialTransferSerializer
-from materials.validators import get_material_stock, validate_stock_movement
+from materials.validators import (
+    get_material_stock, validate_stock_movement, validate_stock_movements
+)
 
 
 class StockValidationTestCase(TestCase):
@@ -262,3 +266,71 @@ class StockValidationTestCase(TestCase):
             get_material_stock(material2.id, self.potsdam.id),
             Decimal('1.00')  # Unverändert
         )
+
+    def test_transfer_duplicate_lines_are_summed(self):
+        """Test: Mehrere Positionen desselben Materials werden summiert"""
+        data = {
+            'source_workshop': self.potsdam.id,
+            'target_workshop': self.rauen.id,
+            'items': [
+                {'material': self.material.id, 'quantity': 6},
+                {'material': self.material.id, 'quantity': 6},
+            ]
+        }
+
+        serializer = MaterialTransferSerializer(data=data)
+
+        with self.assertRaises(ValidationError) as context:
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        self.assertIn('Änderung: -12', str(context.exception.detail['items']))
+        self.assertEqual(
+            get_material_stock(self.material.id, self.potsdam.id),
+            Decimal('10.00')
+        )
+
+    def test_validate_stock_movements_reports_all_violations(self):
+        """Test: Sammelvalidierung meldet alle Verstöße in einer Abfrage"""
+        material2 = Material.objects.create(
+            bezeichnung='Test Gehäuseteil 2', category=self.category
+        )
+
+        with transaction.atomic(), \
+                CaptureQueriesContext(connection) as queries:
+            violations = validate_stock_movements(self.potsdam.id, [
+                (self.material.id, -8),
+                (self.material.id, -4),
+                (material2.id, -1),
+            ])
+
+        self.assertEqual(
+            len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 1
+        )
+        self.assertEqual(set(violations), {self.material.id, material2.id})
+        current_stock, message = violations[self.material.id]
+        self.assertEqual(current_stock, Decimal('10.00'))
+        self.assertIn('Änderung: -12', message)
+        self.assertEqual(violations[material2.id][0], Decimal('0'))
+
+    def test_validate_stock_movements_locks_in_material_order(self):
+        """Test: Bestände werden in fester Reihenfolge (material_id) gesperrt"""
+        material2 = Material.objects.create(
+            bezeichnung='Test Gehäuseteil 2', category=self.category
+        )
+
+        with transaction.atomic(), \
+                CaptureQueriesContext(connection) as queries:
+            validate_stock_movements(self.potsdam.id, [
+                (material2.id, -1),
+                (self.material.id, -1),
+            ])
+
+        stock_query = next(
+            q['sql'] for q in queries if 'materials_materialstock' in q['sql']
+        )
+        # material_id ist die erste Spalte - Django schreibt ORDER BY 1
+        self.assertRegex(
+            stock_query,
+            r'ORDER BY (1|"materials_materialstock"\."material_id") ASC'
+        )
@@ -1,12 +1,12 @@
 # materials/validators.py
 
 from decimal import Decimal
-from django.db.models import Sum
 
 
 def get_material_stock(material_id, workshop_id):
     """
-    Berechnet den aktuellen Bestand eines Materials in einer Werkstatt.
+    Liefert den aktuellen Bestand eines Materials in einer Werkstatt
+    aus dem materialisierten Bestand (MaterialStock).
     
     Args:
         material_id: ID des Materials
@@ -16,14 +16,9 @@ def get_material_stock(material_id, workshop_id):
         Decimal: Aktueller Bestand
     """
     # Import hier um Circular Import zu vermeiden
-    from materials.models import MaterialMovement
-    
-    stock = MaterialMovement.objects.filter(
-        material_id=material_id,
-        workshop_id=workshop_id
-    ).aggregate(total=Sum('quantity'))['total']
-    
-    return stock or Decimal('0')
+    from materials.stock import get_stock
+
+    return get_stock(material_id, workshop_id)
 
 
 def validate_stock_movement(material_id, workshop_id, quantity_change):
@@ -40,6 +35,57 @@ def validate_stock_movement(material_id, workshop_id, quantity_change):
         tuple: (is_valid: bool, current_stock: Decimal, message: str)
     """
     current_stock = get_material_stock(material_id, workshop_id)
+    return _check_stock(current_stock, quantity_change)
+
+
+def validate_stock_movements(workshop_id, quantity_changes):
+    """
+    Validiert mehrere Material-Bewegungen einer Werkstatt gemeinsam.
+
+    Änderungen desselben Materials werden aufsummiert, damit mehrere
+    Positionen zusammen den Bestand nicht überziehen können. Alle
+    Bestände werden mit einer Abfrage gelesen und per select_for_update
+    bis zum Ende der Transaktion gesperrt – der Aufruf muss daher in
+    einem transaction.atomic()-Block erfolgen.
+
+    Args:
+        workshop_id: ID der Werkstatt
+        quantity_changes: Iterable aus (material_id, quantity_change)
+
+    Returns:
+        dict: {material_id: (current_stock, message)} für alle
+            Materialien, deren Bestand negativ würde (leer = gültig)
+    """
+    from materials.models import MaterialStock
+
+    totals = {}
+    for material_id, quantity_change in quantity_changes:
+        totals[material_id] = (
+            totals.get(material_id, Decimal('0')) +
+            Decimal(str(quantity_change))
+        )
+    if not totals:
+        return {}
+
+    stock_map = dict(
+        # Feste Sperrreihenfolge – überlappende Buchungen können sich so
+        # nicht gegenseitig blockieren (Deadlock)
+        MaterialStock.objects.select_for_update().filter(
+            workshop_id=workshop_id, material_id__in=list(totals)
+        ).order_by('material_id').values_list('material_id', 'quantity')
+    )
+
+    violations = {}
+    for material_id, quantity_change in totals.items():
+        current_stock = stock_map.get(material_id, Decimal('0'))
+        is_valid, _, message = _check_stock(current_stock, quantity_change)
+        if not is_valid:
+            violations[material_id] = (current_stock, message)
+
+    return violations
+
+
+def _check_stock(current_stock, quantity_change):
     new_stock = current_stock + Decimal(str(quantity_change))
     
     if new_stock < 0:
@@ -29,7 +29,12 @@ from rest_framework import status
 from collections import defaultdict
 from rest_framework.exceptions import ValidationError
 from .utils import group_materials_by_category
-from .validators import validate_stock_movement
+from .validators import get_material_stock, validate_stock_movement
+from .stock import (
+    annotate_current_stock,
+    get_stock_map,
+    get_stock_map_as_of
+)
 from .import_export import (
     SupplierImportExport,
     OrderImportExport,
@@ -38,6 +43,9 @@ from .import_export import (
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from django.db.models import OuterRef, Subquery, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, timedelta
 
 
 class SupplierListCreateView(generics.ListCreateAPIView):
@@ -237,6 +245,36 @@ class OrderDeliveriesListView(generics.ListAPIView):
         ).order_by('-created_at')
 
 
+def parse_as_of(value):
+    """
+    Wandelt den ``as_of`` Query-Parameter in einen exklusiven Stichtag um.
+
+    Ein Datum (YYYY-MM-DD) umfasst den ganzen Tag, d.h. der Bestand wird
+    zum Ende des Tages berechnet. Ein ISO-Zeitpunkt wird direkt verwendet.
+
+    Returns:
+        datetime oder None, falls der Wert ungültig ist
+    """
+    try:
+        # Zuerst als Datum: parse_datetime akzeptiert YYYY-MM-DD ebenfalls,
+        # allerdings als Mitternacht statt als Ende des Tages
+        day = parse_date(value)
+        if day is not None:
+            return timezone.make_aware(
+                datetime.combine(day + timedelta(days=1), datetime.min.time())
+            )
+
+        moment = parse_datetime(value)
+    except ValueError:
+        # Wohlgeformt, aber unmöglich (z.B. 2024-02-30)
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def material_stock_view(request, material_id):
@@ -249,33 +287,25 @@ def material_stock_view(request, material_id):
     except Material.DoesNotExist:
         return Response({'detail': 'Material nicht gefunden.'}, status=404)
 
-    # Bewegungen für Hauptmaterial
-    movements = MaterialMovement.objects.filter(
-        material=material,
-        workshop_id=workshop_id
-    )
-
-    total_stock = Decimal(0)
-    for m in movements:
-        if m.change_type in ['lieferung', 'korrektur', 'transfer']:
-            total_stock += m.quantity
-        elif m.change_type in ['verbrauch', 'verlust']:
-            total_stock -= m.quantity
+    as_of = request.query_params.get('as_of')
+    if as_of:
+        as_of = parse_as_of(as_of)
+        if as_of is None:
+            return Response({'detail': 'Ungültiges as_of Datum.'}, status=400)
+
+    # Bestände für Hauptmaterial und Alternativen aus MaterialStock
+    # bzw. zum Stichtag aus Checkpoint und nachfolgenden Bewegungen
+    alternatives = list(material.alternatives.all())
+    material_ids = [material.id] + [alt.id for alt in alternatives]
+    if as_of:
+        stock_map = get_stock_map_as_of(workshop_id, as_of, material_ids)
+    else:
+        stock_map = get_stock_map(workshop_id, material_ids)
+    total_stock = stock_map.get(material.id, Decimal(0))
 
-    # Bewegungen für Alternativen
     alternative_stocks = []
-    for alt_material in material.alternatives.all():
-        alt_movements = MaterialMovement.objects.filter(
-            material=alt_material,
-            workshop_id=workshop_id
-        )
-
-        alt_total = Decimal(0)
-        for m in alt_movements:
-            if m.change_type in ['lieferung', 'korrektur', 'transfer']:
-                alt_total += m.quantity
-            elif m.change_type in ['verbrauch', 'verlust']:
-                alt_total -= m.quantity
+    for alt_material in alternatives:
+        alt_total = stock_map.get(alt_material.id, Decimal(0))
 
         # Bild-URL für Alternative holen
         bild_url = None
@@ -306,6 +336,7 @@ def material_stock_view(request, material_id):
         "category": material.category.name if material.category else None,
         "current_stock": float(total_stock),
         "workshop_id": int(workshop_id),
+        "as_of": as_of or None,
         "material_details": MaterialSerializer(material, context={'request': request}).data,
         "alternatives": alternative_stocks
     })
@@ -313,37 +344,33 @@ def material_stock_view(request, material_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def all_materials_stock_by_workshop(request, workshop_id):
-    from .utils import group_materials_by_category
-
     # Standardmäßig deprecated Materialien ausblenden
     include_deprecated = request.query_params.get(
         'include_deprecated', 'false'
     ).lower() == 'true'
-    
-    if include_deprecated:
-        materials = Material.objects.all()
-    else:
-        materials = Material.objects.filter(deprecated=False)
-    
-    materials_with_stock = []
 
-    for material in materials:
-        movements = MaterialMovement.objects.filter(
-            material=material,
-            workshop_id=workshop_id
-        )
-
-        total = 0
-        for m in movements:
-            if m.change_type in ['lieferung', 'korrektur', 'transfer']:
-                total += m.quantity
-            elif m.change_type in ['verbrauch', 'verlust']:
-                total -= m.quantity
-
-        material.current_stock = total
-        materials_with_stock.append(material)
+    materials = Material.objects.select_related('category').prefetch_related(
+        'suppliers', 'alternatives'
+    )
+    if not include_deprecated:
+        materials = materials.filter(deprecated=False)
+
+    as_of = request.query_params.get('as_of')
+    if as_of:
+        as_of = parse_as_of(as_of)
+        if as_of is None:
+            return Response({'detail': 'Ungültiges as_of Datum.'}, status=400)
+
+        # Historischer Bestand: Checkpoint + Bewegungen bis zum Stichtag
+        stock_map = get_stock_map_as_of(workshop_id, as_of)
+        materials = list(materials)
+        for material in materials:
+            material.current_stock = stock_map.get(material.id, Decimal(0))
+    else:
+        # Bestand aller Materialien in einer Abfrage annotieren
+        materials = annotate_current_stock(materials, workshop_id)
 
-    return Response(group_materials_by_category(materials_with_stock, request))
+    return Response(group_materials_by_category(materials, request))
 
 
 @api_view(['POST'])
@@ -376,18 +403,8 @@ def material_inventory_correction_view(request, material_id):
     except (ValueError, TypeError):
         return Response({'detail': 'Ungültiger inventory_count Wert.'}, status=400)
     
-    # Aktuellen Bestand berechnen
-    movements = MaterialMovement.objects.filter(
-        material=material,
-        workshop_id=workshop_id
-    )
-    
-    current_stock = Decimal(0)
-    for movement in movements:
-        if movement.change_type in ['lieferung', 'korrektur', 'transfer']:
-            current_stock += movement.quantity
-        elif movement.change_type in ['verbrauch', 'verlust']:
-            current_stock -= movement.quantity
+    # Aktuellen Bestand lesen
+    current_stock = get_material_stock(material.id, workshop_id)
     
     # Korrektur-Menge berechnen
     correction_quantity = inventory_count - current_stock
@@ -257,6 +257,15 @@ export class DHLService {
     );
   }
 
+  /**
+   * Print job: ZIP of several label PDFs (marks them as printed)
+   */
+  printLabels(request: { label_ids: number[] } | { today: true }): Observable<Blob> {
+    return this.http.post(`${this.baseUrl}/labels/print/`, request, {
+      responseType: 'blob'
+    });
+  }
+
   /**
    * Download label PDF from base64
    */
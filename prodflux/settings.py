@@ -81,16 +81,38 @@ WSGI_APPLICATION = 'prodflux.wsgi.application'
 # Datenbank
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
-# Test-Umgebung: Immer SQLite für Tests verwenden
+# Test-Umgebung: SQLite, optional PostgreSQL über TEST_DATABASE_URL
 import sys
 TESTING = 'test' in sys.argv
 
-if TESTING:
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+if TESTING and TEST_DATABASE_URL:
+    # Optional gegen PostgreSQL testen (echte Zeilensperren, z.B. für
+    # ManufactureProductConcurrencyTestCase) - Django legt test_<name> an
+    import dj_database_url
+    DATABASES = {'default': dj_database_url.parse(TEST_DATABASE_URL)}
+elif TESTING:
     # Für Tests IMMER SQLite verwenden, nie die produktive Datenbank!
+    # Dateibasiert statt In-Memory, damit die Nebenläufigkeitstests echte
+    # parallele Verbindungen öffnen können. BEGIN IMMEDIATE serialisiert
+    # schreibende Transaktionen, timeout wartet auf die Sperre statt mit
+    # "database is locked" abzubrechen.
+    import tempfile
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': ':memory:',  # In-Memory-Datenbank für schnelle Tests
+            'NAME': ':memory:',
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 30,
+            },
+            'TEST': {
+                'NAME': os.path.join(
+                    tempfile.gettempdir(),
+                    f'prodflux_test_{os.getpid()}.sqlite3'
+                ),
+            },
         }
     }
 elif DATABASE_URL:
@@ -113,6 +135,71 @@ else:
         }
     }
 
+# Cache – wird von allen gunicorn-Workern gemeinsam genutzt, damit
+# Bestelllisten nur einmal pro Deployment geladen werden.
+# REDIS_URL gesetzt → Redis, CACHE_BACKEND=db → Datenbank-Cache
+# (vorher "manage.py createcachetable"), CACHE_BACKEND=file → dateibasiert
+# in CACHE_DIR. Ohne Angabe: Datenbank-Cache, sobald DATABASE_URL gesetzt
+# ist, sonst dateibasiert (lokale Entwicklung).
+#
+# Scheduler-Leader-Wahl und Single-Flight-Locks brauchen ein atomares
+# cache.add() über Prozesse hinweg - das bieten nur Redis und der
+# Datenbank-Cache. Der Datei-Cache ist daher nur mit einem Worker erlaubt.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_BACKEND = os.environ.get(
+    'CACHE_BACKEND', 'db' if DATABASE_URL else 'file'
+)
+# Anzahl gunicorn-Worker (gunicorn liest denselben Wert)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+elif REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'prodflux_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                'CACHE_DIR', str(BASE_DIR / '.django_cache')
+            ),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+    if WEB_CONCURRENCY > 1:
+        from django.core.exceptions import ImproperlyConfigured
+
+        raise ImproperlyConfigured(
+            "Der Datei-Cache ist nicht atomar über Prozesse hinweg. Mit "
+            "WEB_CONCURRENCY > 1 bitte REDIS_URL oder CACHE_BACKEND=db "
+            "setzen."
+        )
+
+# WooCommerce: maximale Anzahl paralleler Seitenabrufe beim Bestellabgleich
+WOOCOMMERCE_FETCH_CONCURRENCY = int(
+    os.environ.get('WOOCOMMERCE_FETCH_CONCURRENCY', '4')
+)
+# WooCommerce: beim Abgleich nur die benötigten Felder anfragen (_fields)
+WOOCOMMERCE_REQUEST_ORDER_FIELDS = os.environ.get(
+    'WOOCOMMERCE_REQUEST_ORDER_FIELDS', 'True'
+) == 'True'
+
 # Passwort-Validierung
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -153,6 +240,13 @@ if RENDER:
 else:
     MEDIA_ROOT = BASE_DIR / 'media'  # Lokal weiterhin normal
 
+# DHL-Label-Downloads über den Webserver ausliefern lassen (optional):
+# "X-Sendfile" (Apache) oder "X-Accel-Redirect" (nginx, mit internem Prefix)
+DHL_LABEL_SENDFILE_HEADER = os.environ.get('DHL_LABEL_SENDFILE_HEADER', '')
+DHL_LABEL_SENDFILE_PREFIX = os.environ.get(
+    'DHL_LABEL_SENDFILE_PREFIX', '/protected-media/'
+)
+
 # Custom User Model
 AUTH_USER_MODEL = 'core.User'
 
@@ -246,6 +340,12 @@ EMAIL_BCC_ADDRESSES = os.environ.get("EMAIL_BCC_ADDRESSES", "")  # Komma-separie
 # Sales Excel Configuration
 SALES_EXCEL_URL = os.environ.get("SALES_EXCEL_URL", "")
 
+# Materialbestand: Abstand der Checkpoints für historische Abfragen
+# (day, week oder month – siehe create_stock_checkpoints)
+MATERIAL_STOCK_CHECKPOINT_INTERVAL = os.environ.get(
+    "MATERIAL_STOCK_CHECKPOINT_INTERVAL", "month"
+)
+
 # Logging
 LOGGING = {
     'version': 1,
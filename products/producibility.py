@@ -0,0 +1,178 @@
+# products/producibility.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+
+from materials.models import OrderItem
+from materials.stock import get_stock_map
+from .models import ProductMaterial, ProductStock
+
+
+def load_bill_of_materials(product_ids=None):
+    """
+    Lädt die Stücklisten (ProductMaterial) aller Produkte in einer Abfrage.
+
+    Returns:
+        dict: {product_id: [(material_id, quantity_per_unit), ...]}
+    """
+    requirements = ProductMaterial.objects.all()
+    if product_ids is not None:
+        requirements = requirements.filter(product_id__in=list(product_ids))
+
+    bom = defaultdict(list)
+    for product_id, material_id, quantity_per_unit in requirements.values_list(
+        'product_id', 'material_id', 'quantity_per_unit'
+    ):
+        bom[product_id].append((material_id, quantity_per_unit))
+    return bom
+
+
+def bom_material_ids(bom):
+    """Alle in den Stücklisten verwendeten Material-IDs."""
+    return {
+        material_id
+        for requirements in bom.values()
+        for material_id, _ in requirements
+    }
+
+
+def limit_units(requirements, available):
+    """
+    Berechnet, wie viele Einheiten ein Produkt aus einem Bestand zulässt.
+
+    Das Minimum über alle Materialien von ``verfügbar // Bedarf`` ist die
+    Anzahl fertigbarer Einheiten. Materialien mit Bedarf <= 0 begrenzen
+    auf 0, Produkte ohne Stückliste ergeben 0.
+
+    Args:
+        requirements: [(material_id, quantity_per_unit), ...]
+        available: {material_id: Decimal}
+    """
+    limits = []
+    for material_id, quantity_per_unit in requirements:
+        if quantity_per_unit > 0:
+            limits.append(
+                available.get(material_id, Decimal(0)) // quantity_per_unit
+            )
+        else:
+            limits.append(0)
+    return int(min(limits)) if limits else 0
+
+
+def possible_units_by_product(workshop_id, product_ids=None):
+    """
+    Fertigbare Einheiten je Produkt aus dem Werkstattbestand.
+
+    Benötigt unabhängig von der Katalog-Größe zwei Abfragen
+    (Stücklisten und Bestände).
+
+    Returns:
+        dict: {product_id: int}
+    """
+    bom = load_bill_of_materials(product_ids)
+    stock = get_stock_map(workshop_id, bom_material_ids(bom))
+
+    product_ids = bom.keys() if product_ids is None else product_ids
+    return {
+        product_id: limit_units(bom.get(product_id, []), stock)
+        for product_id in product_ids
+    }
+
+
+def lifecycle_limits_by_product(workshop_id, product_ids):
+    """
+    Fertigungsgrenzen je Produkt aus Lager und Lager plus Bestellungen.
+
+    Returns:
+        dict: {product_id: {
+            'bestellungen_moeglich': int,
+            'lager_fertigung_moeglich': int,
+            'bestand_fertig': Decimal,
+        }}
+    """
+    bom = load_bill_of_materials(product_ids)
+    material_ids = bom_material_ids(bom)
+    stock = get_stock_map(workshop_id, material_ids)
+    ordered = dict(
+        OrderItem.objects.filter(material_id__in=material_ids)
+        .values('material_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('material_id', 'total')
+    )
+    finished = dict(
+        ProductStock.objects.filter(
+            workshop_id=workshop_id, product_id__in=list(product_ids)
+        ).values_list('product_id', 'bestand')
+    )
+
+    result = {}
+    for product_id in product_ids:
+        bestellung_limits = []
+        lager_limits = []
+
+        for material_id, bedarf_pro_einheit in bom.get(product_id, []):
+            lager = stock.get(material_id, Decimal(0))
+            gesamt_bestellt = ordered.get(material_id) or Decimal(0)
+
+            if bedarf_pro_einheit > 0:
+                if lager == 0 and gesamt_bestellt == 0:
+                    limit_bestellung = 0
+                else:
+                    limit_bestellung = (
+                        (lager + gesamt_bestellt) // bedarf_pro_einheit
+                    )
+                limit_lager = lager // bedarf_pro_einheit
+            else:
+                limit_bestellung = 0
+                limit_lager = 0
+
+            bestellung_limits.append(limit_bestellung)
+            lager_limits.append(limit_lager)
+
+        result[product_id] = {
+            'bestellungen_moeglich': (
+                int(min(bestellung_limits)) if bestellung_limits else 0
+            ),
+            'lager_fertigung_moeglich': (
+                int(min(lager_limits)) if lager_limits else 0
+            ),
+            'bestand_fertig': finished.get(product_id, Decimal(0)),
+        }
+    return result
+
+
+def increment_product_stock(increments):
+    """
+    Erhöht mehrere Produktbestände mit einem INSERT und einem UPDATE.
+
+    Fehlende ProductStock-Zeilen werden angelegt, anschließend werden alle
+    Bestände per F()-Inkrement erhöht, damit parallele Buchungen keine
+    Updates verlieren.
+
+    Args:
+        increments: {(workshop_id, product_id): Decimal}
+    """
+    if not increments:
+        return
+
+    ProductStock.objects.bulk_create([
+        ProductStock(workshop_id=workshop_id, product_id=product_id)
+        for workshop_id, product_id in increments
+    ], ignore_conflicts=True)
+
+    rows = Q()
+    cases = []
+    for (workshop_id, product_id), quantity in increments.items():
+        match = Q(workshop_id=workshop_id, product_id=product_id)
+        rows |= match
+        cases.append(When(match, then=Value(quantity)))
+
+    ProductStock.objects.filter(rows).update(
+        bestand=F('bestand') + Case(
+            *cases,
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
@@ -0,0 +1,172 @@
+# products/test_manufacturing.py
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Workshop
+from materials.models import Material, MaterialMovement, MaterialStock
+from products.models import Product, ProductMaterial, ProductStock
+
+
+User = get_user_model()
+
+
+def create_manufacturing_fixture(testcase):
+    testcase.workshop = Workshop.objects.create(name='Potsdam')
+    testcase.user = User.objects.create_user(
+        username='manufacturer', password='testpass123',
+        workshop=testcase.workshop
+    )
+    testcase.product = Product.objects.create(
+        bezeichnung='Sensor', artikelnummer='SEN-1'
+    )
+    testcase.material = Material.objects.create(bezeichnung='Platine')
+    ProductMaterial.objects.create(
+        product=testcase.product, material=testcase.material,
+        quantity_per_unit=Decimal('2.00')
+    )
+    MaterialMovement.objects.create(
+        workshop=testcase.workshop, material=testcase.material,
+        change_type='lieferung', quantity=Decimal('1000.00')
+    )
+
+
+class ManufactureProductTestCase(APITestCase):
+    """Tests für die Fertigungsbuchung"""
+
+    def setUp(self):
+        create_manufacturing_fixture(self)
+        self.client.force_authenticate(user=self.user)
+
+    def test_manufacture_books_material_and_product_stock(self):
+        """Test: Fertigung bucht Verbrauch und Produktbestand"""
+        for _ in range(2):
+            response = self.client.post('/api/manufacture/', {
+                'product_id': self.product.id,
+                'workshop_id': self.workshop.id,
+                'quantity': 3,
+            }, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            ProductStock.objects.get(product=self.product).bestand,
+            Decimal('6.00')
+        )
+        self.assertEqual(
+            MaterialStock.objects.get(material=self.material).quantity,
+            Decimal('988.00')
+        )
+
+
+class ManufactureProductConcurrencyTestCase(TransactionTestCase):
+    """
+    Stresstest: parallele Fertigungsbuchungen verlieren keine Updates.
+
+    Läuft auf der dateibasierten SQLite-Testdatenbank (schreibende
+    Transaktionen serialisiert) und mit TEST_DATABASE_URL auf PostgreSQL,
+    wo die Zeilensperren (select_for_update) greifen.
+    """
+
+    requests = 40
+    workers = 8
+
+    def setUp(self):
+        create_manufacturing_fixture(self)
+
+    def manufacture(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            return client.post('/api/manufacture/', {
+                'product_id': self.product.id,
+                'workshop_id': self.workshop.id,
+                'quantity': 1,
+            }, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_parallel_manufacturing_is_exact(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            statuses = list(executor.map(self.manufacture, range(self.requests)))
+
+        self.assertEqual(statuses, [200] * self.requests)
+        self.assertEqual(
+            ProductStock.objects.get(product=self.product).bestand,
+            Decimal(self.requests)
+        )
+        self.assertEqual(
+            MaterialStock.objects.get(material=self.material).quantity,
+            Decimal('1000.00') - 2 * self.requests
+        )
+        self.assertEqual(
+            MaterialMovement.objects.filter(change_type='verbrauch').count(),
+            self.requests
+        )
+
+
+class ManufactureBatchTestCase(APITestCase):
+    """Tests für die Sammel-Fertigungsbuchung"""
+
+    def setUp(self):
+        create_manufacturing_fixture(self)
+        self.client.force_authenticate(user=self.user)
+        self.rauen = Workshop.objects.create(name='Rauen')
+        MaterialMovement.objects.create(
+            workshop=self.rauen, material=self.material,
+            change_type='lieferung', quantity=Decimal('10.00')
+        )
+
+    def test_batch_books_all_entries(self):
+        """Test: Alle Fertigungen werden gemeinsam gebucht"""
+        response = self.client.post('/api/manufacture/batch/', [
+            {'product_id': self.product.id, 'workshop_id': self.workshop.id, 'quantity': 3},
+            {'product_id': self.product.id, 'workshop_id': self.workshop.id, 'quantity': 2},
+            {'product_id': self.product.id, 'workshop_id': self.rauen.id, 'quantity': 4},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            ProductStock.objects.get(workshop=self.workshop).bestand,
+            Decimal('5.00')
+        )
+        self.assertEqual(
+            ProductStock.objects.get(workshop=self.rauen).bestand,
+            Decimal('4.00')
+        )
+        self.assertEqual(
+            MaterialStock.objects.get(workshop=self.workshop).quantity,
+            Decimal('990.00')
+        )
+        self.assertEqual(
+            MaterialStock.objects.get(workshop=self.rauen).quantity,
+            Decimal('2.00')
+        )
+
+    def test_batch_rejects_non_finite_quantity(self):
+        """Test: NaN und Infinity sind keine gültigen Mengen"""
+        for quantity in ('NaN', 'sNaN', 'Infinity', '-Infinity'):
+            response = self.client.post('/api/manufacture/batch/', [
+                {'product_id': self.product.id, 'workshop_id': self.workshop.id, 'quantity': quantity},
+            ], format='json')
+
+            self.assertEqual(response.status_code, 400, quantity)
+        self.assertFalse(ProductStock.objects.exists())
+
+    def test_batch_checks_aggregated_demand(self):
+        """Test: Einzeln ausreichende Positionen dürfen zusammen nicht überziehen"""
+        response = self.client.post('/api/manufacture/batch/', [
+            {'product_id': self.product.id, 'workshop_id': self.rauen.id, 'quantity': 3},
+            {'product_id': self.product.id, 'workshop_id': self.rauen.id, 'quantity': 3},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['material_id'], self.material.id)
+        self.assertFalse(ProductStock.objects.exists())
+        self.assertEqual(
+            MaterialStock.objects.get(workshop=self.rauen).quantity,
+            Decimal('10.00')
+        )
@@ -0,0 +1,128 @@
+# products/test_producibility.py
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core.models import Workshop
+from materials.models import (
+    Material, MaterialMovement, Order, OrderItem, Supplier
+)
+from products.models import Product, ProductMaterial, ProductStock
+from products.producibility import limit_units
+
+
+User = get_user_model()
+
+
+class LimitUnitsTestCase(SimpleTestCase):
+    """Tests für die Min-Ratio-Berechnung"""
+
+    def test_minimum_over_materials(self):
+        requirements = [(1, Decimal('2')), (2, Decimal('3'))]
+        available = {1: Decimal('10'), 2: Decimal('7')}
+
+        self.assertEqual(limit_units(requirements, available), 2)
+
+    def test_missing_stock_and_empty_bom(self):
+        self.assertEqual(limit_units([(1, Decimal('1'))], {}), 0)
+        self.assertEqual(limit_units([], {1: Decimal('5')}), 0)
+
+    def test_zero_requirement_limits_to_zero(self):
+        self.assertEqual(
+            limit_units([(1, Decimal('0'))], {1: Decimal('5')}), 0
+        )
+
+
+class ProducibleOverviewTestCase(APITestCase):
+    """Tests für producible_overview_view und product_lifecycle_overview"""
+
+    def setUp(self):
+        self.workshop = Workshop.objects.create(name='Potsdam')
+        self.user = User.objects.create_user(
+            username='produser', password='testpass123',
+            workshop=self.workshop
+        )
+        self.client.force_authenticate(user=self.user)
+        self.supplier = Supplier.objects.create(name='Lieferant')
+        self.order = Order.objects.create(
+            supplier=self.supplier, bestellt_am='2025-01-01'
+        )
+
+    def add_product(self, stock=Decimal('10'), per_unit=Decimal('2')):
+        index = Product.objects.count()
+        product = Product.objects.create(
+            bezeichnung=f'Produkt {index}', artikelnummer=f'P-{index}'
+        )
+        material = Material.objects.create(bezeichnung=f'Material {index}')
+        ProductMaterial.objects.create(
+            product=product, material=material, quantity_per_unit=per_unit
+        )
+        MaterialMovement.objects.create(
+            workshop=self.workshop, material=material,
+            change_type='lieferung', quantity=stock
+        )
+        OrderItem.objects.create(
+            order=self.order, material=material,
+            quantity=Decimal('4'), preis_pro_stueck=Decimal('1')
+        )
+        return product
+
+    def test_producible_overview(self):
+        product = self.add_product(stock=Decimal('7'), per_unit=Decimal('2'))
+
+        response = self.client.get(
+            '/api/products/producible', {'workshop_id': self.workshop.id}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'product_id': product.id,
+            'product': product.bezeichnung,
+            'possible_units': 3,
+        }])
+
+    def test_lifecycle_overview(self):
+        product = self.add_product(stock=Decimal('7'), per_unit=Decimal('2'))
+        ProductStock.objects.create(
+            workshop=self.workshop, product=product, bestand=Decimal('5')
+        )
+
+        response = self.client.get(
+            '/api/products/lifecycle-overview/',
+            {'workshop_id': self.workshop.id}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        entry = response.data[0]
+        self.assertEqual(entry['lager_fertigung_moeglich'], 3)
+        self.assertEqual(entry['bestellungen_moeglich'], 5)  # (7 + 4) // 2
+        self.assertEqual(entry['bestand_fertig'], 5.0)
+
+    def test_query_count_is_constant(self):
+        urls = [
+            '/api/products/producible',
+            '/api/products/lifecycle-overview/',
+        ]
+
+        for _ in range(2):
+            self.add_product()
+        small = {}
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {'workshop_id': self.workshop.id})
+            small[url] = len(queries)
+
+        for _ in range(15):
+            self.add_product()
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    url, {'workshop_id': self.workshop.id}
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), 17)
+            self.assertEqual(len(queries), small[url], url)
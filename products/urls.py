@@ -5,7 +5,7 @@ from .views import (
     ProductMaterialGlobalListView, ProductVariantDetailView,
     ProductVariantListCreateView, ProductVersionDetailView,
     ProductVersionListCreateView, aggregated_material_requirements_view,
-    manufacture_product, material_requirements_view, producible_overview_view,
+    manufacture_batch, manufacture_product, material_requirements_view, producible_overview_view,
     producible_units_view, product_lifecycle_overview, product_stock_view,
     workshop_products_overview, product_material_dependencies,
     deprecate_product_with_materials, toggle_product_deprecated,
@@ -24,6 +24,7 @@ urlpatterns = [
     path('product-materials/create/', ProductMaterialCreateView.as_view(), name='product-material-create'),
     path('product-materials/<int:pk>/', ProductMaterialDetailView.as_view(), name='product-material-detail'),
     path('manufacture/', manufacture_product, name='manufacture-product'),
+    path('manufacture/batch/', manufacture_batch, name='manufacture-batch'),
     path('products/<int:product_id>/stock', product_stock_view, name='product-stock'),
     path('products/<int:product_id>/materials/', ProductMaterialListView.as_view(), name='product-material-list'),
     path('material-requirements/', aggregated_material_requirements_view, name='aggregated-material-requirements'),
@@ -3,11 +3,18 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Count
+from django.db.models import Count, F
 
 from materials.utils import group_materials_by_category
 from .models import Product, ProductMaterial, ProductStock, ProductVariant, ProductVersion
+from .producibility import (
+    increment_product_stock, lifecycle_limits_by_product, load_bill_of_materials,
+    possible_units_by_product
+)
+from core.models import Workshop
 from materials.models import DeliveryItem, MaterialCategory, MaterialMovement, OrderItem
+from materials.stock import batched_stock_updates, book_movements, get_stock_map
+from materials.validators import validate_stock_movements
 from .serializers import ProductMaterialSerializer, ProductSerializer, ProductVariantSerializer, ProductVersionSerializer
 from decimal import Decimal
 from django.db.models import Sum
@@ -140,25 +147,136 @@ def manufacture_product(request):
         return Response({"detail": "Ungültige Menge."}, status=400)
 
     product = Product.objects.get(id=product_id)
-    materials = ProductMaterial.objects.filter(product=product)
-
-    for pm in materials:
-        required_total = pm.quantity_per_unit * quantity
-        MaterialMovement.objects.create(
-            workshop_id=workshop_id,
-            material=pm.material,
-            change_type='verbrauch',
-            quantity=required_total,
-            note=f"Fertigung {quantity}x {product.bezeichnung}"
+    materials = list(ProductMaterial.objects.filter(product=product))
+
+    with batched_stock_updates():
+        # Beteiligte Materialbestände bis zum Commit sperren
+        get_stock_map(
+            workshop_id, [pm.material_id for pm in materials], for_update=True
         )
 
-    ps, created = ProductStock.objects.get_or_create(workshop_id=workshop_id, product=product)
-    ps.bestand += quantity
-    ps.save()
+        movements = MaterialMovement.objects.bulk_create([
+            MaterialMovement(
+                workshop_id=workshop_id,
+                material_id=pm.material_id,
+                change_type='verbrauch',
+                quantity=pm.quantity_per_unit * quantity,
+                note=f"Fertigung {quantity}x {product.bezeichnung}"
+            )
+            for pm in materials
+        ])
+        book_movements(movements)
+
+        # Atomares Inkrement statt Lesen/Schreiben – keine verlorenen Updates
+        ps, created = ProductStock.objects.get_or_create(workshop_id=workshop_id, product=product)
+        ProductStock.objects.filter(pk=ps.pk).update(bestand=F('bestand') + quantity)
 
     return Response({"message": f"{quantity}x {product.bezeichnung} gefertigt."})
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def manufacture_batch(request):
+    """
+    Bucht die Fertigung mehrerer Produkte/Werkstätten in einer Transaktion.
+
+    Erwartet eine Liste aus {product_id, workshop_id, quantity}. Der
+    Materialbedarf wird je Werkstatt und Material aufsummiert und gegen
+    die gesperrten Bestände geprüft – schlägt ein Material fehl, wird
+    nichts gebucht.
+    """
+    entries = request.data
+    if isinstance(entries, dict):
+        entries = entries.get('items')
+    if not isinstance(entries, list) or not entries:
+        return Response({"detail": "Liste von Fertigungen erwartet."}, status=400)
+
+    try:
+        entries = [
+            (int(entry['product_id']), int(entry['workshop_id']),
+             Decimal(str(entry['quantity'])))
+            for entry in entries
+        ]
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        return Response({"detail": "Ungültige Eingaben."}, status=400)
+    # "NaN"/"Infinity" parsen als Decimal - NaN lässt sich nicht vergleichen
+    if any(not quantity.is_finite() or quantity <= 0
+           for _, _, quantity in entries):
+        return Response({"detail": "Ungültige Menge."}, status=400)
+
+    products = Product.objects.in_bulk({product_id for product_id, _, _ in entries})
+    workshops = Workshop.objects.in_bulk({workshop_id for _, workshop_id, _ in entries})
+    missing = sorted(
+        {product_id for product_id, _, _ in entries} - set(products)
+    )
+    if missing:
+        return Response({"detail": f"Produkt(e) nicht gefunden: {missing}"}, status=404)
+    missing = sorted(
+        {workshop_id for _, workshop_id, _ in entries} - set(workshops)
+    )
+    if missing:
+        return Response({"detail": f"Werkstatt/Werkstätten nicht gefunden: {missing}"}, status=404)
+
+    bom = load_bill_of_materials(products)
+
+    # Materialbedarf je Werkstatt aufsummieren
+    demand = defaultdict(list)
+    for product_id, workshop_id, quantity in entries:
+        for material_id, quantity_per_unit in bom.get(product_id, []):
+            demand[workshop_id].append(
+                (material_id, -quantity_per_unit * quantity)
+            )
+
+    with batched_stock_updates():
+        errors = []
+        for workshop_id in sorted(demand):
+            violations = validate_stock_movements(workshop_id, demand[workshop_id])
+            errors.extend(
+                {
+                    "workshop_id": workshop_id,
+                    "material_id": material_id,
+                    "current_stock": current_stock,
+                    "message": message,
+                }
+                for material_id, (current_stock, message) in violations.items()
+            )
+        if errors:
+            return Response({
+                "detail": "Nicht genügend Material für die Fertigung.",
+                "errors": errors
+            }, status=400)
+
+        movements = MaterialMovement.objects.bulk_create([
+            MaterialMovement(
+                workshop_id=workshop_id,
+                material_id=material_id,
+                change_type='verbrauch',
+                quantity=quantity_per_unit * quantity,
+                note=f"Fertigung {quantity}x {products[product_id].bezeichnung}"
+            )
+            for product_id, workshop_id, quantity in entries
+            for material_id, quantity_per_unit in bom.get(product_id, [])
+        ])
+        book_movements(movements)
+
+        increments = defaultdict(Decimal)
+        for product_id, workshop_id, quantity in entries:
+            increments[(workshop_id, product_id)] += quantity
+        increment_product_stock(increments)
+
+    return Response({
+        "message": f"{len(entries)} Fertigungen gebucht.",
+        "results": [
+            {
+                "product_id": product_id,
+                "workshop_id": workshop_id,
+                "quantity": quantity,
+            }
+            for product_id, workshop_id, quantity in entries
+        ]
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def product_stock_view(request, product_id):
@@ -185,30 +303,7 @@ def producible_units_view(request, product_id):
     if not workshop_id:
         return Response({'detail': 'workshop_id is required'}, status=400)
 
-    requirements = ProductMaterial.objects.filter(product_id=product_id)
-    limits = []
-
-    for req in requirements:
-        movements = MaterialMovement.objects.filter(
-            material=req.material,
-            workshop_id=workshop_id
-        )
-
-        total = 0
-        for m in movements:
-            if m.change_type in ['lieferung', 'korrektur', 'transfer']:
-                total += m.quantity
-            elif m.change_type in ['verbrauch', 'verlust']:
-                total -= m.quantity
-
-        if req.quantity_per_unit > 0:
-            limit = total // req.quantity_per_unit
-        else:
-            limit = 0
-
-        limits.append(limit)
-
-    producible = int(min(limits)) if limits else 0
+    producible = possible_units_by_product(workshop_id, [product_id])[product_id]
 
     return Response({
         "product_id": product_id,
@@ -224,40 +319,19 @@ def producible_overview_view(request):
     if not workshop_id:
         return Response({'detail': 'workshop_id is required'}, status=400)
 
-    overview = []
-    products = Product.objects.all()
-
-    for product in products:
-        requirements = ProductMaterial.objects.filter(product=product)
-        limits = []
-
-        for req in requirements:
-            movements = MaterialMovement.objects.filter(
-                material=req.material,
-                workshop_id=workshop_id
-            )
-
-            total = 0
-            for m in movements:
-                if m.change_type in ['lieferung', 'korrektur', 'transfer']:
-                    total += m.quantity
-                elif m.change_type in ['verbrauch', 'verlust']:
-                    total -= m.quantity
-
-            if req.quantity_per_unit > 0:
-                limit = total // req.quantity_per_unit
-            else:
-                limit = 0
-
-            limits.append(limit)
-
-        possible_units = int(min(limits)) if limits else 0
+    products = list(Product.objects.values_list('id', 'bezeichnung'))
+    possible_units = possible_units_by_product(
+        workshop_id, [product_id for product_id, _ in products]
+    )
 
-        overview.append({
-            "product_id": product.id,
-            "product": product.bezeichnung,
-            "possible_units": possible_units
-        })
+    overview = [
+        {
+            "product_id": product_id,
+            "product": bezeichnung,
+            "possible_units": possible_units[product_id]
+        }
+        for product_id, bezeichnung in products
+    ]
 
     return Response(overview)
 
@@ -449,61 +523,22 @@ def product_lifecycle_overview(request):
     if not workshop_id:
         return Response({'detail': 'workshop_id is required'}, status=400)
 
-    result = []
-    products = Product.objects.all()
-
-    for product in products:
-        bestellung_limits = []
-        lager_limits = []
-
-        for req in ProductMaterial.objects.filter(product=product):
-            material = req.material
-            bedarf_pro_einheit = req.quantity_per_unit
-
-            gesamt_bestellt = OrderItem.objects.filter(
-                material=material
-            ).aggregate(total=Sum("quantity"))["total"] or Decimal(0)
-
-            bewegungen = MaterialMovement.objects.filter(
-                material=material,
-                workshop_id=workshop_id
-            )
-
-            lager = sum([
-                m.quantity if m.change_type in ['lieferung', 'korrektur'] else -m.quantity
-                for m in bewegungen
-            ])
-
-            if bedarf_pro_einheit > 0:
-                if lager == 0 and gesamt_bestellt == 0:
-                    limit_bestellung = 0
-                else:
-                    limit_bestellung = (lager + gesamt_bestellt) // bedarf_pro_einheit
-
-                limit_lager = lager // bedarf_pro_einheit
-            else:
-                limit_bestellung = 0
-                limit_lager = 0
-
-            bestellung_limits.append(limit_bestellung)
-            lager_limits.append(limit_lager)
-
-        bestellungen_moeglich = int(min(bestellung_limits)) if bestellung_limits else 0
-        lager_fertigung_moeglich = int(min(lager_limits)) if lager_limits else 0
-
-        try:
-            bestand = ProductStock.objects.get(product=product, workshop_id=workshop_id).bestand
-        except ProductStock.DoesNotExist:
-            bestand = Decimal(0)
+    products = list(Product.objects.values_list('id', 'bezeichnung'))
+    limits = lifecycle_limits_by_product(
+        workshop_id, [product_id for product_id, _ in products]
+    )
 
-        result.append({
-            "product_id": product.id,
-            "product": product.bezeichnung,
-            "bestellungen_moeglich": bestellungen_moeglich,
-            "lager_fertigung_moeglich": lager_fertigung_moeglich,
-            "bestand_fertig": float(bestand),
+    result = [
+        {
+            "product_id": product_id,
+            "product": bezeichnung,
+            "bestellungen_moeglich": limits[product_id]["bestellungen_moeglich"],
+            "lager_fertigung_moeglich": limits[product_id]["lager_fertigung_moeglich"],
+            "bestand_fertig": float(limits[product_id]["bestand_fertig"]),
             "verkauft": 0
-        })
+        }
+        for product_id, bezeichnung in products
+    ]
 
     return Response(result)
 
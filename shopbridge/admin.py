@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EmailTemplate
+from .models import DHLLabel, EmailTemplate
 
 
 @admin.register(EmailTemplate)
@@ -32,3 +32,25 @@ class EmailTemplateAdmin(admin.ModelAdmin):
             'fields': ('is_active', 'is_default')
         }),
     )
+
+
+@admin.register(DHLLabel)
+class DHLLabelAdmin(admin.ModelAdmin):
+    list_display = [
+        'shipment_number',
+        'woocommerce_order_number',
+        'product',
+        'status',
+        'pdf_available',
+        'created_at',
+        'printed_at'
+    ]
+    list_filter = ['status', 'product']
+    search_fields = ['shipment_number', 'woocommerce_order_number', 'reference']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'printed_at', 'deleted_at']
+
+    @admin.display(boolean=True, description='PDF', ordering='has_pdf')
+    def pdf_available(self, obj):
+        # Annotation des Standard-Managers (PDF-Spalte wird nicht geladen)
+        return obj.has_pdf
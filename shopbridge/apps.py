@@ -8,7 +8,9 @@ class ShopbridgeConfig(AppConfig):
     def ready(self):
         """
         Called when the application is ready.
-        Start the WooCommerce cache scheduler for automatic cache refresh.
+        Register the SKU index signal handlers and start the WooCommerce
+        cache scheduler for automatic cache refresh.
         """
+        from . import signals  # noqa: F401
         from .cache_scheduler import start_cache_scheduler
         start_cache_scheduler()
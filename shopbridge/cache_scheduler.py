@@ -1,16 +1,30 @@
 """
 Background scheduler for WooCommerce orders cache refresh.
 Automatically refreshes the orders cache every 5 minutes.
+
+Every gunicorn worker starts a scheduler thread, but only the instance
+holding the leader lease in the shared cache refreshes - WooCommerce is
+polled once per deployment, not once per worker. The lease relies on an
+atomic cache.add() across processes (Redis or database cache, see
+CACHES in settings).
 """
+import socket
 import threading
 import time
 import logging
 import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
 # Scheduler settings
 CACHE_REFRESH_INTERVAL = 60 * 5  # 5 minutes in seconds
+POLL_INTERVAL = 5  # Check leadership and refresh requests every 5 seconds
+LEADER_LEASE_TIMEOUT = 60  # Length of one leadership term
+
+# Shared cache keys (not versioned - must survive invalidation)
+LEADER_KEY = "woocommerce_scheduler_leader"
+REFRESH_REQUEST_KEY = "woocommerce_scheduler_refresh_requested"
 
 # Global scheduler instance
 _scheduler_instance = None
@@ -22,6 +36,10 @@ _refresh_in_progress = False
 _refresh_lock = threading.Lock()
 
 
+def _term_key(term: int) -> str:
+    return f"{LEADER_KEY}:{term}"
+
+
 class WooCommerceCacheScheduler:
     """
     Background scheduler that periodically refreshes WooCommerce orders cache.
@@ -30,6 +48,10 @@ class WooCommerceCacheScheduler:
 
     def __init__(self, interval: int = CACHE_REFRESH_INTERVAL):
         self.interval = interval
+        self.instance_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.is_leader = False
         self._stop_event = threading.Event()
         self._thread = None
         self._running = False
@@ -46,7 +68,8 @@ class WooCommerceCacheScheduler:
         self._thread.start()
         self._running = True
         logger.info(
-            f"WooCommerce cache scheduler started (interval: {self.interval}s)"
+            f"WooCommerce cache scheduler started (interval: {self.interval}s, "
+            f"instance: {self.instance_id})"
         )
 
     def stop(self):
@@ -58,153 +81,158 @@ class WooCommerceCacheScheduler:
         self._refresh_requested.set()  # Wake up if waiting
         if self._thread:
             self._thread.join(timeout=5)
+        self._release_leadership()
         self._running = False
         logger.info("WooCommerce cache scheduler stopped")
 
     def trigger_refresh(self):
-        """Trigger an immediate cache refresh (non-blocking)."""
+        """
+        Trigger an immediate cache refresh (non-blocking).
+
+        The request is stored in the shared cache so the leader picks it up,
+        even if this worker is not the leader.
+        """
+        from django.core.cache import cache
+
+        cache.set(REFRESH_REQUEST_KEY, True, LEADER_LEASE_TIMEOUT)
         self._refresh_requested.set()
         logger.info("WooCommerce cache refresh triggered")
 
-    def _run(self):
-        """Main loop for the background scheduler."""
-        # Immediately refresh cache on startup
-        logger.info("Starting initial WooCommerce cache load...")
-        try:
-            self._refresh_cache()
-        except Exception as e:
-            logger.error(f"Error during initial cache load: {e}")
+    def acquire_leadership(self, now=None) -> bool:
+        """
+        Acquire or keep the leader lease in the shared cache.
 
-        while not self._stop_event.is_set():
-            # Wait for interval or manual trigger
-            triggered = self._refresh_requested.wait(timeout=self.interval)
+        Leadership is split into terms of LEADER_LEASE_TIMEOUT seconds.
+        Every term has its own key, written only once with cache.add(), so
+        there is no read-modify-write renewal another instance could race
+        with. The leader claims the next term during the second half of
+        its own and so stays leader; if it dies, the next unclaimed term
+        goes to the first instance that adds it.
+        """
+        from django.core.cache import cache
 
-            if self._stop_event.is_set():
-                break
+        now = time.time() if now is None else now
+        term = int(now // LEADER_LEASE_TIMEOUT)
+        key = _term_key(term)
 
-            # Clear the trigger flag
-            if triggered:
-                self._refresh_requested.clear()
+        cache.add(key, self.instance_id, LEADER_LEASE_TIMEOUT * 2)
+        is_leader = cache.get(key) == self.instance_id
+        if is_leader and (
+            now - term * LEADER_LEASE_TIMEOUT >= LEADER_LEASE_TIMEOUT / 2
+        ):
+            cache.add(
+                _term_key(term + 1), self.instance_id, LEADER_LEASE_TIMEOUT * 3
+            )
+
+        if is_leader and not self.is_leader:
+            logger.info(
+                f"WooCommerce cache scheduler {self.instance_id} became leader"
+            )
+        self.is_leader = is_leader
+        return is_leader
+
+    def _release_leadership(self, now=None):
+        from django.core.cache import cache
+
+        if self.is_leader:
+            now = time.time() if now is None else now
+            term = int(now // LEADER_LEASE_TIMEOUT)
+            # Term keys never change their value once added - an
+            # instance_id read here cannot belong to anyone else
+            for key in (_term_key(term), _term_key(term + 1)):
+                if cache.get(key) == self.instance_id:
+                    cache.delete(key)
+        self.is_leader = False
+
+    def _run(self):
+        """Main loop for the background scheduler."""
+        from django.core.cache import cache
+
+        next_refresh = 0  # Immediately refresh cache on startup
 
+        while not self._stop_event.is_set():
             try:
-                self._refresh_cache()
+                if self.acquire_leadership():
+                    requested = cache.get(REFRESH_REQUEST_KEY)
+                    if requested:
+                        cache.delete(REFRESH_REQUEST_KEY)
+
+                    if requested or time.monotonic() >= next_refresh:
+                        self._refresh_cache()
+                        next_refresh = time.monotonic() + self.interval
             except Exception as e:
                 logger.error(f"Error refreshing WooCommerce cache: {e}")
+                next_refresh = time.monotonic() + self.interval
+
+            # Wait for next poll or manual trigger
+            if self._refresh_requested.wait(timeout=POLL_INTERVAL):
+                self._refresh_requested.clear()
 
     def _refresh_cache(self):
-        """Refresh all WooCommerce orders caches."""
-        from django.core.cache import cache
+        """
+        Sync WooCommerce orders into the local mirror (WooOrder) and
+        precompute the orders summaries.
+
+        Incremental after the first full sync - see order_sync.sync_orders.
+        Skipped while a manual refresh (refresh=true) is syncing.
+        """
+        from .cache_utils import single_flight
+        from .order_sync import ORDER_SYNC_LOCK_KEY, sync_orders
         from .views import (
             get_wcapi,
-            get_cache_key,
             get_cache_version,
-            CACHE_TIMEOUT_ORDERS,
-            CACHE_KEY_PREFIX
+            refresh_orders_summaries,
         )
-        
-        logger.info("Starting WooCommerce cache refresh...")
-        start_time = time.time()
-        
-        try:
-            wcapi = get_wcapi()
-            cache_version = get_cache_version()
-            
-            # Refresh orders for different status groups
-            status_groups = {
-                "active": ["processing", "pending", "on-hold"],
-                "completed": ["completed"],
-                "other": ["cancelled", "refunded", "failed", "checkout-draft", "trash"]
-            }
-            
-            total_orders = 0
-            
-            for group_name, statuses in status_groups.items():
-                all_orders = []
-                
-                for status in statuses:
-                    page = 1
-                    per_page = 100
-                    
-                    while True:
-                        params = {"status": status, "per_page": per_page, "page": page}
-                        response = wcapi.get("orders", params=params)
-                        
-                        if response.status_code != 200:
-                            logger.warning(
-                                f"Failed to fetch orders for status '{status}' "
-                                f"(page {page}): {response.status_code}"
-                            )
-                            break
-                        
-                        orders_page = response.json()
-                        all_orders.extend(orders_page)
-                        
-                        total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-                        
-                        if page >= total_pages:
-                            break
-                        
-                        page += 1
-                
-                # Cache the orders for this status group
-                cache_key = get_cache_key(f"orders_v{cache_version}", statuses)
-                cache.set(cache_key, all_orders, CACHE_TIMEOUT_ORDERS)
-                total_orders += len(all_orders)
-                
-                logger.debug(f"Cached {len(all_orders)} orders for group '{group_name}'")
-            
-            # Also refresh order stats
-            self._refresh_order_stats(wcapi, cache_version)
-            
-            elapsed = time.time() - start_time
-            logger.info(
-                f"WooCommerce cache refresh completed: {total_orders} orders "
-                f"in {elapsed:.2f}s"
-            )
-            
-        except Exception as e:
-            logger.error(f"Error during cache refresh: {e}")
-            raise
-    
-    def _refresh_order_stats(self, wcapi, cache_version):
-        """Refresh order statistics cache."""
-        from django.core.cache import cache
-        from .views import CACHE_TIMEOUT_ORDERS, CACHE_KEY_PREFIX
-        
-        statuses = [
-            "processing", "pending", "on-hold",
-            "completed", "cancelled", "refunded", "failed",
-            "checkout-draft", "trash"
-        ]
-        
-        stats = {
-            "total": 0,
-            "by_status": {},
-            "active": 0,
-            "completed": 0,
-            "other": 0
-        }
-        
-        for status in statuses:
+
+        with single_flight(ORDER_SYNC_LOCK_KEY) as acquired:
+            if not acquired:
+                logger.info(
+                    "WooCommerce order sync already running - skipping refresh"
+                )
+                return
+
+            logger.info("Starting WooCommerce cache refresh...")
+            start_time = time.time()
+
             try:
-                response = wcapi.get("orders", params={"status": status, "per_page": 1})
-                if response.status_code == 200:
-                    count = int(response.headers.get('X-WP-Total', 0))
-                    stats["by_status"][status] = count
-                    stats["total"] += count
-                    
-                    if status in ["processing", "pending", "on-hold"]:
-                        stats["active"] += count
-                    elif status == "completed":
-                        stats["completed"] += count
-                    else:
-                        stats["other"] += count
+                wcapi = get_wcapi()
+                result = sync_orders(wcapi)
+                cache_version = get_cache_version()
+
+                # Precompute the per-product summaries for the orders view
+                refresh_orders_summaries(cache_version)
+
+                # Also refresh order stats (from the mirror)
+                self._refresh_order_stats(cache_version)
+
+                elapsed = time.time() - start_time
+                logger.info(
+                    f"WooCommerce cache refresh completed ({result['mode']}): "
+                    f"{result['orders']} orders in {elapsed:.2f}s"
+                )
+
             except Exception as e:
-                logger.warning(f"Failed to get count for status '{status}': {e}")
-        
-        cache_key = f"{CACHE_KEY_PREFIX}order_stats_v{cache_version}"
-        cache.set(cache_key, stats, CACHE_TIMEOUT_ORDERS)
-        
+                logger.error(f"Error during cache refresh: {e}")
+                raise
+
+    def _refresh_order_stats(self, cache_version):
+        """Refresh order statistics cache (and its last good copy)."""
+        from .cache_utils import store
+        from .views import (
+            CACHE_TIMEOUT_ORDERS,
+            ORDER_STATS_STALE_KEY,
+            build_order_stats,
+            get_order_stats_cache_key,
+        )
+
+        stats = build_order_stats()
+        store(
+            get_order_stats_cache_key(cache_version),
+            ORDER_STATS_STALE_KEY,
+            stats,
+            CACHE_TIMEOUT_ORDERS
+        )
+
         logger.debug(f"Cached order stats: {stats['total']} total orders")
 
 
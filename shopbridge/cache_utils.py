@@ -0,0 +1,131 @@
+"""
+Stale-while-revalidate for the shopbridge caches.
+
+Every cached value is stored twice: under its versioned key (invalidated
+by invalidate_orders_cache or its TTL) and under an unversioned "last
+good" key that lives much longer. When the versioned key misses, the last
+good value is served immediately - flagged as stale, with its age - while
+a single background rebuild runs. A shared-cache lock (single flight)
+keeps concurrent misses from rebuilding, or hitting the shop API, more
+than once.
+"""
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+STALE_TIMEOUT = 60 * 60 * 24 * 7  # Keep the last good value for a week
+LOCK_TIMEOUT = 60 * 5  # A crashed builder releases the lock after this
+COLD_WAIT_TIMEOUT = 15  # Cold miss: wait this long for another builder
+COLD_WAIT_POLL = 0.2
+
+
+def make_entry(value):
+    """Cache envelope with the build time (for the age indicator)."""
+    return {"value": value, "built_at": time.time()}
+
+
+def entry_age(entry) -> int:
+    return max(0, int(time.time() - entry["built_at"]))
+
+
+def store(key, stale_key, value, timeout):
+    entry = make_entry(value)
+    cache.set(key, entry, timeout)
+    cache.set(stale_key, entry, STALE_TIMEOUT)
+    return entry
+
+
+def _lock_key(key):
+    return f"{key}_lock"
+
+
+@contextmanager
+def single_flight(key, timeout=LOCK_TIMEOUT):
+    """
+    Shared-cache lock - yields True only for the one caller that holds it.
+
+    Callers that do not get the lock must not do the guarded work.
+    """
+    lock_key = _lock_key(key)
+    acquired = cache.add(lock_key, uuid.uuid4().hex, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+
+def run_in_background(func):
+    """Run ``func`` in a daemon thread with its own DB connections."""
+    def target():
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"Background cache rebuild failed: {e}")
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def revalidate(key, stale_key, build, timeout):
+    """
+    Start one background rebuild unless one is already running.
+
+    Returns:
+        bool: True if this call started the rebuild
+    """
+    # Taken here, released by the rebuild - no thread per stale request
+    lock_key = _lock_key(stale_key)
+    if not cache.add(lock_key, uuid.uuid4().hex, LOCK_TIMEOUT):
+        return False
+
+    def rebuild():
+        try:
+            store(key, stale_key, build(), timeout)
+        finally:
+            cache.delete(lock_key)
+
+    run_in_background(rebuild)
+    return True
+
+
+def get_or_revalidate(key, stale_key, build, timeout):
+    """
+    Cached value of ``key``; ``build()`` computes it on a miss.
+
+    Returns:
+        tuple: (value, stale, age_seconds)
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        return (entry["value"], False, entry_age(entry))
+
+    stale_entry = cache.get(stale_key)
+    if stale_entry is not None:
+        revalidate(key, stale_key, build, timeout)
+        return (stale_entry["value"], True, entry_age(stale_entry))
+
+    # Cold miss: one request builds, concurrent ones wait for its result
+    with single_flight(stale_key) as acquired:
+        if acquired:
+            entry = store(key, stale_key, build(), timeout)
+            return (entry["value"], False, 0)
+
+    deadline = time.monotonic() + COLD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(COLD_WAIT_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return (entry["value"], False, entry_age(entry))
+
+    # The other builder failed or is too slow - build it ourselves
+    entry = store(key, stale_key, build(), timeout)
+    return (entry["value"], False, 0)
@@ -1,6 +1,7 @@
 # DHL Parcel DE Shipping Integration
 from .config import DHLConfig
-from .client import DHLClient
+from .client import DHLClient, get_client, reset_clients
 from .shipment_service import ShipmentService
 
-__all__ = ['DHLConfig', 'DHLClient', 'ShipmentService']
+__all__ = ['DHLConfig', 'DHLClient', 'ShipmentService', 'get_client',
+           'reset_clients']
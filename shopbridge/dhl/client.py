@@ -1,9 +1,16 @@
 """DHL API HTTP Client."""
 import base64
+import threading
+from dataclasses import astuple
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import List, Optional, Tuple, Union
+from urllib3.util.retry import Retry
 from .config import DHLConfig
 
+# Query parameters as dict or as list of pairs (repeated names)
+Params = Union[dict, List[Tuple[str, str]]]
+
 
 class DHLClientError(Exception):
     """Custom exception for DHL API errors."""
@@ -18,6 +25,15 @@ class DHLClient:
     """HTTP client for DHL Parcel DE Shipping API."""
     
     TIMEOUT = 30
+    # Keep-alive pool; large enough for the parallel batch requests
+    POOL_MAXSIZE = 10
+    # Retries with exponential backoff (0.5s, 1s, 2s), honoring Retry-After.
+    # Status retries only for idempotent methods - a POST that reached DHL
+    # may already have created a shipment. Connection errors happen before
+    # the request is sent and are retried for every method.
+    RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
     
     def __init__(self, config: DHLConfig):
         self.config = config
@@ -25,7 +41,26 @@ class DHLClient:
         self._setup_session()
     
     def _setup_session(self):
-        """Setup session with authentication headers."""
+        """Setup session with connection pool, retries and auth headers."""
+        retry = Retry(
+            total=self.RETRIES,
+            connect=self.RETRIES,
+            read=self.RETRIES,
+            status=self.RETRIES,
+            backoff_factor=self.BACKOFF_FACTOR,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        
         auth_string = f"{self.config.user}:{self.config.password}"
         auth_bytes = base64.b64encode(auth_string.encode()).decode()
         
@@ -48,7 +83,7 @@ class DHLClient:
         except requests.RequestException as e:
             raise DHLClientError(f"Request failed: {str(e)}")
     
-    def get(self, endpoint: str, params: dict = None) -> dict:
+    def get(self, endpoint: str, params: Params = None) -> dict:
         """Make GET request to DHL API."""
         url = f"{self.config.base_url}{endpoint}"
         
@@ -58,7 +93,7 @@ class DHLClient:
         except requests.RequestException as e:
             raise DHLClientError(f"Request failed: {str(e)}")
     
-    def delete(self, endpoint: str, params: dict = None) -> dict:
+    def delete(self, endpoint: str, params: Params = None) -> dict:
         """Make DELETE request to DHL API."""
         url = f"{self.config.base_url}{endpoint}"
         
@@ -118,3 +153,32 @@ class DHLClient:
         except DHLClientError as e:
             # 400 is expected (missing params), but means auth worked
             return e.status_code == 400
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config: DHLConfig) -> DHLClient:
+    """Process-wide client per configuration.
+
+    Reusing the session keeps its connections alive, so repeated label
+    operations skip the TCP/TLS handshake.
+    """
+    key = (config.base_url, *astuple(config))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = DHLClient(config)
+    return client
+
+
+def reset_clients():
+    """Close and forget all process-wide clients (tests, config changes)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client._session.close()
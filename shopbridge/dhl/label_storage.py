@@ -0,0 +1,149 @@
+"""Content-addressed file storage for DHL label PDFs."""
+import base64
+import binascii
+import hashlib
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+LABEL_DIR = "dhl_labels"
+
+
+def label_path(pdf_bytes: bytes) -> str:
+    """Storage name derived from the SHA-256 of the PDF content."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    return f"{LABEL_DIR}/{digest[:2]}/{digest}.pdf"
+
+
+def store_label_pdf(pdf_bytes: bytes) -> str:
+    """
+    Store raw PDF bytes and return the storage name.
+
+    Identical content maps to the same file, so storing a label twice
+    (e.g. a retried request) writes it only once.
+    """
+    name = label_path(pdf_bytes)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(pdf_bytes))
+    return name
+
+
+def store_label_pdf_base64(label_b64: str) -> str:
+    """Decode a base64 label as returned by the DHL API and store it."""
+    if not label_b64:
+        return ""
+    try:
+        pdf_bytes = base64.b64decode(label_b64, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid label PDF: {e}") from e
+    return store_label_pdf(pdf_bytes)
+
+
+def delete_label_pdf(name: str, exclude_label_id=None):
+    """Delete a stored label unless another label references the same file."""
+    from shopbridge.models import DHLLabel
+
+    if not name:
+        return
+    still_used = DHLLabel.objects.filter(label_pdf=name).exclude(
+        id=exclude_label_id
+    ).exists()
+    if not still_used:
+        default_storage.delete(name)
+
+
+def label_pdf_response(label, as_attachment=False):
+    """
+    Streaming download response for a label PDF.
+
+    With DHL_LABEL_SENDFILE_HEADER set (X-Sendfile or X-Accel-Redirect),
+    the web server sends the file and Python only sets the header.
+    """
+    filename = f"{label.shipment_number}.pdf"
+    disposition = "attachment" if as_attachment else "inline"
+    header = getattr(settings, 'DHL_LABEL_SENDFILE_HEADER', '')
+
+    if header:
+        response = HttpResponse(content_type="application/pdf")
+        if header == "X-Accel-Redirect":
+            prefix = getattr(
+                settings, 'DHL_LABEL_SENDFILE_PREFIX', '/protected-media/'
+            )
+            response[header] = f"{prefix.rstrip('/')}/{label.label_pdf.name}"
+        else:
+            response[header] = label.label_pdf.path
+        response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+        return response
+
+    return FileResponse(
+        label.label_pdf.open("rb"),
+        content_type="application/pdf",
+        as_attachment=as_attachment,
+        filename=filename,
+    )
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink collecting what ZipFile writes."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_labels_zip(labels, on_complete=None):
+    """
+    Yield a ZIP archive of the label PDFs, one file after another.
+
+    Only one label file is open at a time and the archive is sent as it
+    is written, so memory use does not grow with the number of labels.
+    The entries are numbered in the order of ``labels`` (print order).
+    ``on_complete`` runs after the last byte was produced.
+    """
+    buffer = _ChunkBuffer()
+    # PDFs are already compressed - store them as they are
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for position, label in enumerate(labels, start=1):
+            name = f"{position:03d}_{label.shipment_number}.pdf"
+            with label.label_pdf.open("rb") as pdf, \
+                    archive.open(name, "w") as entry:
+                while True:
+                    chunk = pdf.read(64 * 1024)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
+
+    if on_complete is not None:
+        on_complete()
+
+
+def labels_zip_response(labels, filename, on_complete=None):
+    """Streaming download of several labels as one ZIP file."""
+    response = StreamingHttpResponse(
+        (chunk for chunk in iter_labels_zip(labels, on_complete) if chunk),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -1,10 +1,11 @@
 """DHL Shipment Service for label creation."""
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import os
 import logging
 
 from .config import DHLConfig
-from .client import DHLClient, DHLClientError
+from .client import DHLClientError, get_client
 from .models import Shipment, LabelResult, Address, ShipmentDetails
 
 logger = logging.getLogger(__name__)
@@ -14,10 +15,13 @@ class ShipmentService:
     """Service for creating DHL shipments and labels."""
     
     DEFAULT_PROFILE = "STANDARD_GRUPPENPROFIL"
+    # DHL accepts at most 30 shipments per /orders request
+    MAX_SHIPMENTS_PER_REQUEST = 30
+    DEFAULT_BATCH_CONCURRENCY = 4
     
     def __init__(self, config: DHLConfig = None):
         self.config = config or DHLConfig.from_env()
-        self.client = DHLClient(self.config)
+        self.client = get_client(self.config)
         self.shipper_profile = os.getenv("DHL_SHIPPER_PROFILE")
     
     @property
@@ -185,6 +189,57 @@ class ShipmentService:
                 reference=s.reference
             ) for s in shipments]
     
+    def create_labels_batched(
+        self,
+        shipments: List[Shipment],
+        print_format: str = "910-300-400",
+        concurrency: int = None,
+    ) -> List[LabelResult]:
+        """Create many labels in chunks of MAX_SHIPMENTS_PER_REQUEST.
+        
+        The chunks are sent concurrently (at most ``concurrency`` requests
+        at a time, default DHL_BATCH_CONCURRENCY). Returns one result per
+        shipment, in the order of ``shipments``.
+        """
+        size = self.MAX_SHIPMENTS_PER_REQUEST
+        chunks = [
+            shipments[start:start + size]
+            for start in range(0, len(shipments), size)
+        ]
+        if not chunks:
+            return []
+        
+        concurrency = concurrency or int(os.getenv(
+            "DHL_BATCH_CONCURRENCY", self.DEFAULT_BATCH_CONCURRENCY
+        ))
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            chunk_results = list(executor.map(
+                lambda chunk: self._create_chunk(chunk, print_format), chunks
+            ))
+        
+        return [result for results in chunk_results for result in results]
+    
+    def _create_chunk(
+        self,
+        shipments: List[Shipment],
+        print_format: str,
+    ) -> List[LabelResult]:
+        """One /orders request; pads missing items with error results."""
+        try:
+            results = self.create_labels(shipments, print_format)
+        except Exception as e:
+            logger.error(f"DHL batch chunk failed: {e}")
+            results = []
+        
+        # DHL answers per shipment in request order
+        for shipment in shipments[len(results):]:
+            results.append(LabelResult(
+                success=False,
+                error="No result returned",
+                reference=shipment.reference,
+            ))
+        return results[:len(shipments)]
+    
     def delete_shipment(self, shipment_number: str) -> dict:
         """Delete a shipment that has not been manifested yet.
         
@@ -251,26 +306,15 @@ class ShipmentService:
         Returns:
             Dict with status information for each shipment
         """
-        import requests
-        import base64
-        
         # DHL API accepts multiple shipment params with same name
         param_list = [("profile", self.profile)]
         for num in shipment_numbers[:30]:  # Max 30
             param_list.append(("shipment", num))
         
-        url = f"{self.client.config.base_url}/orders"
-        auth_string = f"{self.config.user}:{self.config.password}"
-        auth_bytes = base64.b64encode(auth_string.encode()).decode()
-        
-        headers = {
-            "dhl-api-key": self.config.api_key,
-            "Authorization": f"Basic {auth_bytes}",
-            "Accept": "application/json",
-        }
-        
-        response = requests.delete(url, params=param_list, headers=headers)
-        return response.json()
+        try:
+            return self.client.delete("/orders", params=param_list)
+        except DHLClientError as e:
+            return e.response or {"error": str(e)}
     
     def _parse_response(self, response: dict) -> List[LabelResult]:
         """Parse API response into LabelResult objects."""
@@ -5,11 +5,14 @@ from .views import (
     dhl_config_view,
     dhl_health_check_view,
     dhl_create_label_view,
+    dhl_create_labels_batch_view,
     dhl_validate_address_view,
     dhl_delete_shipment_view,
     dhl_labels_by_order_view,
     dhl_label_pdf_view,
+    dhl_label_download_view,
     dhl_label_mark_printed_view,
+    dhl_labels_print_view,
     dhl_services_view,
 )
 
@@ -34,6 +37,16 @@ urlpatterns = [
         dhl_create_label_view,
         name="dhl-create-label"
     ),
+    path(
+        "labels/batch/",
+        dhl_create_labels_batch_view,
+        name="dhl-create-labels-batch"
+    ),
+    path(
+        "labels/print/",
+        dhl_labels_print_view,
+        name="dhl-labels-print"
+    ),
     path(
         "labels/validate/",
         dhl_validate_address_view,
@@ -49,6 +62,11 @@ urlpatterns = [
         dhl_label_pdf_view,
         name="dhl-label-pdf"
     ),
+    path(
+        "labels/<int:label_id>/pdf/download/",
+        dhl_label_download_view,
+        name="dhl-label-download"
+    ),
     path(
         "labels/<int:label_id>/printed/",
         dhl_label_mark_printed_view,
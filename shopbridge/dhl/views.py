@@ -1,11 +1,19 @@
 """DHL API Views."""
+import base64
+import logging
+
+from django.utils import timezone
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
 from .config import DHLConfig
-from .client import DHLClient, DHLClientError
+from .client import DHLClientError, get_client
+from .label_storage import (
+    label_pdf_response, labels_zip_response, store_label_pdf_base64
+)
 from .shipment_service import ShipmentService
 from .models import Shipment, Address, ShipmentDetails
 from .serializers import (
@@ -15,6 +23,11 @@ from .serializers import (
 )
 from shopbridge.models import DHLLabel
 
+logger = logging.getLogger(__name__)
+
+
+# Maximum number of labels per batch request
+MAX_BATCH_LABELS = 200
 
 # DHL Service definitions with product compatibility
 DHL_SERVICES = [
@@ -103,6 +116,57 @@ DHL_SERVICES = [
 ]
 
 
+def build_shipment(data: dict, service: ShipmentService) -> Shipment:
+    """Build a Shipment from validated CreateLabelRequestSerializer data."""
+    # Build consignee address
+    consignee_data = data['consignee']
+    consignee = Address(
+        name1=consignee_data['name1'],
+        name2=consignee_data.get('name2'),
+        name3=consignee_data.get('name3'),
+        street=consignee_data['street'],
+        house_number=consignee_data['house_number'],
+        postal_code=consignee_data['postal_code'],
+        city=consignee_data['city'],
+        country=consignee_data.get('country', 'DEU'),
+        email=consignee_data.get('email'),
+        phone=consignee_data.get('phone'),
+    )
+    
+    # Build shipper (use provided or default)
+    if 'shipper' in data and data['shipper']:
+        shipper_data = data['shipper']
+        shipper = Address(
+            name1=shipper_data['name1'],
+            street=shipper_data['street'],
+            house_number=shipper_data['house_number'],
+            postal_code=shipper_data['postal_code'],
+            city=shipper_data['city'],
+            country=shipper_data.get('country', 'DEU'),
+        )
+    else:
+        shipper = service.get_default_shipper()
+    
+    # Build shipment details
+    details_data = data['details']
+    details = ShipmentDetails(
+        weight_kg=details_data['weight_kg'],
+        length_cm=details_data.get('length_cm'),
+        width_cm=details_data.get('width_cm'),
+        height_cm=details_data.get('height_cm'),
+    )
+    
+    return Shipment(
+        shipper=shipper,
+        consignee=consignee,
+        details=details,
+        product=data.get('product', 'V01PAK'),
+        reference=data.get('reference'),
+        # Value Added Services
+        services=data.get('services', {}),
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dhl_services_view(request):
@@ -153,7 +217,7 @@ def dhl_health_check_view(request):
     """Check DHL API connection."""
     try:
         config = DHLConfig.from_env()
-        client = DHLClient(config)
+        client = get_client(config)
         is_healthy = client.health_check()
         
         return Response({
@@ -250,57 +314,7 @@ def dhl_create_label_view(request):
     
     data = serializer.validated_data
     service = ShipmentService()
-    
-    # Build consignee address
-    consignee_data = data['consignee']
-    consignee = Address(
-        name1=consignee_data['name1'],
-        name2=consignee_data.get('name2'),
-        name3=consignee_data.get('name3'),
-        street=consignee_data['street'],
-        house_number=consignee_data['house_number'],
-        postal_code=consignee_data['postal_code'],
-        city=consignee_data['city'],
-        country=consignee_data.get('country', 'DEU'),
-        email=consignee_data.get('email'),
-        phone=consignee_data.get('phone'),
-    )
-    
-    # Build shipper (use provided or default)
-    if 'shipper' in data and data['shipper']:
-        shipper_data = data['shipper']
-        shipper = Address(
-            name1=shipper_data['name1'],
-            street=shipper_data['street'],
-            house_number=shipper_data['house_number'],
-            postal_code=shipper_data['postal_code'],
-            city=shipper_data['city'],
-            country=shipper_data.get('country', 'DEU'),
-        )
-    else:
-        shipper = service.get_default_shipper()
-    
-    # Build shipment details
-    details_data = data['details']
-    details = ShipmentDetails(
-        weight_kg=details_data['weight_kg'],
-        length_cm=details_data.get('length_cm'),
-        width_cm=details_data.get('width_cm'),
-        height_cm=details_data.get('height_cm'),
-    )
-    
-    # Get services (Value Added Services)
-    services = data.get('services', {})
-    
-    # Create shipment
-    shipment = Shipment(
-        shipper=shipper,
-        consignee=consignee,
-        details=details,
-        product=data.get('product', 'V01PAK'),
-        reference=data.get('reference'),
-        services=services,
-    )
+    shipment = build_shipment(data, service)
     
     # Get print format
     print_format = data.get('print_format', '910-300-710')
@@ -312,24 +326,43 @@ def dhl_create_label_view(request):
     # Create label
     result = service.create_label(shipment, print_format)
     
-    response_serializer = LabelResultSerializer(result.__dict__)
-    
     if result.success:
+        try:
+            label_pdf = store_label_pdf_base64(result.label_pdf_base64)
+        except ValueError as e:
+            # The shipment exists at DHL - keep the record (without PDF)
+            # so it can still be found and cancelled, and report the error
+            logger.error(
+                f"Invalid label PDF for shipment "
+                f"{result.shipment_number}: {e}"
+            )
+            label_pdf = ''
+            result.success = False
+            result.label_pdf_base64 = None
+            result.error = f"Invalid label PDF from DHL: {e}"
+        
         # Save label to database
-        DHLLabel.objects.create(
+        label = DHLLabel.objects.create(
             shipment_number=result.shipment_number,
             woocommerce_order_id=woocommerce_order_id,
             woocommerce_order_number=woocommerce_order_number,
             product=data.get('product', 'V01PAK'),
             reference=data.get('reference'),
-            label_pdf_base64=result.label_pdf_base64,
+            label_pdf=label_pdf,
             label_format='PDF',
             print_format=print_format,
             routing_code=result.routing_code,
             status='created',
         )
+        response_serializer = LabelResultSerializer(result.__dict__)
+        if not result.success:
+            return Response(
+                {**response_serializer.data, 'label_id': label.pk},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
         return Response(response_serializer.data)
     else:
+        response_serializer = LabelResultSerializer(result.__dict__)
         # Return detailed error information for frontend debugging
         error_response = {
             **response_serializer.data,
@@ -347,6 +380,113 @@ def dhl_create_label_view(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def dhl_create_labels_batch_view(request):
+    """
+    Create many DHL labels at once.
+    
+    Request body: {"labels": [<label request>, ...]} (or the list itself),
+    each entry like for dhl_create_label_view. Entries are grouped by
+    print format and sent to DHL in multi-shipment requests of up to
+    MAX_SHIPMENTS_PER_REQUEST, several requests in parallel. Every entry
+    gets its own result; created labels are saved with one bulk insert.
+    Label PDFs are not returned - use the download endpoint.
+    """
+    entries = request.data
+    if isinstance(entries, dict):
+        entries = entries.get('labels')
+    if not isinstance(entries, list) or not entries:
+        return Response(
+            {"error": "labels must be a non-empty list"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(entries) > MAX_BATCH_LABELS:
+        return Response(
+            {"error": f"At most {MAX_BATCH_LABELS} labels per request"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    service = ShipmentService()
+    results = [None] * len(entries)
+    validated = {}
+    groups = {}  # print_format -> [index, ...]
+    
+    for index, entry in enumerate(entries):
+        serializer = CreateLabelRequestSerializer(data=entry)
+        if not serializer.is_valid():
+            results[index] = {
+                'index': index,
+                'success': False,
+                'error': 'Invalid label data',
+                'validation_errors': serializer.errors,
+            }
+            continue
+        data = serializer.validated_data
+        validated[index] = (data, build_shipment(data, service))
+        groups.setdefault(
+            data.get('print_format', '910-300-710'), []
+        ).append(index)
+    
+    labels = []
+    for print_format, indexes in groups.items():
+        label_results = service.create_labels_batched(
+            [validated[index][1] for index in indexes], print_format
+        )
+        for index, result in zip(indexes, label_results):
+            data = validated[index][0]
+            results[index] = {
+                'index': index,
+                'success': result.success,
+                'shipment_number': result.shipment_number,
+                'routing_code': result.routing_code,
+                'reference': result.reference,
+                'woocommerce_order_id': data.get('woocommerce_order_id'),
+                'warnings': result.warnings,
+                'error': result.error,
+                'validation_errors': result.validation_errors,
+            }
+            if not result.success:
+                continue
+            try:
+                label_pdf = store_label_pdf_base64(result.label_pdf_base64)
+            except ValueError as e:
+                # The shipment exists at DHL - keep its number in the
+                # result so it can be deleted, but fail only this entry
+                logger.error(
+                    f"Invalid label PDF for shipment "
+                    f"{result.shipment_number}: {e}"
+                )
+                results[index].update(success=False, error=str(e))
+                continue
+            labels.append((index, DHLLabel(
+                shipment_number=result.shipment_number,
+                woocommerce_order_id=data.get('woocommerce_order_id'),
+                woocommerce_order_number=data.get(
+                    'woocommerce_order_number'
+                ),
+                product=data.get('product', 'V01PAK'),
+                reference=data.get('reference'),
+                label_pdf=label_pdf,
+                label_format='PDF',
+                print_format=print_format,
+                routing_code=result.routing_code,
+                status='created',
+            )))
+    
+    # Save all created labels with one INSERT
+    DHLLabel.objects.bulk_create([label for _, label in labels])
+    for index, label in labels:
+        results[index]['label_id'] = label.pk
+    
+    created = len(labels)
+    return Response({
+        'results': results,
+        'created': created,
+        'failed': len(entries) - created,
+    })
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def dhl_delete_shipment_view(request, shipment_number):
@@ -357,7 +497,9 @@ def dhl_delete_shipment_view(request, shipment_number):
     if result.get('success'):
         # Mark label as deleted in database
         try:
-            label = DHLLabel.objects.get(shipment_number=shipment_number)
+            label = DHLLabel.objects.with_pdf().get(
+                shipment_number=shipment_number
+            )
             label.mark_as_deleted()
         except DHLLabel.DoesNotExist:
             pass  # Label not in our DB, but deletion at DHL was successful
@@ -374,6 +516,7 @@ def dhl_delete_shipment_view(request, shipment_number):
 @permission_classes([IsAuthenticated])
 def dhl_labels_by_order_view(request, order_id):
     """Get all DHL labels for a WooCommerce order."""
+    # Default manager: PDF column deferred, has_pdf annotated
     labels = DHLLabel.objects.filter(
         woocommerce_order_id=order_id,
         status__in=['created', 'printed']  # Exclude deleted
@@ -391,7 +534,7 @@ def dhl_labels_by_order_view(request, order_id):
             'status': label.status,
             'created_at': label.created_at.isoformat(),
             'printed_at': label.printed_at.isoformat() if label.printed_at else None,
-            'has_pdf': bool(label.label_pdf_base64),
+            'has_pdf': label.has_pdf,
         })
     
     return Response({
@@ -404,42 +547,140 @@ def dhl_labels_by_order_view(request, order_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dhl_label_pdf_view(request, label_id):
-    """Get the PDF data for a specific label."""
+    """
+    Get the PDF data for a specific label (base64 in JSON).
+
+    Prefer dhl_label_download_view - it streams the file without base64.
+    """
     try:
-        label = DHLLabel.objects.get(id=label_id)
+        label = DHLLabel.objects.with_pdf().get(id=label_id)
     except DHLLabel.DoesNotExist:
         return Response(
             {"error": "Label not found"},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    if not label.label_pdf_base64:
+    if not label.label_pdf:
         return Response(
             {"error": "No PDF data available for this label"},
             status=status.HTTP_404_NOT_FOUND
         )
     
+    with label.label_pdf.open('rb') as pdf:
+        label_b64 = base64.b64encode(pdf.read()).decode('ascii')
+    
     return Response({
         'id': label.id,
         'shipment_number': label.shipment_number,
-        'label_b64': label.label_pdf_base64,
+        'label_b64': label_b64,
         'print_format': label.print_format,
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dhl_label_download_view(request, label_id):
+    """
+    Download the label PDF as a file (streamed, or via X-Sendfile).
+
+    ?download=true sends it as attachment instead of inline.
+    """
+    try:
+        label = DHLLabel.objects.with_pdf().get(id=label_id)
+    except DHLLabel.DoesNotExist:
+        return Response(
+            {"error": "Label not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    if not label.label_pdf:
+        return Response(
+            {"error": "No PDF data available for this label"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return label_pdf_response(
+        label,
+        as_attachment=request.query_params.get('download') == 'true'
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def dhl_labels_print_view(request):
+    """
+    Print job: several label PDFs as one streamed ZIP file.
+    
+    Request body: {"label_ids": [1, 2, ...]} (in print order) or
+    {"today": true} for all unprinted labels created today. The labels
+    are read one at a time while the ZIP is sent and marked as printed
+    with a single UPDATE once the archive is complete.
+    """
+    label_ids = request.data.get('label_ids')
+    today = request.data.get('today') is True
+    
+    labels = DHLLabel.objects.with_pdf().exclude(label_pdf='').only(
+        'id', 'shipment_number', 'label_pdf'
+    )
+    if label_ids:
+        if not isinstance(label_ids, list) or not all(
+            isinstance(label_id, int) for label_id in label_ids
+        ):
+            return Response(
+                {"error": "label_ids must be a list of label ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        labels_by_id = {
+            label.id: label for label in labels.filter(id__in=label_ids)
+        }
+        labels = [
+            labels_by_id[label_id] for label_id in dict.fromkeys(label_ids)
+            if label_id in labels_by_id
+        ]
+    elif today:
+        labels = list(labels.filter(
+            status='created',
+            created_at__date=timezone.localdate(),
+        ).order_by('created_at', 'id'))
+    else:
+        return Response(
+            {"error": "label_ids or today is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not labels:
+        return Response(
+            {"error": "No labels with PDF data found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    printed_ids = [label.id for label in labels]
+    
+    def mark_printed():
+        DHLLabel.objects.filter(id__in=printed_ids).mark_printed()
+    
+    response = labels_zip_response(
+        labels,
+        f"dhl-labels-{timezone.localdate().isoformat()}.zip",
+        on_complete=mark_printed,
+    )
+    response['X-Label-Count'] = str(len(labels))
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def dhl_label_mark_printed_view(request, label_id):
     """Mark a label as printed."""
-    try:
-        label = DHLLabel.objects.get(id=label_id)
-    except DHLLabel.DoesNotExist:
+    if not DHLLabel.objects.filter(id=label_id).mark_printed():
         return Response(
             {"error": "Label not found"},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    label.mark_as_printed()
+    label = DHLLabel.objects.only('id', 'status', 'printed_at').get(
+        id=label_id
+    )
     
     return Response({
         'id': label.id,
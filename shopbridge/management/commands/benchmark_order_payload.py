@@ -0,0 +1,95 @@
+import json
+import pickle
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shopbridge.order_sync import PER_PAGE, order_fields_params, project_order
+from shopbridge.views import get_wcapi
+
+
+class Command(BaseCommand):
+    help = (
+        'Vergleicht die Größe gespeicherter WooCommerce-Bestellungen: '
+        'vollständige API-Antwort, lokale Projektion und Abruf mit _fields. '
+        'Gibt Bytes pro Bestellung (JSON/Pickle) und Pickle-Zeit aus.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders', type=int, default=100,
+            help='Anzahl der abzurufenden Bestellungen (Standard: 100)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Wiederholungen der Pickle-Messung (Standard: 20)'
+        )
+
+    def handle(self, *args, **options):
+        wcapi = get_wcapi()
+        full = self.fetch(wcapi, options['orders'], {})
+        if not full:
+            raise CommandError('Keine Bestellungen gefunden.')
+        trimmed = self.fetch(wcapi, len(full), order_fields_params())
+
+        variants = {
+            'Vollständig (API)': full,
+            'Projektion (lokal)': [project_order(order) for order in full],
+            'Abruf mit _fields': [project_order(order) for order in trimmed],
+        }
+        results = {
+            name: self.measure(orders, options['repeat'])
+            for name, orders in variants.items()
+        }
+        self.report(len(full), results)
+
+    def fetch(self, wcapi, count, extra_params):
+        orders = []
+        page = 1
+        while len(orders) < count:
+            response = wcapi.get("orders", params={
+                "status": "any",
+                "per_page": min(PER_PAGE, count),
+                "page": page,
+                **extra_params,
+            })
+            if response.status_code != 200:
+                raise CommandError(
+                    f'WooCommerce-Fehler {response.status_code}: '
+                    f'{response.text[:200]}'
+                )
+            batch = response.json()
+            orders.extend(batch)
+            if page >= int(response.headers.get('X-WP-TotalPages', 1)):
+                break
+            page += 1
+        return orders[:count]
+
+    def measure(self, orders, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            pickled = pickle.dumps(orders, pickle.HIGHEST_PROTOCOL)
+            samples.append((time.perf_counter() - started) * 1000)
+        return {
+            'json': len(json.dumps(orders).encode()) / len(orders),
+            'pickle': len(pickled) / len(orders),
+            'pickle_ms': statistics.median(samples),
+        }
+
+    def report(self, count, results):
+        baseline = results['Vollständig (API)']
+        self.stdout.write(f'{count} Bestellungen')
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'Variante':<22} {'JSON B/Best.':>14} {'Pickle B/Best.':>16} "
+            f"{'Pickle':>10} {'Anteil':>8}"
+        )
+        for name, result in results.items():
+            share = result['pickle'] / baseline['pickle'] * 100
+            self.stdout.write(
+                f"{name:<22} {result['json']:>14.0f} {result['pickle']:>16.0f} "
+                f"{result['pickle_ms']:>8.2f}ms {share:>7.1f}%"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark abgeschlossen.'))
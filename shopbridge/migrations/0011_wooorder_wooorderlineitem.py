@@ -0,0 +1,62 @@
+# Generated by Django 5.2 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopbridge', '0010_migrate_warenpost_to_kleinpaket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WooOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='WooCommerce Bestellungs-ID')),
+                ('number', models.CharField(blank=True, max_length=50)),
+                ('status', models.CharField(max_length=30)),
+                ('currency', models.CharField(blank=True, max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('customer_name', models.CharField(blank=True, max_length=255)),
+                ('billing_country', models.CharField(blank=True, max_length=5)),
+                ('billing_city', models.CharField(blank=True, max_length=255)),
+                ('shipping_country', models.CharField(blank=True, max_length=5)),
+                ('date_created', models.DateTimeField(blank=True, null=True)),
+                ('date_modified', models.DateTimeField(blank=True, null=True)),
+                ('data', models.JSONField(default=dict, help_text='Bestellung wie von der WooCommerce-API geliefert')),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'WooCommerce Bestellung',
+                'verbose_name_plural': 'WooCommerce Bestellungen',
+                'ordering': ['-date_created', '-id'],
+                'indexes': [
+                    models.Index(fields=['status', 'date_created'], name='wooorder_status_created_idx'),
+                    models.Index(fields=['date_created'], name='wooorder_created_idx'),
+                    models.Index(fields=['synced_at'], name='wooorder_synced_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='WooOrderLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_item_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('sku', models.CharField(blank=True, max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='shopbridge.wooorder')),
+            ],
+            options={
+                'verbose_name': 'WooCommerce Bestellposition',
+                'verbose_name_plural': 'WooCommerce Bestellpositionen',
+                'ordering': ['order', 'id'],
+                'indexes': [
+                    models.Index(fields=['sku'], name='woolineitem_sku_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopbridge', '0011_wooorder_wooorderlineitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wooorder',
+            name='has_details',
+            field=models.BooleanField(default=False, help_text='data enthält die vollständige Bestellung (Detailansicht)'),
+        ),
+        migrations.AlterField(
+            model_name='wooorder',
+            name='data',
+            field=models.JSONField(default=dict, help_text='Bestellung wie von der WooCommerce-API geliefert - beim Abgleich nur die kompakte Projektion (siehe has_details)'),
+        ),
+    ]
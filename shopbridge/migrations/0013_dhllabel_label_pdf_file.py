@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-17 12:00
+
+import base64
+import binascii
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def label_path(pdf_bytes):
+    """Dateiname = SHA-256 des Inhalts (wie shopbridge/dhl/label_storage.py)."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    return f"dhl_labels/{digest[:2]}/{digest}.pdf"
+
+
+def move_labels_to_storage(apps, schema_editor):
+    """
+    Schreibt die Base64-Labels als PDF-Dateien in den Label-Speicher.
+
+    Die Base64-Spalte bleibt erhalten - sie wird erst in 0014 entfernt,
+    nachdem geprüft wurde, dass alle Dateien im Speicher liegen. Bereits
+    übertragene Labels werden übersprungen, die Migration kann also
+    gefahrlos erneut laufen.
+    """
+    DHLLabel = apps.get_model('shopbridge', 'DHLLabel')
+    labels = DHLLabel.objects.exclude(label_pdf_base64='').filter(
+        label_pdf=''
+    ).only('id', 'label_pdf_base64')
+    moved = 0
+    for label in labels.iterator(chunk_size=100):
+        try:
+            pdf_bytes = base64.b64decode(label.label_pdf_base64)
+        except (binascii.Error, ValueError):
+            print(f"  DHLLabel {label.id}: ungültiges Base64, übersprungen")
+            continue
+        name = label_path(pdf_bytes)
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(pdf_bytes))
+        DHLLabel.objects.filter(id=label.id).update(label_pdf=name)
+        moved += 1
+
+    if moved:
+        print(f"  Moved {moved} DHL label PDF(s) to file storage")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopbridge', '0012_wooorder_has_details'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dhllabel',
+            name='label_pdf',
+            field=models.FileField(blank=True, help_text='Das PDF-Label (Datei, benannt nach SHA-256 des Inhalts)', max_length=255, upload_to='dhl_labels/', verbose_name='Label PDF'),
+        ),
+        migrations.AlterField(
+            model_name='dhllabel',
+            name='label_pdf_base64',
+            field=models.TextField(blank=True, default='', help_text='Das PDF-Label in Base64-Kodierung', verbose_name='Label PDF (Base64)'),
+        ),
+        # Die Base64-Spalte bleibt als Quelle erhalten (siehe 0014)
+        migrations.RunPython(
+            move_labels_to_storage,
+            reverse_code=migrations.RunPython.noop
+        ),
+    ]
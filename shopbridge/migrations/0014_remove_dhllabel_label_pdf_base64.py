@@ -0,0 +1,82 @@
+# Generated by Django 5.2 on 2026-10-17 12:00
+
+import base64
+import binascii
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+
+def label_path(pdf_bytes):
+    """Dateiname = SHA-256 des Inhalts (wie shopbridge/dhl/label_storage.py)."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    return f"dhl_labels/{digest[:2]}/{digest}.pdf"
+
+
+def verify_label_files(apps, schema_editor):
+    """
+    Prüft vor dem Entfernen der Base64-Spalte, dass jedes Label-PDF im
+    Speicher liegt.
+
+    Fehlende Dateien (z.B. weil 0013 ohne eingehängte Persistent Disk lief)
+    werden aus der Base64-Spalte neu geschrieben. Lässt sich ein Label
+    nicht wiederherstellen, bricht die Migration ab - die Spalte ist dann
+    die einzige Kopie.
+    """
+    DHLLabel = apps.get_model('shopbridge', 'DHLLabel')
+    labels = DHLLabel.objects.exclude(label_pdf_base64='').only(
+        'id', 'label_pdf', 'label_pdf_base64'
+    )
+    restored = 0
+    missing = []
+    for label in labels.iterator(chunk_size=100):
+        if label.label_pdf and default_storage.exists(label.label_pdf.name):
+            continue
+        try:
+            pdf_bytes = base64.b64decode(label.label_pdf_base64)
+        except (binascii.Error, ValueError):
+            missing.append(label.id)
+            continue
+        name = label_path(pdf_bytes)
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(pdf_bytes))
+        DHLLabel.objects.filter(id=label.id).update(label_pdf=name)
+        restored += 1
+
+    if restored:
+        print(f"  Restored {restored} missing DHL label PDF(s) from base64")
+    if missing:
+        raise RuntimeError(
+            f"DHL-Labels {missing} haben kein PDF im Speicher und ungültige "
+            f"Base64-Daten - label_pdf_base64 wird nicht entfernt."
+        )
+
+
+def restore_labels_from_storage(apps, schema_editor):
+    DHLLabel = apps.get_model('shopbridge', 'DHLLabel')
+    for label in DHLLabel.objects.exclude(label_pdf='').only(
+        'id', 'label_pdf'
+    ).iterator(chunk_size=100):
+        with default_storage.open(label.label_pdf.name, 'rb') as pdf:
+            label_b64 = base64.b64encode(pdf.read()).decode('ascii')
+        DHLLabel.objects.filter(id=label.id).update(label_pdf_base64=label_b64)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopbridge', '0013_dhllabel_label_pdf_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            verify_label_files,
+            reverse_code=restore_labels_from_storage
+        ),
+        migrations.RemoveField(
+            model_name='dhllabel',
+            name='label_pdf_base64',
+        ),
+    ]
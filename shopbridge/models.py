@@ -1,8 +1,15 @@
 import re
+from functools import lru_cache
+
 from django.db import models
 from django.conf import settings
 
 
+# Precompiled patterns for normalize_sku
+_VARIANT_SUFFIX_RE = re.compile(r'-(LEFT|RIGHT|[0-9]+|SL)$')
+_E_SUFFIX_RE = re.compile(r'-E$')
+
+
 def normalize_sku(sku):
     """
     Normalize WooCommerce SKU to match Prodflux artikelnummer/product_identifier.
@@ -11,12 +18,19 @@ def normalize_sku(sku):
     This function is used for matching WooCommerce SKUs to both:
     - Prodflux products (artikelnummer)
     - Product manuals (product_identifier)
+
+    Results are memoized per process (the set of SKUs is small and the
+    normalization does not depend on database state).
     """
     if not sku:
         return None
+    return _normalize_sku(sku)
+
 
+@lru_cache(maxsize=4096)
+def _normalize_sku(sku):
     # Remove variant suffixes: -LEFT, -RIGHT, -1, -2, -3, -SL, etc.
-    normalized = re.sub(r'-(LEFT|RIGHT|[0-9]+|SL)$', '', sku.upper())
+    normalized = _VARIANT_SUFFIX_RE.sub('', sku.upper())
 
     # Fix underscore to hyphen
     normalized = normalized.replace('_', '-')
@@ -27,7 +41,7 @@ def normalize_sku(sku):
     # SD-GENERIC-E-DS -> SD-GENERIC-DS
     normalized = normalized.replace('-E-DS', '-DS')
     # SD-KRT2-E -> SD-KRT2, SD-ATR833-E -> SD-ATR833, etc.
-    normalized = re.sub(r'-E$', '', normalized)
+    normalized = _E_SUFFIX_RE.sub('', normalized)
     # SD-ATR833-A (angled) stays as is - no change needed
 
     return normalized
@@ -233,11 +247,42 @@ class OrderSerialNumber(models.Model):
         return f"#{self.woocommerce_order_number} - {self.serial_number}"
 
 
+class DHLLabelQuerySet(models.QuerySet):
+    """
+    Abfragen für DHL-Labels.
+
+    Der Standard-Manager lädt die PDF-Spalte nicht mit (defer) und liefert
+    ``has_pdf`` als Datenbank-Annotation - Listen kommen so ohne PDF-Daten
+    aus. Wer das PDF braucht, nutzt ``with_pdf()``.
+    """
+
+    def with_has_pdf(self):
+        return self.annotate(has_pdf=models.ExpressionWrapper(
+            ~models.Q(label_pdf=''), output_field=models.BooleanField()
+        ))
+
+    def with_pdf(self):
+        """Hebt das Zurückstellen der PDF-Spalte auf."""
+        return self.defer(None)
+
+    def mark_printed(self):
+        """Markiert alle Labels der Abfrage mit einem UPDATE als gedruckt."""
+        from django.utils import timezone
+        return self.update(status='printed', printed_at=timezone.now())
+
+
+class DHLLabelManager(models.Manager.from_queryset(DHLLabelQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer('label_pdf').with_has_pdf()
+
+
 class DHLLabel(models.Model):
     """
     DHL Versandlabels für WooCommerce-Bestellungen.
     
     Speichert die Sendungsnummer, das Label-PDF und Metadaten.
+    Das PDF liegt als Datei im inhaltsadressierten Label-Speicher
+    (siehe shopbridge/dhl/label_storage.py).
     """
     
     PRODUCT_CHOICES = [
@@ -290,9 +335,12 @@ class DHLLabel(models.Model):
     )
     
     # Label-Daten
-    label_pdf_base64 = models.TextField(
-        verbose_name='Label PDF (Base64)',
-        help_text='Das PDF-Label in Base64-Kodierung'
+    label_pdf = models.FileField(
+        upload_to='dhl_labels/',
+        max_length=255,
+        blank=True,
+        verbose_name='Label PDF',
+        help_text='Das PDF-Label (Datei, benannt nach SHA-256 des Inhalts)'
     )
     label_format = models.CharField(
         max_length=20,
@@ -324,6 +372,8 @@ class DHLLabel(models.Model):
     printed_at = models.DateTimeField(blank=True, null=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
     
+    objects = DHLLabelManager()
+    
     class Meta:
         verbose_name = 'DHL Label'
         verbose_name_plural = 'DHL Labels'
@@ -351,10 +401,13 @@ class DHLLabel(models.Model):
     def mark_as_deleted(self):
         """Markiert das Label als gelöscht (ohne DB-Eintrag zu löschen)."""
         from django.utils import timezone
+        from .dhl.label_storage import delete_label_pdf
+        pdf_name = self.label_pdf.name
         self.status = 'deleted'
         self.deleted_at = timezone.now()
-        self.label_pdf_base64 = ''  # PDF nicht mehr speichern
-        self.save(update_fields=['status', 'deleted_at', 'label_pdf_base64'])
+        self.label_pdf = ''  # PDF nicht mehr speichern
+        self.save(update_fields=['status', 'deleted_at', 'label_pdf'])
+        delete_label_pdf(pdf_name, exclude_label_id=self.id)
 
 
 class ShippingCountryConfig(models.Model):
@@ -560,11 +613,12 @@ class ProductManual(models.Model):
         """
         # Normalisiere die SKU für besseres Matching
         # z.B. SD-KRT2-E-1 -> SD-KRT2, SD-AR620X-E-NG-LEFT -> SD-AR620X-NG
-        normalized = normalize_sku(product_identifier)
+        # (memoisiert, gemeinsam mit dem SKU-Index der Bestellübersicht)
+        identifier = normalize_sku(product_identifier) or product_identifier
         
         # Versuche erst exaktes Match mit normalisierter SKU
         manuals = cls.objects.filter(
-            product_identifier__iexact=normalized if normalized else product_identifier,
+            product_identifier__iexact=identifier,
             language=language,
             is_active=True,
             applies_to_all=False
@@ -574,7 +628,7 @@ class ProductManual(models.Model):
         if not manuals.exists():
             # Suche nach Produkt (case-insensitive Teilmatch)
             manuals = cls.objects.filter(
-                product_identifier__icontains=normalized if normalized else product_identifier,
+                product_identifier__icontains=identifier,
                 language=language,
                 is_active=True,
                 applies_to_all=False
@@ -583,14 +637,14 @@ class ProductManual(models.Model):
         # Fallback auf Englisch
         if not manuals.exists() and language != 'en':
             manuals = cls.objects.filter(
-                product_identifier__iexact=normalized if normalized else product_identifier,
+                product_identifier__iexact=identifier,
                 language='en',
                 is_active=True,
                 applies_to_all=False
             )
             if not manuals.exists():
                 manuals = cls.objects.filter(
-                    product_identifier__icontains=normalized if normalized else product_identifier,
+                    product_identifier__icontains=identifier,
                     language='en',
                     is_active=True,
                     applies_to_all=False
@@ -645,3 +699,82 @@ class ProductManual(models.Model):
         unique_manuals.sort(key=lambda m: (m.order, m.title))
         
         return unique_manuals
+
+
+class WooOrder(models.Model):
+    """
+    Lokaler Spiegel einer WooCommerce-Bestellung.
+
+    Wird vom Cache-Scheduler fortgeschrieben (siehe shopbridge/order_sync.py),
+    damit Bestellübersichten ohne Aufruf der WooCommerce-API auskommen.
+    Der Primärschlüssel ist die WooCommerce-Bestellungs-ID.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='WooCommerce Bestellungs-ID'
+    )
+    number = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=30)
+    currency = models.CharField(max_length=10, blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    customer_name = models.CharField(max_length=255, blank=True)
+    billing_country = models.CharField(max_length=5, blank=True)
+    billing_city = models.CharField(max_length=255, blank=True)
+    shipping_country = models.CharField(max_length=5, blank=True)
+    date_created = models.DateTimeField(null=True, blank=True)
+    date_modified = models.DateTimeField(null=True, blank=True)
+    data = models.JSONField(
+        default=dict,
+        help_text=(
+            'Bestellung wie von der WooCommerce-API geliefert - beim '
+            'Abgleich nur die kompakte Projektion (siehe has_details)'
+        )
+    )
+    has_details = models.BooleanField(
+        default=False,
+        help_text='data enthält die vollständige Bestellung (Detailansicht)'
+    )
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'WooCommerce Bestellung'
+        verbose_name_plural = 'WooCommerce Bestellungen'
+        ordering = ['-date_created', '-id']
+        indexes = [
+            models.Index(
+                fields=['status', 'date_created'],
+                name='wooorder_status_created_idx'
+            ),
+            models.Index(
+                fields=['date_created'], name='wooorder_created_idx'
+            ),
+            models.Index(fields=['synced_at'], name='wooorder_synced_idx'),
+        ]
+
+    def __str__(self):
+        return f"WC #{self.number or self.id} ({self.status})"
+
+
+class WooOrderLineItem(models.Model):
+    """Position einer gespiegelten WooCommerce-Bestellung."""
+    order = models.ForeignKey(
+        WooOrder,
+        related_name='line_items',
+        on_delete=models.CASCADE
+    )
+    line_item_id = models.BigIntegerField()
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=100, blank=True)
+    quantity = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'WooCommerce Bestellposition'
+        verbose_name_plural = 'WooCommerce Bestellpositionen'
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['sku'], name='woolineitem_sku_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.sku or self.name}"
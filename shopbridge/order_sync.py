@@ -0,0 +1,301 @@
+"""
+Synchronisation der WooCommerce-Bestellungen in den lokalen Spiegel
+(WooOrder/WooOrderLineItem).
+
+Nach dem ersten vollständigen Abgleich werden nur noch Bestellungen
+abgerufen, die seit dem letzten erfolgreichen Abgleich geändert wurden.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import WooOrder, WooOrderLineItem
+
+logger = logging.getLogger(__name__)
+
+FULL_SYNC_INTERVAL = 60 * 60 * 24  # Full re-fetch once a day (deletions)
+SYNC_OVERLAP = 60  # Re-request the last minute to tolerate clock skew
+SAVE_BATCH_SIZE = 500
+PER_PAGE = 100  # Maximum allowed by WooCommerce API
+
+# Shared cache keys (not versioned - must survive invalidation)
+LAST_SYNC_KEY = "woocommerce_last_sync"
+LAST_FULL_SYNC_KEY = "woocommerce_last_full_sync"
+# Single-flight lock: at most one sync (scheduler or refresh=true) at a time
+ORDER_SYNC_LOCK_KEY = "woocommerce_order_sync"
+
+# Status groups used by the orders overview
+STATUS_GROUPS = {
+    "active": ["processing", "pending", "on-hold"],
+    "completed": ["completed"],
+    "other": ["cancelled", "refunded", "failed", "checkout-draft", "trash"]
+}
+ALL_STATUSES = [
+    status for statuses in STATUS_GROUPS.values() for status in statuses
+]
+
+# Compact projection stored by the sync - everything the orders overview
+# reads. meta_data, _links, tax_lines, shipping_lines etc. are dropped;
+# the detail view loads the full order on demand (WooOrder.has_details).
+ORDER_FIELDS = (
+    "id", "number", "status", "currency", "total", "billing", "shipping",
+    "date_created", "date_created_gmt", "date_modified_gmt", "line_items",
+)
+BILLING_FIELDS = ("first_name", "last_name", "country", "city")
+SHIPPING_FIELDS = ("country",)
+LINE_ITEM_FIELDS = ("id", "name", "sku", "quantity", "total")
+
+
+def parse_wc_datetime(value):
+    """Parse a WooCommerce *_gmt timestamp (naive ISO, UTC)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value or 0))
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def _pick(data, fields):
+    return {field: data[field] for field in fields if field in data}
+
+
+def project_order(order):
+    """Reduce a raw WooCommerce order to the compact ORDER_FIELDS record."""
+    projected = _pick(order, ORDER_FIELDS)
+    projected["billing"] = _pick(order.get("billing") or {}, BILLING_FIELDS)
+    projected["shipping"] = _pick(order.get("shipping") or {}, SHIPPING_FIELDS)
+    projected["line_items"] = [
+        _pick(item, LINE_ITEM_FIELDS) for item in order.get("line_items") or []
+    ]
+    return projected
+
+
+def order_fields_params():
+    """
+    ``_fields`` query parameter limiting the API response to ORDER_FIELDS
+    (WOOCOMMERCE_REQUEST_ORDER_FIELDS, enabled by default).
+    """
+    if not getattr(settings, 'WOOCOMMERCE_REQUEST_ORDER_FIELDS', True):
+        return {}
+    return {"_fields": ",".join(ORDER_FIELDS)}
+
+
+def get_fetch_concurrency():
+    """Maximum number of parallel WooCommerce page requests."""
+    return max(1, int(getattr(settings, 'WOOCOMMERCE_FETCH_CONCURRENCY', 4)))
+
+
+def _fetch_page(wcapi, params, page):
+    """
+    Fetch one page of an orders query.
+
+    Returns (orders, total_pages). Raises RuntimeError on API errors - a
+    partial result must never replace the mirror or advance the sync
+    timestamp.
+    """
+    response = wcapi.get(
+        "orders", params={**params, "per_page": PER_PAGE, "page": page}
+    )
+
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"Failed to fetch orders {params} (page {page}): "
+            f"{response.status_code}"
+        )
+
+    return (
+        response.json(),
+        int(response.headers.get('X-WP-TotalPages', 1))
+    )
+
+
+def fetch_order_queries(wcapi, queries, concurrency=None):
+    """
+    Fetch all pages of several independent orders queries concurrently.
+
+    The first page of every query is requested in parallel; once
+    X-WP-TotalPages is known, all remaining pages follow in parallel
+    through the same bounded thread pool. Results keep query and page
+    order, so the merged lists are deterministic.
+
+    Returns:
+        list: One list of orders per query, in the order of ``queries``
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    concurrency = concurrency or get_fetch_concurrency()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        first_pages = list(executor.map(
+            lambda query: _fetch_page(wcapi, query, 1), queries
+        ))
+        remaining = [
+            (index, page)
+            for index, (_, total_pages) in enumerate(first_pages)
+            for page in range(2, total_pages + 1)
+        ]
+        pages = list(executor.map(
+            lambda job: _fetch_page(wcapi, queries[job[0]], job[1])[0],
+            remaining
+        ))
+
+    results = [list(orders) for orders, _ in first_pages]
+    for (index, _), orders in zip(remaining, pages):
+        results[index].extend(orders)
+    return results
+
+
+def fetch_orders(wcapi, params, concurrency=None):
+    """Fetch all pages of one orders query (pages in parallel)."""
+    return fetch_order_queries(wcapi, [params], concurrency)[0]
+
+
+def save_orders(orders, synced_at=None, details=False):
+    """
+    Upsert WooCommerce orders (raw API JSON) into the mirror by order id.
+
+    Only the compact projection (see project_order) is stored unless
+    ``details`` is set, i.e. ``orders`` are complete single-order
+    responses. The line items of every saved order are replaced.
+
+    Returns:
+        int: Number of saved orders
+    """
+    synced_at = synced_at or timezone.now()
+    orders = list({order["id"]: order for order in orders}.values())
+
+    for start in range(0, len(orders), SAVE_BATCH_SIZE):
+        batch = orders[start:start + SAVE_BATCH_SIZE]
+        rows = []
+        items = []
+        for order in batch:
+            billing = order.get("billing") or {}
+            shipping = order.get("shipping") or {}
+            customer_name = (
+                f"{billing.get('first_name', '')} "
+                f"{billing.get('last_name', '')}"
+            ).strip()
+            rows.append(WooOrder(
+                id=order["id"],
+                number=str(order.get("number") or ""),
+                status=order.get("status", ""),
+                currency=order.get("currency", ""),
+                total=_decimal(order.get("total")),
+                customer_name=customer_name[:255],
+                billing_country=billing.get("country", "") or "",
+                billing_city=(billing.get("city", "") or "")[:255],
+                shipping_country=shipping.get("country", "") or "",
+                date_created=parse_wc_datetime(order.get("date_created_gmt")),
+                date_modified=parse_wc_datetime(
+                    order.get("date_modified_gmt")
+                ),
+                data=order if details else project_order(order),
+                has_details=details,
+                synced_at=synced_at,
+            ))
+            for item in order.get("line_items") or []:
+                items.append(WooOrderLineItem(
+                    order_id=order["id"],
+                    line_item_id=item.get("id") or 0,
+                    name=(item.get("name") or "")[:255],
+                    sku=(item.get("sku") or "")[:100],
+                    quantity=item.get("quantity") or 0,
+                    total=_decimal(item.get("total")),
+                ))
+
+        with transaction.atomic():
+            WooOrder.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=[
+                    'number', 'status', 'currency', 'total', 'customer_name',
+                    'billing_country', 'billing_city', 'shipping_country',
+                    'date_created', 'date_modified', 'data', 'has_details',
+                    'synced_at',
+                ],
+            )
+            WooOrderLineItem.objects.filter(
+                order_id__in=[row.id for row in rows]
+            ).delete()
+            WooOrderLineItem.objects.bulk_create(items)
+
+    return len(orders)
+
+
+def sync_orders(wcapi, force_full=False):
+    """
+    Bring the order mirror up to date with WooCommerce.
+
+    Runs incrementally (only orders modified since the last successful
+    sync) unless no sync happened yet, the mirror is empty, the last full
+    sync is older than FULL_SYNC_INTERVAL or ``force_full`` is set. A full
+    sync also removes orders that no longer exist in WooCommerce.
+
+    Returns:
+        dict: {"mode": "full"|"incremental", "orders": int}
+    """
+    sync_started = timezone.now()
+    last_sync = cache.get(LAST_SYNC_KEY)
+    last_full_sync = cache.get(LAST_FULL_SYNC_KEY)
+    incremental = (
+        not force_full and
+        last_sync is not None and
+        last_full_sync is not None and
+        (sync_started - last_full_sync).total_seconds() < FULL_SYNC_INTERVAL
+        and WooOrder.objects.exists()
+    )
+
+    fields = order_fields_params()
+    if incremental:
+        modified_after = last_sync - timedelta(seconds=SYNC_OVERLAP)
+        # "any" excludes trashed orders - query them separately
+        results = fetch_order_queries(wcapi, [
+            {
+                "status": status,
+                "modified_after": modified_after.isoformat(),
+                "dates_are_gmt": "true",
+                **fields,
+            }
+            for status in ("any", "trash")
+        ])
+        orders = [order for result in results for order in result]
+        saved = save_orders(orders, synced_at=sync_started)
+    else:
+        results = fetch_order_queries(wcapi, [
+            {"status": status, **fields} for status in ALL_STATUSES
+        ])
+        orders = [order for result in results for order in result]
+        saved = save_orders(orders, synced_at=sync_started)
+        # Orders not seen in a full sync were deleted in WooCommerce
+        WooOrder.objects.filter(synced_at__lt=sync_started).delete()
+        cache.set(LAST_FULL_SYNC_KEY, sync_started, None)
+
+    cache.set(LAST_SYNC_KEY, sync_started, None)
+
+    mode = "incremental" if incremental else "full"
+    logger.debug(f"WooCommerce order sync ({mode}): {saved} orders saved")
+    return {"mode": mode, "orders": saved}
+
+
+def get_last_sync():
+    """Zeitpunkt des letzten erfolgreichen Abgleichs (oder None)."""
+    return cache.get(LAST_SYNC_KEY)
@@ -0,0 +1,25 @@
+# shopbridge/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.models import Product
+
+from .sku_index import invalidate_sku_index
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_sku_index_on_product_change(sender, raw=False, **kwargs):
+    """
+    Verwirft den SKU-Index sofort und noch einmal nach dem Commit.
+
+    Sofort, damit der eigene Prozess die Änderung sieht; nach dem Commit,
+    damit ein zwischenzeitlich aus den alten Daten gebauter Index anderer
+    Worker nicht gültig bleibt.
+    """
+    if raw:
+        return
+    invalidate_sku_index()
+    transaction.on_commit(invalidate_sku_index)
@@ -0,0 +1,110 @@
+"""
+Prozessweiter Index für die Zuordnung von WooCommerce-SKUs zu
+Prodflux-Produkten.
+
+Der Index wird einmal pro Prozess aus der Produkttabelle aufgebaut und
+erst neu geladen, wenn sich das Versions-Token im gemeinsamen Cache ändert
+(siehe shopbridge/signals.py). So sehen auch andere Worker-Prozesse
+Änderungen an Produkten. Das Token ist eine zufällige UUID, die sich nie
+wiederholt - auch nach Ablauf oder Leeren des Caches wird ein alter Index
+nicht fälschlich wieder als aktuell angesehen.
+"""
+import threading
+import uuid
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from .models import normalize_sku
+
+# Shared cache key (not versioned - new token on every Product change)
+SKU_INDEX_VERSION_KEY = "woocommerce_sku_index_version"
+# Resolved WooCommerce SKUs memoized per index
+RESOLVE_CACHE_SIZE = 4096
+
+_lock = threading.Lock()
+_index = None
+
+
+class SkuIndex:
+    """
+    Mapping {sku_pattern: (product_id, product_name)} plus a bounded LRU
+    memo of already resolved WooCommerce SKUs.
+    """
+
+    def __init__(self, mapping, version):
+        self.mapping = mapping
+        self.version = version
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    @classmethod
+    def build(cls, version):
+        from products.models import Product
+
+        mapping = {}
+        for product_id, art, name in Product.objects.values_list(
+            'id', 'artikelnummer', 'bezeichnung'
+        ):
+            mapping[art] = (product_id, name)
+            # Also add with SD- prefix if not present
+            if not art.startswith("SD-"):
+                mapping[f"SD-{art}"] = (product_id, name)
+        return cls(mapping, version)
+
+    def _resolve(self, wc_sku):
+        """
+        Resolve a WooCommerce SKU (memoized as ``resolve``).
+
+        Returns:
+            tuple: (product_id, product_name, matched_by) or None
+        """
+        result = None
+        # Try exact match first
+        if wc_sku in self.mapping:
+            result = (*self.mapping[wc_sku], 'exact')
+        else:
+            # Try normalized SKU
+            normalized = normalize_sku(wc_sku)
+            if normalized and normalized in self.mapping:
+                result = (*self.mapping[normalized], 'normalized')
+            # Try without SD- prefix
+            elif normalized and normalized.startswith('Einrichtungsanleitungen'):
+                without_prefix = normalized[3:]
+                if without_prefix in self.mapping:
+                    result = (*self.mapping[without_prefix], 'no-prefix')
+
+        return result
+
+
+def _new_token():
+    return uuid.uuid4().hex
+
+
+def get_sku_index_version():
+    """Current index token; a missing entry gets a fresh one."""
+    version = cache.get(SKU_INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(SKU_INDEX_VERSION_KEY, _new_token(), None)
+        version = cache.get(SKU_INDEX_VERSION_KEY)
+    return version
+
+
+def get_sku_index():
+    """Current index; rebuilt only after a Product change."""
+    global _index
+    version = get_sku_index_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = SkuIndex.build(version)
+        return _index
+
+
+def invalidate_sku_index():
+    """Mark the index as stale in this and all other processes."""
+    global _index
+    cache.set(SKU_INDEX_VERSION_KEY, _new_token(), None)
+    _index = None
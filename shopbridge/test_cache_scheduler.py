@@ -0,0 +1,110 @@
+# shopbridge/test_cache_scheduler.py
+
+import threading
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from shopbridge.cache_scheduler import (
+    LEADER_LEASE_TIMEOUT,
+    WooCommerceCacheScheduler,
+    _term_key,
+)
+
+TERM = LEADER_LEASE_TIMEOUT
+# Beginn einer beliebigen Amtszeit
+START = 1000 * TERM
+
+
+class LeaderElectionTestCase(SimpleTestCase):
+    """Tests für Leader-Wahl und Verlängerung der Leader-Lease"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.first = WooCommerceCacheScheduler()
+        self.second = WooCommerceCacheScheduler()
+
+    def test_one_leader_per_term(self):
+        self.assertTrue(self.first.acquire_leadership(START))
+        self.assertFalse(self.second.acquire_leadership(START))
+        self.assertFalse(self.second.acquire_leadership(START + 10))
+        self.assertTrue(self.first.acquire_leadership(START + 10))
+
+    def test_concurrent_candidates_elect_exactly_one_leader(self):
+        schedulers = [WooCommerceCacheScheduler() for _ in range(8)]
+        barrier = threading.Barrier(len(schedulers))
+        results = []
+
+        def candidate(scheduler):
+            barrier.wait()
+            results.append(scheduler.acquire_leadership(START))
+
+        threads = [
+            threading.Thread(target=candidate, args=(scheduler,))
+            for scheduler in schedulers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+
+    def test_leader_renews_by_claiming_next_term(self):
+        self.first.acquire_leadership(START)
+        # Zweite Hälfte der Amtszeit: nächste Amtszeit wird vorab belegt
+        self.first.acquire_leadership(START + TERM * 0.75)
+
+        self.assertFalse(self.second.acquire_leadership(START + TERM + 1))
+        self.assertTrue(self.first.acquire_leadership(START + TERM + 1))
+
+    def test_first_half_does_not_claim_next_term(self):
+        self.first.acquire_leadership(START + 5)
+
+        self.assertIsNone(cache.get(_term_key(START // TERM + 1)))
+
+    def test_failover_when_leader_stops_renewing(self):
+        self.first.acquire_leadership(START + 5)
+
+        # Der Leader pollt nicht mehr - die nächste Amtszeit ist frei
+        self.assertTrue(self.second.acquire_leadership(START + TERM + 1))
+        self.assertFalse(self.first.acquire_leadership(START + TERM + 2))
+
+    def test_failover_after_already_claimed_term(self):
+        self.first.acquire_leadership(START + TERM * 0.75)
+
+        self.assertFalse(self.second.acquire_leadership(START + TERM + 1))
+        self.assertTrue(self.second.acquire_leadership(START + 2 * TERM + 1))
+
+    def test_lost_lease_is_not_extended_over_new_leader(self):
+        self.first.acquire_leadership(START + 5)
+        # Lease verloren (z.B. Cache geleert), ein anderer übernimmt
+        cache.delete(_term_key(START // TERM))
+        self.assertTrue(self.second.acquire_leadership(START + 10))
+
+        self.assertFalse(self.first.acquire_leadership(START + TERM * 0.75))
+        self.assertTrue(self.second.acquire_leadership(START + TERM * 0.75))
+        self.assertEqual(
+            cache.get(_term_key(START // TERM + 1)), self.second.instance_id
+        )
+        self.assertFalse(self.first.acquire_leadership(START + TERM + 1))
+
+    def test_release_hands_over_immediately(self):
+        self.first.acquire_leadership(START + TERM * 0.75)
+
+        self.first._release_leadership(START + TERM * 0.75)
+
+        self.assertFalse(self.first.is_leader)
+        self.assertTrue(self.second.acquire_leadership(START + TERM * 0.8))
+        self.assertTrue(self.second.acquire_leadership(START + TERM + 1))
+
+    def test_release_by_non_leader_keeps_lease(self):
+        self.first.acquire_leadership(START)
+        self.second.acquire_leadership(START)
+
+        self.second._release_leadership(START)
+
+        self.assertEqual(
+            cache.get(_term_key(START // TERM)), self.first.instance_id
+        )
@@ -0,0 +1,122 @@
+# shopbridge/test_cache_utils.py
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from shopbridge.cache_utils import get_or_revalidate, single_flight
+from shopbridge.order_sync import save_orders
+from shopbridge.test_order_sync import (
+    FakeWooCommerceAPI, IsolatedCacheMixin, wc_order
+)
+from shopbridge.views import invalidate_orders_cache
+
+
+User = get_user_model()
+
+
+class BuildCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"build": self.calls}
+
+
+class StaleWhileRevalidateTestCase(SimpleTestCase):
+    """Tests für Stale-while-revalidate und Single-Flight-Lock"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.build = BuildCounter()
+        self.jobs = []
+        patcher = patch(
+            'shopbridge.cache_utils.run_in_background', self.jobs.append
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cold_miss_builds_synchronously(self):
+        value, stale, age = get_or_revalidate('v1', 'last', self.build, 60)
+
+        self.assertEqual(value, {"build": 1})
+        self.assertFalse(stale)
+        self.assertEqual(age, 0)
+        self.assertEqual(get_or_revalidate('v1', 'last', self.build, 60)[0],
+                         {"build": 1})
+        self.assertEqual(self.build.calls, 1)
+
+    def test_invalidated_key_serves_stale_and_rebuilds_once(self):
+        get_or_revalidate('v1', 'last', self.build, 60)
+
+        # New version key (after invalidation): concurrent misses
+        for _ in range(3):
+            value, stale, _ = get_or_revalidate('v2', 'last', self.build, 60)
+            self.assertEqual(value, {"build": 1})
+            self.assertTrue(stale)
+        self.assertEqual(len(self.jobs), 1)
+
+        self.jobs[0]()
+        value, stale, _ = get_or_revalidate('v2', 'last', self.build, 60)
+        self.assertEqual(value, {"build": 2})
+        self.assertFalse(stale)
+        self.assertEqual(self.build.calls, 2)
+
+    def test_single_flight_admits_one_holder(self):
+        with single_flight('sync') as first:
+            with single_flight('sync') as second:
+                self.assertTrue(first)
+                self.assertFalse(second)
+        with single_flight('sync') as again:
+            self.assertTrue(again)
+
+
+class OrdersViewStaleTestCase(IsolatedCacheMixin, APITestCase):
+    """Tests: Bestellübersicht liefert nach Invalidierung den letzten Stand"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='shopuser', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        save_orders([wc_order(1, "processing")])
+
+    @patch('shopbridge.cache_utils.run_in_background')
+    def test_stale_summary_after_invalidation(self, run_in_background):
+        response = self.client.get('/api/shopbridge/orders/')
+        self.assertFalse(response.data["stale"])
+
+        save_orders([wc_order(2, "processing")])
+        invalidate_orders_cache()
+        response = self.client.get('/api/shopbridge/orders/')
+
+        self.assertTrue(response.data["stale"])
+        self.assertEqual(response.data["order_count"], 1)
+        self.assertGreaterEqual(response.data["age"], 0)
+        run_in_background.assert_called_once()
+
+        run_in_background.call_args[0][0]()
+        response = self.client.get('/api/shopbridge/orders/')
+        self.assertFalse(response.data["stale"])
+        self.assertEqual(response.data["order_count"], 2)
+
+    @patch('shopbridge.views.get_wcapi')
+    def test_refresh_returns_freshly_synced_summary(self, get_wcapi):
+        self.client.get('/api/shopbridge/orders/')
+        get_wcapi.return_value = FakeWooCommerceAPI([
+            wc_order(1, "processing"), wc_order(2, "processing"),
+        ])
+
+        with patch('shopbridge.cache_utils.run_in_background') as background:
+            response = self.client.get('/api/shopbridge/orders/?refresh=true')
+
+        self.assertFalse(response.data["cached"])
+        self.assertFalse(response.data["stale"])
+        self.assertEqual(response.data["order_count"], 2)
+        background.assert_not_called()
@@ -0,0 +1,172 @@
+# shopbridge/test_dhl_client.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from shopbridge.dhl.client import (
+    DHLClient, DHLClientError, get_client, reset_clients
+)
+from shopbridge.dhl.config import DHLConfig
+from shopbridge.dhl.shipment_service import ShipmentService
+
+
+class FakeDHLServer:
+    """
+    Lokaler DHL-Ersatz mit Keep-Alive.
+
+    Beantwortet die ersten ``failures`` Anfragen mit 503, danach mit 200,
+    und merkt sich Anfragen und verwendete Client-Verbindungen.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with fake.lock:
+                    fake.requests.append((self.command, self.path))
+                    fake.connections.add(self.client_address)
+                    failed = len(fake.requests) <= fake.failures
+                body = json.dumps(
+                    {"title": "Unavailable"} if failed else {"items": []}
+                ).encode()
+                self.send_response(503 if failed else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = respond
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def local_config(server):
+    class LocalDHLConfig(DHLConfig):
+        @property
+        def base_url(self):
+            return server.url
+
+    return LocalDHLConfig(
+        api_key="key", api_secret="secret", user="user",
+        password="pass", customer_number="3333333333",
+    )
+
+
+@patch.object(DHLClient, 'BACKOFF_FACTOR', 0)
+class DHLClientTestCase(SimpleTestCase):
+    """Tests für Verbindungs-Pool und Wiederholungen des DHL-Clients"""
+
+    def setUp(self):
+        reset_clients()
+        self.addCleanup(reset_clients)
+
+    def test_pool_and_retry_configuration(self):
+        config = DHLConfig(
+            api_key="key", api_secret="secret", user="user",
+            password="pass", customer_number="3333333333",
+        )
+        client = DHLClient(config)
+        self.addCleanup(client._session.close)
+        adapter = client._session.get_adapter(config.base_url)
+        retry = adapter.max_retries
+
+        self.assertEqual(adapter._pool_maxsize, DHLClient.POOL_MAXSIZE)
+        self.assertEqual(retry.total, DHLClient.RETRIES)
+        self.assertEqual(retry.backoff_factor, DHLClient.BACKOFF_FACTOR)
+        self.assertEqual(
+            set(retry.status_forcelist), {429, 500, 502, 503, 504}
+        )
+        self.assertTrue(retry.respect_retry_after_header)
+        self.assertIn("GET", retry.allowed_methods)
+        self.assertIn("DELETE", retry.allowed_methods)
+        self.assertNotIn("POST", retry.allowed_methods)
+        # Verbindungsfehler vor dem Senden dürfen auch POST wiederholen
+        self.assertEqual(retry.connect, DHLClient.RETRIES)
+
+    def test_reset_clients_drops_the_shared_client(self):
+        config = DHLConfig(
+            api_key="key", api_secret="secret", user="user",
+            password="pass", customer_number="3333333333",
+        )
+        client = get_client(config)
+        self.assertIs(get_client(config), client)
+
+        reset_clients()
+
+        self.assertIsNot(get_client(config), client)
+
+    def test_connections_are_reused(self):
+        with FakeDHLServer() as server:
+            client = DHLClient(local_config(server))
+            for _ in range(5):
+                client.get("/orders")
+
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_idempotent_requests_are_retried(self):
+        with FakeDHLServer(failures=2) as server:
+            result = DHLClient(local_config(server)).get("/orders")
+
+        self.assertEqual(result, {"items": []})
+        self.assertEqual(len(server.requests), 3)
+
+    def test_post_is_not_retried(self):
+        with FakeDHLServer(failures=1) as server:
+            with self.assertRaises(DHLClientError) as ctx:
+                DHLClient(local_config(server)).post("/orders", {})
+
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_services_share_the_process_wide_client(self):
+        with FakeDHLServer() as server:
+            config = local_config(server)
+            first = ShipmentService(config)
+            second = ShipmentService(config)
+            first.delete_shipments(["0034"])
+            second.delete_shipments(["0035", "0036"])
+
+        self.assertIs(first.client, second.client)
+        self.assertIs(first.client, get_client(config))
+        self.assertEqual(len(server.connections), 1)
+        self.assertEqual(
+            server.requests[-1],
+            ("DELETE", "/orders?profile=STANDARD_GRUPPENPROFIL"
+                       "&shipment=0035&shipment=0036")
+        )
@@ -0,0 +1,388 @@
+# shopbridge/test_dhl_labels.py
+
+import base64
+import io
+import shutil
+import tempfile
+import threading
+import zipfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from shopbridge.dhl.client import reset_clients
+from shopbridge.dhl.label_storage import store_label_pdf, store_label_pdf_base64
+from shopbridge.models import DHLLabel
+
+
+User = get_user_model()
+
+PDF_BYTES = b'%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF\n'
+
+
+class DHLLabelTestMixin:
+    """Temporärer MEDIA_ROOT und angemeldeter Benutzer"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            username='shipper', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_label(self, shipment_number, order_id=1, pdf=PDF_BYTES, **kwargs):
+        return DHLLabel.objects.create(
+            shipment_number=shipment_number,
+            woocommerce_order_id=order_id,
+            label_pdf=store_label_pdf(pdf) if pdf else '',
+            **kwargs
+        )
+
+
+class DHLLabelStorageTestCase(DHLLabelTestMixin, APITestCase):
+    """Tests für den inhaltsadressierten Label-Speicher"""
+
+    def test_identical_labels_share_one_file(self):
+        first = store_label_pdf(PDF_BYTES)
+        second = store_label_pdf_base64(base64.b64encode(PDF_BYTES).decode())
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('dhl_labels/'))
+        with default_storage.open(first, 'rb') as pdf:
+            self.assertEqual(pdf.read(), PDF_BYTES)
+
+    def test_download_streams_raw_pdf(self):
+        label = self.create_label('00340434161094042557')
+
+        response = self.client.get(
+            f'/api/shopbridge/dhl/labels/{label.id}/pdf/download/?download=true'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), PDF_BYTES)
+
+    def test_base64_endpoint_stays_compatible(self):
+        label = self.create_label('00340434161094042557')
+
+        response = self.client.get(f'/api/shopbridge/dhl/labels/{label.id}/pdf/')
+
+        self.assertEqual(base64.b64decode(response.data['label_b64']), PDF_BYTES)
+
+    @override_settings(DHL_LABEL_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_download_via_accel_redirect(self):
+        label = self.create_label('00340434161094042557')
+
+        response = self.client.get(
+            f'/api/shopbridge/dhl/labels/{label.id}/pdf/download/'
+        )
+
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            f'/protected-media/{label.label_pdf.name}'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_deleting_label_removes_unshared_file(self):
+        label = self.create_label('00340434161094042557')
+        name = label.label_pdf.name
+
+        label.mark_as_deleted()
+
+        self.assertFalse(label.label_pdf)
+        self.assertFalse(default_storage.exists(name))
+
+
+class DHLLabelQuerySetTestCase(DHLLabelTestMixin, APITestCase):
+    """Tests für das Laden der Labels ohne PDF-Spalte"""
+
+    def test_listing_defers_pdf_and_annotates_has_pdf(self):
+        self.create_label('00340434161094042557', order_id=7)
+        self.create_label('00340434161094042558', order_id=7, pdf=None)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/shopbridge/dhl/labels/order/7/')
+
+        self.assertEqual(
+            sorted(label['has_pdf'] for label in response.data['labels']),
+            [False, True]
+        )
+        label_queries = [
+            q['sql'] for q in queries.captured_queries
+            if 'shopbridge_dhllabel' in q['sql']
+        ]
+        self.assertEqual(len(label_queries), 1)
+        self.assertNotIn('"label_pdf",', label_queries[0])
+
+    def test_mark_printed_uses_single_update(self):
+        label = self.create_label('00340434161094042557')
+
+        response = self.client.post(
+            f'/api/shopbridge/dhl/labels/{label.id}/printed/'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'printed')
+        self.assertEqual(DHLLabel.objects.get(id=label.id).status, 'printed')
+
+    def test_mark_printed_unknown_label(self):
+        response = self.client.post('/api/shopbridge/dhl/labels/999/printed/')
+        self.assertEqual(response.status_code, 404)
+
+
+def label_request(order_id, **overrides):
+    return {
+        'consignee': {
+            'name1': 'Max Mustermann',
+            'street': 'Hauptstraße',
+            'house_number': '1',
+            'postal_code': '53113',
+            'city': 'Bonn',
+        },
+        'details': {'weight_kg': 1.0},
+        'reference': f'Bestellung {order_id:04d}',
+        'woocommerce_order_id': order_id,
+        **overrides,
+    }
+
+
+class DHLFakeApiMixin(DHLLabelTestMixin):
+    """Ersetzt die DHL-API durch fake_post"""
+
+    def setUp(self):
+        super().setUp()
+        reset_clients()
+        self.addCleanup(reset_clients)
+        self.requests = []
+        self.lock = threading.Lock()
+        patcher = patch(
+            'shopbridge.dhl.client.DHLClient.post',
+            autospec=True, side_effect=self.fake_post
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_post(self, client, path, data, params=None):
+        """
+        Antwortet je Sendung mit einem Label (Sendungsnummer aus refNo).
+
+        Referenzen mit "kaputt" bekommen ein ungültiges Base64-PDF.
+        """
+        with self.lock:
+            self.requests.append(data['shipments'])
+        pdf = base64.b64encode(PDF_BYTES).decode()
+        return {'items': [
+            {
+                'sstatus': {'statusCode': 200},
+                'shipmentNo': f"0034{shipment['refNo'][-4:]}",
+                'shipmentRefNo': shipment['refNo'],
+                'label': {
+                    'b64': '%%%' if 'kaputt' in shipment['refNo'] else pdf,
+                    'fileFormat': 'PDF',
+                },
+            }
+            for shipment in data['shipments']
+        ]}
+
+
+class DHLCreateLabelTestCase(DHLFakeApiMixin, APITestCase):
+    """Tests für das Erstellen eines einzelnen Labels"""
+
+    def test_label_is_saved_with_pdf(self):
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/', label_request(1), format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+        label = DHLLabel.objects.with_pdf().get()
+        self.assertEqual(label.shipment_number, '00340001')
+        with label.label_pdf.open('rb') as pdf:
+            self.assertEqual(pdf.read(), PDF_BYTES)
+
+    def test_invalid_label_pdf_keeps_shipment_record(self):
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/',
+            label_request(2, reference='Bestellung kaputt 0002'),
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(response.data['success'])
+        self.assertEqual(response.data['shipment_number'], '00340002')
+        self.assertIn('Invalid label PDF', response.data['error'])
+        self.assertIsNone(response.data['label_pdf_base64'])
+        label = DHLLabel.objects.get(id=response.data['label_id'])
+        self.assertEqual(label.shipment_number, '00340002')
+        self.assertFalse(label.has_pdf)
+
+
+class DHLBatchLabelTestCase(DHLFakeApiMixin, APITestCase):
+    """Tests für das Erstellen vieler Labels in Sammelanfragen"""
+
+    def test_shipments_are_chunked_and_saved_in_bulk(self):
+        labels = [label_request(order_id) for order_id in range(1, 66)]
+
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/batch/', {'labels': labels},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 65)
+        self.assertEqual(response.data['failed'], 0)
+        self.assertEqual(
+            sorted(len(shipments) for shipments in self.requests),
+            [5, 30, 30]
+        )
+        results = response.data['results']
+        self.assertEqual(
+            [r['woocommerce_order_id'] for r in results], list(range(1, 66))
+        )
+        self.assertEqual(results[0]['shipment_number'], '00340001')
+        self.assertNotIn('label_pdf_base64', results[0])
+        label = DHLLabel.objects.with_pdf().get(id=results[0]['label_id'])
+        self.assertEqual(label.woocommerce_order_id, 1)
+        with label.label_pdf.open('rb') as pdf:
+            self.assertEqual(pdf.read(), PDF_BYTES)
+        self.assertEqual(DHLLabel.objects.count(), 65)
+
+    def test_invalid_entries_fail_individually(self):
+        labels = [
+            label_request(1),
+            label_request(2, details={'weight_kg': 99}),
+            label_request(3),
+        ]
+
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/batch/', labels, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 1)
+        failed = response.data['results'][1]
+        self.assertFalse(failed['success'])
+        self.assertIn('details', failed['validation_errors'])
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(self.requests[0]), 2)
+
+    def test_invalid_label_pdf_fails_only_its_entry(self):
+        labels = [
+            label_request(1),
+            label_request(2, reference='Bestellung kaputt 0002'),
+            label_request(3),
+        ]
+
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/batch/', labels, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 1)
+        failed = response.data['results'][1]
+        self.assertFalse(failed['success'])
+        self.assertEqual(failed['shipment_number'], '00340002')
+        self.assertIn('Invalid label PDF', failed['error'])
+        self.assertEqual(
+            sorted(DHLLabel.objects.values_list(
+                'woocommerce_order_id', flat=True
+            )),
+            [1, 3]
+        )
+
+    def test_empty_batch_is_rejected(self):
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/batch/', {'labels': []}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class DHLLabelPrintJobTestCase(DHLLabelTestMixin, APITestCase):
+    """Tests für den Druckauftrag mehrerer Labels als ZIP"""
+
+    def download(self, data):
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/print/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        content = b''.join(response.streaming_content)
+        return response, zipfile.ZipFile(io.BytesIO(content))
+
+    def test_selected_labels_are_zipped_in_print_order(self):
+        first = self.create_label('00340434161094042557')
+        second = self.create_label(
+            '00340434161094042558', pdf=PDF_BYTES + b'%second\n'
+        )
+        untouched = self.create_label('00340434161094042559')
+
+        response, archive = self.download({
+            'label_ids': [second.id, first.id, 999]
+        })
+
+        self.assertEqual(response['X-Label-Count'], '2')
+        self.assertEqual(archive.namelist(), [
+            '001_00340434161094042558.pdf',
+            '002_00340434161094042557.pdf',
+        ])
+        self.assertEqual(
+            archive.read('002_00340434161094042557.pdf'), PDF_BYTES
+        )
+        self.assertEqual(
+            set(DHLLabel.objects.filter(status='printed')
+                .values_list('id', flat=True)),
+            {first.id, second.id}
+        )
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.status, 'created')
+
+    def test_today_prints_unprinted_labels_only(self):
+        self.create_label('00340434161094042557')
+        self.create_label('00340434161094042558', status='printed')
+        self.create_label('00340434161094042559', pdf=None)
+
+        _, archive = self.download({'today': True})
+
+        self.assertEqual(
+            archive.namelist(), ['001_00340434161094042557.pdf']
+        )
+
+    def test_marks_printed_with_one_update(self):
+        labels = [
+            self.create_label(f'0034043416109404255{i}') for i in range(5)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.download({'label_ids': [label.id for label in labels]})
+
+        updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(DHLLabel.objects.filter(status='printed').count(), 5)
+
+    def test_no_matching_labels(self):
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/print/', {'label_ids': [999]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.post(
+            '/api/shopbridge/dhl/labels/print/', {}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
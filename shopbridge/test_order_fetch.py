@@ -0,0 +1,121 @@
+# shopbridge/test_order_fetch.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import SimpleTestCase
+from woocommerce import API
+
+from shopbridge.order_sync import fetch_order_queries, fetch_orders
+
+
+class FakeWooCommerceServer:
+    """
+    Lokaler WooCommerce-Ersatz für /wp-json/wc/v3/orders.
+
+    Liefert ``pages`` Seiten je Status mit Verzögerung und merkt sich die
+    höchste Zahl gleichzeitig laufender Anfragen.
+    """
+
+    def __init__(self, pages=5, per_page=3, delay=0.05):
+        self.pages = pages
+        self.per_page = per_page
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(
+                        fake.max_in_flight, fake.in_flight
+                    )
+                try:
+                    time.sleep(fake.delay)
+                    query = parse_qs(urlparse(self.path).query)
+                    status = query["status"][0]
+                    page = int(query["page"][0])
+                    orders = [
+                        {"id": f"{status}-{page}-{i}", "status": status}
+                        for i in range(fake.per_page)
+                    ]
+                    body = json.dumps(orders).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("X-WP-TotalPages", str(fake.pages))
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with fake.lock:
+                        fake.in_flight -= 1
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ParallelOrderFetchTestCase(SimpleTestCase):
+    """Tests für den parallelen Seitenabruf gegen einen lokalen Fake-Server"""
+
+    def wcapi(self, server):
+        return API(
+            url=server.url,
+            consumer_key="ck_test",
+            consumer_secret="cs_test",
+            version="wc/v3",
+            timeout=5
+        )
+
+    def test_pages_are_fetched_in_parallel_and_merged_in_order(self):
+        with FakeWooCommerceServer(pages=5) as server:
+            orders = fetch_orders(
+                self.wcapi(server), {"status": "processing"}, concurrency=4
+            )
+
+        self.assertEqual(
+            [order["id"] for order in orders],
+            [f"processing-{page}-{i}" for page in range(1, 6) for i in range(3)]
+        )
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 4)
+
+    def test_status_queries_run_concurrently_within_limit(self):
+        statuses = ["processing", "completed", "cancelled"]
+        with FakeWooCommerceServer(pages=3) as server:
+            results = fetch_order_queries(
+                self.wcapi(server),
+                [{"status": status} for status in statuses],
+                concurrency=2
+            )
+
+        for status, orders in zip(statuses, results):
+            self.assertEqual(len(orders), 9)
+            self.assertTrue(all(o["status"] == status for o in orders))
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 2)
@@ -0,0 +1,476 @@
+# shopbridge/test_order_sync.py
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from products.models import Product
+from shopbridge.models import WooOrder, WooOrderLineItem
+from shopbridge.order_sync import ORDER_SYNC_LOCK_KEY, save_orders, sync_orders
+from shopbridge.cache_utils import single_flight, store
+from shopbridge.sku_index import invalidate_sku_index
+from shopbridge.views import (
+    ORDER_STATS_STALE_KEY,
+    get_cache_version,
+    get_order_cache_state,
+    get_order_stats_cache_key,
+    patch_order_in_caches,
+    refresh_orders_summaries,
+)
+
+
+User = get_user_model()
+
+
+class IsolatedCacheMixin:
+    """
+    Leerer Cache und frischer SKU-Index für jeden Test.
+
+    Hintergrund-Rebuilds laufen synchron, damit kein Thread nach dem Test
+    noch in den Cache schreibt.
+    """
+
+    def setUp(self):
+        cache.clear()
+        invalidate_sku_index()
+        self.addCleanup(cache.clear)
+        self.addCleanup(invalidate_sku_index)
+        patcher = patch(
+            'shopbridge.cache_utils.run_in_background', lambda func: func()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+def wc_order(order_id, status, sku='SD-KRT2-E', quantity=1,
+             date='2026-01-01T10:00:00'):
+    return {
+        "id": order_id,
+        "number": str(order_id),
+        "status": status,
+        "currency": "EUR",
+        "total": "49.00",
+        "billing": {
+            "first_name": "Max", "last_name": "Mustermann",
+            "country": "DE", "city": "Berlin",
+        },
+        "shipping": {"country": "DE"},
+        "date_created": date,
+        "date_created_gmt": date,
+        "date_modified_gmt": date,
+        "line_items": [
+            {"id": order_id * 10, "name": "KRT2 Adapter", "sku": sku,
+             "quantity": quantity, "total": "49.00"},
+        ],
+    }
+
+
+class FakeResponse:
+    def __init__(self, orders, total_pages=1):
+        self.status_code = 200
+        self._orders = orders
+        self.headers = {"X-WP-TotalPages": str(total_pages)}
+        self.text = ""
+
+    def json(self):
+        return self._orders
+
+
+class FakeWooCommerceAPI:
+    """Liefert Bestellungen je Status und protokolliert die Abfragen"""
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.requests = []
+
+    def get(self, endpoint, params=None):
+        self.requests.append(params)
+        status = params["status"]
+        if status == "any":
+            orders = [o for o in self.orders if o["status"] != "trash"]
+        else:
+            orders = [o for o in self.orders if o["status"] == status]
+        return FakeResponse(orders)
+
+
+class OrderSyncTestCase(IsolatedCacheMixin, TestCase):
+    """Tests für den Abgleich in den lokalen Bestellspiegel"""
+
+    def setUp(self):
+        super().setUp()
+
+    def test_full_sync_fills_mirror(self):
+        api = FakeWooCommerceAPI([
+            wc_order(1, "processing"), wc_order(2, "completed", quantity=3)
+        ])
+
+        result = sync_orders(api)
+
+        self.assertEqual(result, {"mode": "full", "orders": 2})
+        self.assertEqual(
+            WooOrder.objects.get(id=2).status, "completed"
+        )
+        self.assertEqual(
+            WooOrderLineItem.objects.get(order_id=2).quantity, 3
+        )
+
+    def test_incremental_sync_requests_only_modified_orders(self):
+        api = FakeWooCommerceAPI([wc_order(1, "processing")])
+        sync_orders(api)
+
+        api.orders = [wc_order(1, "completed")]
+        api.requests.clear()
+        result = sync_orders(api)
+
+        self.assertEqual(result["mode"], "incremental")
+        self.assertTrue(all("modified_after" in p for p in api.requests))
+        self.assertEqual(WooOrder.objects.get(id=1).status, "completed")
+        self.assertEqual(WooOrderLineItem.objects.count(), 1)
+
+    def test_full_sync_removes_deleted_orders(self):
+        save_orders(
+            [wc_order(99, "processing")],
+            synced_at=timezone.now() - timedelta(days=2)
+        )
+
+        sync_orders(FakeWooCommerceAPI([wc_order(1, "processing")]))
+
+        self.assertEqual(list(WooOrder.objects.values_list('id', flat=True)), [1])
+
+    def test_sync_stores_compact_projection(self):
+        order = wc_order(1, "processing")
+        order["meta_data"] = [{"key": "_wc_order_attribution", "value": "x" * 500}]
+        order["_links"] = {"self": [{"href": "https://shop.example/1"}]}
+        order["billing"]["email"] = "max@example.com"
+        api = FakeWooCommerceAPI([order])
+
+        sync_orders(api)
+
+        self.assertTrue(all("_fields" in p for p in api.requests))
+        mirrored = WooOrder.objects.get(id=1)
+        self.assertFalse(mirrored.has_details)
+        self.assertNotIn("meta_data", mirrored.data)
+        self.assertNotIn("_links", mirrored.data)
+        self.assertNotIn("email", mirrored.data["billing"])
+        self.assertEqual(mirrored.data["line_items"][0]["sku"], "SD-KRT2-E")
+
+    @patch('shopbridge.views.get_wcapi')
+    def test_detail_loads_full_order_once(self, get_wcapi):
+        from shopbridge.views import fetch_woocommerce_order_detail
+
+        order = wc_order(1, "processing")
+        order["meta_data"] = [{"key": "note", "value": "fragile"}]
+        save_orders([order])
+        get_wcapi.return_value.get.return_value = FakeResponse(order)
+
+        detail, error = fetch_woocommerce_order_detail(1)
+        self.assertIsNone(error)
+        self.assertEqual(detail["meta_data"], order["meta_data"])
+
+        detail, error = fetch_woocommerce_order_detail(1)
+        self.assertEqual(detail["meta_data"], order["meta_data"])
+        self.assertEqual(get_wcapi.return_value.get.call_count, 1)
+        self.assertTrue(WooOrder.objects.get(id=1).has_details)
+
+
+class WooCommerceOrdersViewTestCase(IsolatedCacheMixin, APITestCase):
+    """Tests für die Bestellübersicht aus dem lokalen Spiegel"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='shopuser', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(bezeichnung='KRT2', artikelnummer='SD-KRT2')
+        save_orders([
+            wc_order(1, "processing", quantity=2),
+            wc_order(2, "completed"),
+        ])
+
+    @patch('shopbridge.views.get_wcapi', side_effect=AssertionError)
+    def test_manuals_for_order_read_compact_projection(self, get_wcapi):
+        response = self.client.get(
+            '/api/shopbridge/product-manuals/for-order/1/'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['country_code'], 'DE')
+        self.assertEqual(
+            sorted(response.data['product_identifiers']),
+            ['KRT2 Adapter', 'SD-KRT2-E']
+        )
+        self.assertFalse(WooOrder.objects.get(id=1).has_details)
+
+    @patch('shopbridge.views.get_wcapi', side_effect=AssertionError)
+    def test_orders_view_reads_mirror_without_api(self, get_wcapi):
+        response = self.client.get('/api/shopbridge/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_count"], 1)
+        summary = response.data["products"]["KRT2"]
+        self.assertEqual(summary["total_quantity"], 2)
+        self.assertEqual(summary["orders"][0]["match_type"], "normalized")
+        get_wcapi.assert_not_called()
+
+    def test_warm_request_uses_precomputed_summary(self):
+        refresh_orders_summaries()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/shopbridge/orders/?status=all')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_count"], 2)
+        self.assertEqual(response.data["products"]["KRT2"]["stocks"], {})
+        self.assertFalse(any(
+            'shopbridge_woo' in query['sql'] for query in queries
+        ))
+
+
+class WooCommerceOrdersPaginationTestCase(IsolatedCacheMixin, APITestCase):
+    """Tests für Filter, Summary-Modus und Cursor-Pagination der Übersicht"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='shopuser', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(bezeichnung='KRT2', artikelnummer='SD-KRT2')
+        orders = [
+            wc_order(i, "processing", date=f'2026-01-{i:02d}T10:00:00')
+            for i in range(1, 8)
+        ]
+        orders[0]["billing"]["country"] = "AT"
+        save_orders(orders)
+
+    def test_summary_only_omits_nested_orders(self):
+        response = self.client.get(
+            '/api/shopbridge/orders/?summary_only=true'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_count"], 7)
+        summary = response.data["products"]["KRT2"]
+        self.assertEqual(summary["total_quantity"], 7)
+        self.assertNotIn("orders", summary)
+
+    def test_date_and_country_filters(self):
+        response = self.client.get(
+            '/api/shopbridge/orders/'
+            '?date_from=2026-01-01&date_to=2026-01-03&country=de'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_count"], 2)
+        self.assertEqual(
+            [o["order_id"] for o in response.data["products"]["KRT2"]["orders"]],
+            [3, 2]
+        )
+
+    def test_invalid_filter_returns_400(self):
+        response = self.client.get('/api/shopbridge/orders/?date_from=gestern')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination_walks_all_orders(self):
+        seen = []
+        url = '/api/shopbridge/orders/?limit=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["orders"]), 3)
+            self.assertNotIn("orders", response.data["products"]["KRT2"])
+            seen.extend(o["order_id"] for o in response.data["orders"])
+            cursor = response.data["next_cursor"]
+            url = f'/api/shopbridge/orders/?limit=3&cursor={cursor}' if cursor else None
+
+        self.assertEqual(seen, [7, 6, 5, 4, 3, 2, 1])
+
+    def test_pagination_by_total_ascending(self):
+        WooOrder.objects.filter(id=5).update(total='10.00')
+        response = self.client.get(
+            '/api/shopbridge/orders/?limit=2&ordering=total'
+        )
+
+        self.assertEqual(
+            [o["order_id"] for o in response.data["orders"]], [5, 1]
+        )
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get('/api/shopbridge/orders/?cursor=kaputt')
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderCachePatchTestCase(IsolatedCacheMixin, APITestCase):
+    """Tests: Bestell-Updates patchen die gecachten Übersichten gezielt"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='shopuser', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(bezeichnung='KRT2', artikelnummer='SD-KRT2')
+        save_orders([
+            wc_order(1, "processing", quantity=2, date='2026-01-02T10:00:00'),
+            wc_order(2, "completed", date='2026-01-01T10:00:00'),
+        ])
+        refresh_orders_summaries()
+        store(
+            get_order_stats_cache_key(), ORDER_STATS_STALE_KEY,
+            {"total": 2, "by_status": {"processing": 1, "completed": 1},
+             "active": 1, "completed": 1, "other": 0},
+            60
+        )
+
+    @patch('shopbridge.views.get_wcapi')
+    def test_status_update_moves_order_between_groups(self, get_wcapi):
+        get_wcapi.return_value.put.return_value = FakeResponse(
+            wc_order(1, "completed", quantity=2, date='2026-01-02T10:00:00')
+        )
+        version = get_cache_version()
+
+        response = self.client.put(
+            '/api/shopbridge/orders/1/status/', {'status': 'completed'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_cache_version(), version)
+
+        with CaptureQueriesContext(connection) as queries:
+            active = self.client.get('/api/shopbridge/orders/?status=active')
+            completed = self.client.get('/api/shopbridge/orders/?status=completed')
+            stats = self.client.get('/api/shopbridge/orders/stats/')
+        self.assertFalse(any(
+            'shopbridge_woo' in query['sql'] for query in queries
+        ))
+
+        self.assertEqual(active.data["order_count"], 0)
+        self.assertEqual(active.data["products"], {})
+        self.assertEqual(completed.data["order_count"], 2)
+        krt2 = completed.data["products"]["KRT2"]
+        self.assertEqual(krt2["total_quantity"], 3)
+        self.assertEqual([o["order_id"] for o in krt2["orders"]], [1, 2])
+        self.assertEqual(completed.data["adapter_count"]["total"], 3)
+        self.assertEqual(stats.data["by_status"]["processing"], 0)
+        self.assertEqual(stats.data["completed"], 2)
+        self.assertEqual(stats.data["active"], 0)
+
+    @patch('shopbridge.views.get_wcapi')
+    def test_field_update_patches_order_in_place(self, get_wcapi):
+        updated = wc_order(1, "processing", quantity=5, date='2026-01-02T10:00:00')
+        updated["billing"]["city"] = "Potsdam"
+        get_wcapi.return_value.put.return_value = FakeResponse(updated)
+
+        self.client.patch(
+            '/api/shopbridge/orders/1/edit/',
+            {'billing': updated["billing"]}, format='json'
+        )
+
+        response = self.client.get('/api/shopbridge/orders/?summary_only=true')
+        self.assertEqual(response.data["products"]["KRT2"]["total_quantity"], 5)
+        response = self.client.get('/api/shopbridge/orders/')
+        orders = response.data["products"]["KRT2"]["orders"]
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(orders[0]["customer_city"], "Potsdam")
+        self.assertFalse(response.data["stale"])
+
+
+    def test_patch_counts_order_only_if_present(self):
+        previous_status, previous_rows = get_order_cache_state(1)
+        save_orders([
+            wc_order(1, "completed", quantity=4, date='2026-01-02T10:00:00')
+        ])
+        # Summaries rebuilt between the update and the patch
+        refresh_orders_summaries()
+
+        patch_order_in_caches(1, previous_status, previous_rows)
+
+        active = self.client.get('/api/shopbridge/orders/?status=active')
+        self.assertEqual(active.data["order_count"], 0)
+        for summary_only in ('false', 'true'):
+            completed = self.client.get(
+                '/api/shopbridge/orders/?status=completed'
+                f'&summary_only={summary_only}'
+            )
+            self.assertEqual(completed.data["order_count"], 2)
+            self.assertEqual(
+                completed.data["products"]["KRT2"]["total_quantity"], 5
+            )
+            self.assertEqual(completed.data["adapter_count"]["total"], 5)
+
+    @patch('shopbridge.views.get_wcapi')
+    def test_update_during_sync_invalidates_caches(self, get_wcapi):
+        get_wcapi.return_value.put.return_value = FakeResponse(
+            wc_order(1, "completed", quantity=2, date='2026-01-02T10:00:00')
+        )
+        version = get_cache_version()
+
+        with single_flight(ORDER_SYNC_LOCK_KEY) as acquired:
+            self.assertTrue(acquired)
+            response = self.client.put(
+                '/api/shopbridge/orders/1/status/', {'status': 'completed'},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(get_cache_version(), version)
+        self.assertEqual(WooOrder.objects.get(id=1).status, "completed")
+        # Served stale once, rebuilt from the mirror in the meantime
+        self.client.get('/api/shopbridge/orders/?status=completed')
+        completed = self.client.get('/api/shopbridge/orders/?status=completed')
+        self.assertFalse(completed.data["stale"])
+        self.assertEqual(completed.data["order_count"], 2)
+
+
+class OrderStatsTestCase(IsolatedCacheMixin, APITestCase):
+    """Tests für die Bestellstatistik aus dem lokalen Spiegel"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='shopuser', password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Product.objects.create(bezeichnung='KRT2', artikelnummer='SD-KRT2')
+        yesterday = (timezone.now() - timedelta(days=1)).strftime(
+            '%Y-%m-%dT%H:%M:%S'
+        )
+        save_orders([
+            wc_order(1, "processing", quantity=2, date=yesterday),
+            wc_order(2, "completed", date=yesterday),
+            wc_order(3, "cancelled", quantity=4, date=yesterday),
+            wc_order(4, "completed", date='2025-01-01T10:00:00'),
+        ])
+
+    @patch('shopbridge.views.get_wcapi', side_effect=AssertionError)
+    def test_stats_from_mirror(self, get_wcapi):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/shopbridge/orders/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 4)
+        self.assertEqual(response.data["by_status"]["completed"], 2)
+        self.assertEqual(response.data["by_status"]["trash"], 0)
+        self.assertEqual(response.data["active"], 1)
+        self.assertEqual(response.data["other"], 1)
+
+        sales = response.data["sales"]
+        self.assertEqual(len(sales["by_day"]), 1)
+        self.assertEqual(sales["by_day"][0]["orders"], 2)
+        self.assertEqual(sales["by_day"][0]["revenue"], "98.00")
+        self.assertEqual(sales["by_product"]["KRT2"]["quantity"], 3)
+
+        woo_queries = [
+            q for q in queries.captured_queries if 'shopbridge_woo' in q['sql']
+        ]
+        self.assertEqual(len(woo_queries), 3)
+        get_wcapi.assert_not_called()
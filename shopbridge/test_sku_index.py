@@ -0,0 +1,121 @@
+# shopbridge/test_sku_index.py
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from products.models import Product
+from shopbridge.models import WooOrder, WooOrderLineItem, normalize_sku
+from shopbridge.sku_index import (
+    RESOLVE_CACHE_SIZE, get_sku_index, invalidate_sku_index
+)
+from shopbridge.views import (
+    build_order_stats, build_orders_totals, map_woocommerce_to_prodflux,
+    paginate_orders
+)
+
+
+class SkuIndexTestCase(TestCase):
+    """Tests für den prozessweiten SKU-Index"""
+
+    def setUp(self):
+        invalidate_sku_index()
+        self.addCleanup(invalidate_sku_index)
+        self.product = Product.objects.create(
+            bezeichnung='KRT2 Adapter', artikelnummer='SD-KRT2'
+        )
+
+    def test_normalize_sku_variants(self):
+        self.assertEqual(normalize_sku('SD-KRT2-E-1'), 'SD-KRT2')
+        self.assertEqual(normalize_sku('sd-ar620x-e-ng-left'), 'SD-AR620X-NG')
+        self.assertIsNone(normalize_sku(''))
+
+    def test_index_is_reused_between_lookups(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_sku_index()
+        map_woocommerce_to_prodflux('SD-KRT2-E', 'KRT2')
+
+        with CaptureQueriesContext(connection) as queries:
+            result = map_woocommerce_to_prodflux('SD-KRT2-E', 'KRT2')
+        self.assertEqual(result, (self.product.id, 'KRT2 Adapter', 'normalized'))
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'products_product' in q['sql']]
+        )
+
+    def test_product_save_and_delete_invalidate_index(self):
+        index = get_sku_index()
+        self.assertEqual(
+            map_woocommerce_to_prodflux('SD-ATR833', 'ATR833'),
+            (None, 'ATR833', None)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            atr = Product.objects.create(
+                bezeichnung='ATR833 Adapter', artikelnummer='SD-ATR833'
+            )
+        self.assertIsNot(get_sku_index(), index)
+        self.assertEqual(
+            map_woocommerce_to_prodflux('SD-ATR833-E', 'ATR833'),
+            (atr.id, 'ATR833 Adapter', 'normalized')
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            atr.delete()
+        self.assertEqual(
+            map_woocommerce_to_prodflux('SD-ATR833-E', 'ATR833'),
+            (None, 'ATR833', None)
+        )
+
+    def test_product_change_is_visible_before_commit(self):
+        get_sku_index()
+        atr = Product.objects.create(
+            bezeichnung='ATR833 Adapter', artikelnummer='SD-ATR833'
+        )
+        self.assertEqual(
+            map_woocommerce_to_prodflux('SD-ATR833-E', 'ATR833'),
+            (atr.id, 'ATR833 Adapter', 'normalized')
+        )
+
+    def test_cleared_cache_does_not_revive_old_index(self):
+        index = get_sku_index()
+        cache.clear()
+
+        self.assertNotEqual(get_sku_index().version, index.version)
+        self.assertIsNot(get_sku_index(), index)
+
+    def test_resolve_memo_is_bounded(self):
+        index = get_sku_index()
+        for i in range(RESOLVE_CACHE_SIZE + 10):
+            index.resolve(f'SD-UNKNOWN-{i}')
+
+        self.assertEqual(index.resolve.cache_info().currsize, RESOLVE_CACHE_SIZE)
+
+    def test_aggregations_check_index_version_once(self):
+        now = timezone.now()
+        for order_id in range(1, 6):
+            order = WooOrder.objects.create(
+                id=order_id, status='processing', date_created=now,
+                synced_at=now
+            )
+            WooOrderLineItem.objects.bulk_create([
+                WooOrderLineItem(
+                    order=order, line_item_id=order_id * 10 + i,
+                    name=f'Artikel {i}', sku=f'SD-KRT2-E-{i}', quantity=1
+                )
+                for i in range(4)
+            ])
+        get_sku_index()
+
+        for aggregate in (
+            lambda: build_orders_totals({'order__status': 'processing'}, 5),
+            lambda: paginate_orders(['processing']),
+            lambda: build_order_stats(),
+        ):
+            with patch('shopbridge.sku_index.cache.get',
+                       wraps=cache.get) as cache_get:
+                aggregate()
+            self.assertEqual(cache_get.call_count, 1)
@@ -8,13 +8,20 @@ from rest_framework.generics import (
 )
 from woocommerce import API
 from django.core.cache import cache
+from django.db.models import Count, DateTimeField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from dotenv import load_dotenv
 from urllib.parse import quote
 import os
+import base64
 import hashlib
 import json
 from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 from .models import (
@@ -22,8 +29,25 @@ from .models import (
     get_language_for_country,
     ShippingCountryConfig,
     ProductManual,
-    normalize_sku,
+    WooOrder,
+    WooOrderLineItem,
 )
+from .cache_utils import (
+    STALE_TIMEOUT,
+    get_or_revalidate,
+    make_entry,
+    single_flight,
+    store,
+)
+from .order_sync import (
+    ALL_STATUSES,
+    ORDER_SYNC_LOCK_KEY,
+    STATUS_GROUPS,
+    get_last_sync,
+    save_orders,
+    sync_orders,
+)
+from .sku_index import SkuIndex, get_sku_index, get_sku_index_version
 from .serializers import (
     EmailTemplateSerializer,
     EmailTemplateRenderSerializer,
@@ -38,8 +62,22 @@ _SHOPBRIDGE_ENV_PATH = Path(__file__).parent / ".env"  # shopbridge/.env
 
 # Cache settings
 CACHE_TIMEOUT_ORDERS = 60 * 5  # 5 Minuten für Bestellübersicht
-CACHE_TIMEOUT_ORDER_DETAIL = 60 * 2  # 2 Minuten für Einzelbestellung
+# Vorberechnete Übersicht – überdauert ein Scheduler-Intervall
+CACHE_TIMEOUT_ORDERS_SUMMARY = 60 * 15
 CACHE_KEY_PREFIX = "woocommerce_"
+ORDER_STATS_STALE_KEY = f"{CACHE_KEY_PREFIX}order_stats_last"
+# Bumped by patch_order_in_caches - filtered summaries are not patched
+ORDERS_REVISION_KEY = f"{CACHE_KEY_PREFIX}orders_revision"
+
+# Sales statistics window (days, including today)
+SALES_STATS_DAYS = 30
+
+# Cursor pagination of the orders overview
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 200
+ORDERS_ORDERINGS = ("-date_created", "date_created", "-total", "total")
+# Sort value for orders without creation date (sorted as oldest)
+_NO_DATE = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
 
 def get_env_var(name: str) -> str:
@@ -112,21 +150,12 @@ def get_cache_version():
 
 def get_product_sku_mapping():
     """
-    Build a mapping from WooCommerce SKU patterns to Prodflux product IDs.
+    Mapping from WooCommerce SKU patterns to Prodflux product IDs.
     Returns dict: {sku_pattern: (product_id, product_name)}
-    """
-    from products.models import Product
-
-    # Build mapping from database artikelnummer
-    mapping = {}
-    for product in Product.objects.all():
-        art = product.artikelnummer
-        mapping[art] = (product.id, product.bezeichnung)
-        # Also add with SD- prefix if not present
-        if not art.startswith("SD-"):
-            mapping[f"SD-{art}"] = (product.id, product.bezeichnung)
 
-    return mapping
+    Served from the process-wide SKU index (see shopbridge/sku_index.py).
+    """
+    return get_sku_index().mapping
 
 
 def get_product_stocks(product_ids: list) -> dict:
@@ -160,98 +189,55 @@ def get_product_stocks(product_ids: list) -> dict:
     return result
 
 
-def map_woocommerce_to_prodflux(wc_sku, wc_name, sku_mapping):
+def map_woocommerce_to_prodflux(wc_sku, wc_name, sku_mapping=None,
+                                sku_index=None):
     """
     Map a WooCommerce product to a Prodflux product.
     Returns: (product_id, product_name, matched_by)
+
+    Without ``sku_mapping`` or ``sku_index`` the memoized process-wide SKU
+    index is used. Loops over many line items should resolve it once with
+    get_sku_index() and pass it as ``sku_index`` - every lookup checks the
+    index version in the shared cache.
     """
     if not wc_sku:
         return (None, wc_name, None)
 
-    # Try exact match first
-    if wc_sku in sku_mapping:
-        prod_id, prod_name = sku_mapping[wc_sku]
-        return (prod_id, prod_name, 'exact')
-
-    # Try normalized SKU
-    normalized = normalize_sku(wc_sku)
-    if normalized and normalized in sku_mapping:
-        prod_id, prod_name = sku_mapping[normalized]
-        return (prod_id, prod_name, 'normalized')
+    if sku_index is not None:
+        index = sku_index
+    elif sku_mapping is None:
+        index = get_sku_index()
+    else:
+        index = SkuIndex(sku_mapping, version=None)
 
-    # Try without SD- prefix
-    if normalized and normalized.startswith('Einrichtungsanleitungen'):
-        without_prefix = normalized[3:]
-        if without_prefix in sku_mapping:
-            prod_id, prod_name = sku_mapping[without_prefix]
-            return (prod_id, prod_name, 'no-prefix')
+    match = index.resolve(wc_sku)
+    if match:
+        return match
 
     # No match found
     return (None, wc_name, None)
 
 
-def fetch_woocommerce_orders(statuses: list) -> tuple:
-    """
-    Fetch orders from WooCommerce API with caching and pagination.
-    Returns (orders_list, error_response) - error_response is None if success.
+def fetch_woocommerce_order_detail(order_id: int, refresh: bool = False,
+                                   compact: bool = False) -> tuple:
     """
-    cache_version = get_cache_version()
-    cache_key = get_cache_key(f"orders_v{cache_version}", statuses)
-
-    # Try to get from cache
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return (cached_data, None)
+    Get a single order from the local mirror, falling back to the API.
 
-    # Fetch from WooCommerce API with pagination
-    wcapi = get_wcapi()
-    all_orders = []
+    The sync only stores a compact projection (see order_sync.project_order),
+    so by default the full order is fetched once and then served from the
+    mirror. With ``compact=True`` the projection is enough - for callers
+    that only need line items, SKUs and the shipping country.
 
-    for status in statuses:
-        page = 1
-        per_page = 100  # Maximum allowed by WooCommerce API
-        
-        while True:
-            params = {"status": status, "per_page": per_page, "page": page}
-            response = wcapi.get("orders", params=params)
-            
-            if response.status_code != 200:
-                error = {
-                    "detail": f"Fehler bei Status '{status}' (Seite {page}).",
-                    "status_code": response.status_code,
-                    "response": response.text
-                }
-                return (None, error)
-            
-            orders_page = response.json()
-            all_orders.extend(orders_page)
-            
-            # Check if there are more pages
-            # WooCommerce returns X-WP-TotalPages header
-            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-            
-            if page >= total_pages:
-                break
-            
-            page += 1
-
-    # Store in cache
-    cache.set(cache_key, all_orders, CACHE_TIMEOUT_ORDERS)
-
-    return (all_orders, None)
-
-
-def fetch_woocommerce_order_detail(order_id: int) -> tuple:
-    """
-    Fetch single order from WooCommerce API with caching.
+    Orders fetched from the API are saved to the mirror.
     Returns (order_data, error_response) - error_response is None if success.
     """
-    cache_key = get_cache_key("order_detail", order_id)
-
-    # Try to get from cache
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return (cached_data, None)
+    if not refresh:
+        mirrored = WooOrder.objects.filter(id=order_id)
+        if not compact:
+            mirrored = mirrored.filter(has_details=True)
+        order_data = mirrored.values_list('data', flat=True).first()
+        if order_data is not None:
+            return (order_data, None)
 
     # Fetch from WooCommerce API
     wcapi = get_wcapi()
@@ -266,145 +252,779 @@ def fetch_woocommerce_order_detail(order_id: int) -> tuple:
         return (None, error)
 
     order_data = response.json()
-
-    # Store in cache
-    cache.set(cache_key, order_data, CACHE_TIMEOUT_ORDER_DETAIL)
+    save_orders([order_data], details=True)
 
     return (order_data, None)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def woocommerce_orders_view(request):
-    requested_status = request.query_params.get("status")
-    force_refresh = request.query_params.get("refresh") == "true"
-
+def resolve_order_statuses(requested_status):
+    """Map the ``status`` query parameter to a list of order statuses."""
     # Status groups for progressive loading
-    ACTIVE_STATUSES = ["processing", "pending", "on-hold"]
-    COMPLETED_STATUSES = ["completed"]
-    OTHER_STATUSES = ["cancelled", "refunded", "failed", "checkout-draft", "trash"]
+    ACTIVE_STATUSES = STATUS_GROUPS["active"]
+    COMPLETED_STATUSES = STATUS_GROUPS["completed"]
+    OTHER_STATUSES = STATUS_GROUPS["other"]
 
-    # Determine which statuses to fetch
     if requested_status == "all":
-        statuses = ACTIVE_STATUSES + COMPLETED_STATUSES + OTHER_STATUSES
+        return ACTIVE_STATUSES + COMPLETED_STATUSES + OTHER_STATUSES
     elif requested_status == "active":
-        statuses = ACTIVE_STATUSES
+        return ACTIVE_STATUSES
     elif requested_status == "completed":
-        statuses = COMPLETED_STATUSES
+        return COMPLETED_STATUSES
     elif requested_status == "other":
-        statuses = OTHER_STATUSES
+        return OTHER_STATUSES
     elif requested_status:
-        statuses = [requested_status]
-    else:
-        statuses = ACTIVE_STATUSES
+        return [requested_status]
+    return ACTIVE_STATUSES
+
+
+def get_orders_summary_cache_key(statuses: list, cache_version=None,
+                                 filters=None, summary_only=False) -> str:
+    if cache_version is None:
+        cache_version = get_cache_version()
+    # Product changes re-map SKUs, so they invalidate summaries as well
+    prefix = f"orders_summary_v{cache_version}_sku{get_sku_index_version()}"
+    if filters:
+        # Only the unfiltered summaries are patched on order updates
+        prefix += f"_r{cache.get(ORDERS_REVISION_KEY, 0)}"
+    return get_cache_key(prefix, statuses, filters or {}, summary_only)
+
+
+def get_orders_summary_stale_key(statuses: list, filters=None,
+                                 summary_only=False) -> str:
+    """Unversioned key of the last good summary (stale-while-revalidate)."""
+    return get_cache_key(
+        "orders_summary_last", statuses, filters or {}, summary_only
+    )
 
-    # Invalidate cache if refresh is requested
-    if force_refresh:
-        invalidate_orders_cache()
 
-    # Fetch orders (from cache or API)
-    all_orders, error = fetch_woocommerce_orders(statuses)
-    if error:
-        return Response(error, status=error["status_code"])
+def parse_orders_filters(query_params) -> tuple:
+    """
+    Read the date range and country filters of the orders overview.
 
-    # Build SKU mapping from Prodflux products
-    sku_mapping = get_product_sku_mapping()
+    ``date_from``/``date_to`` are inclusive days (YYYY-MM-DD) on the order
+    creation date, ``country`` is a comma-separated list of billing
+    countries. Returns (filters, error) - error is None if valid.
+    """
+    filters = {}
+    for param in ("date_from", "date_to"):
+        value = query_params.get(param)
+        if not value:
+            continue
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            return (None, f"{param} muss das Format YYYY-MM-DD haben.")
+        filters[param] = parsed.isoformat()
+
+    countries = [
+        country.strip().upper()
+        for country in query_params.get("country", "").split(",")
+        if country.strip()
+    ]
+    if countries:
+        filters["countries"] = sorted(set(countries))
 
-    products_summary = defaultdict(lambda: {
-        "total_quantity": 0,
-        "orders": [],
-        "prodflux_id": None,
-        "prodflux_name": None
-    })
-    adapter_counter = defaultdict(int)
-    total_adapter_count = 0
+    return (filters, None)
 
-    for order in all_orders:
-        # Extract customer info from billing
-        billing = order.get("billing", {})
-        first = billing.get('first_name', '')
-        last = billing.get('last_name', '')
-        customer_name = f"{first} {last}".strip()
-        customer_country = billing.get("country", "")
-        customer_city = billing.get("city", "")
-
-        for item in order["line_items"]:
-            wc_name = item["name"]
-            wc_sku = item.get("sku", "")
-            quantity = item["quantity"]
-
-            # Map to Prodflux product
-            prod_id, prod_name, match_type = map_woocommerce_to_prodflux(
-                wc_sku, wc_name, sku_mapping
-            )
 
-            # Use Prodflux name as key if matched, otherwise WooCommerce name
-            product_key = prod_name if prod_id else wc_name
+def _day_start(value: str):
+    return timezone.make_aware(datetime.combine(parse_date(value), time.min))
+
+
+def get_orders_lookups(statuses: list, filters=None, prefix="") -> dict:
+    """Filter kwargs for WooOrder (or, with ``prefix="order__"``, line items)."""
+    filters = filters or {}
+    lookups = {f"{prefix}status__in": statuses}
+    if filters.get("date_from"):
+        lookups[f"{prefix}date_created__gte"] = _day_start(filters["date_from"])
+    if filters.get("date_to"):
+        lookups[f"{prefix}date_created__lt"] = (
+            _day_start(filters["date_to"]) + timedelta(days=1)
+        )
+    if filters.get("countries"):
+        lookups[f"{prefix}billing_country__in"] = filters["countries"]
+    return lookups
+
+
+# Columns of one summary row (a line item with its order)
+SUMMARY_ROW_FIELDS = (
+    'order_id', 'order__status', 'order__total', 'order__currency',
+    'order__customer_name', 'order__billing_country', 'order__billing_city',
+    'order__date_created', 'name', 'sku', 'quantity'
+)
+
+
+def get_summary_rows(**lookups):
+    """Line items with their order data, newest orders first."""
+    return WooOrderLineItem.objects.filter(**lookups).order_by(
+        '-order__date_created', '-order_id', 'id'
+    ).values_list(*SUMMARY_ROW_FIELDS)
+
+
+def apply_summary_rows(summary: dict, rows, summary_only=False,
+                       remove=False) -> set:
+    """
+    Add (or with ``remove`` subtract) summary rows to an orders summary.
+
+    Used to build summaries and to patch a single order into cached ones.
+    Products without remaining quantity are dropped when removing.
+
+    Returns:
+        set: Keys of the touched products
+    """
+    sign = -1 if remove else 1
+    products_summary = summary["products"]
+    adapter_count = summary["adapter_count"]
+    touched = set()
+    sku_index = get_sku_index()
+
+    for (order_id, order_status, total, currency, customer_name,
+         customer_country, customer_city, date_created,
+         wc_name, wc_sku, quantity) in rows:
+        # Map to Prodflux product
+        prod_id, prod_name, match_type = map_woocommerce_to_prodflux(
+            wc_sku, wc_name, sku_index=sku_index
+        )
 
-            # Update product summary with customer info
-            products_summary[product_key]["total_quantity"] += quantity
-            products_summary[product_key]["prodflux_id"] = prod_id
-            products_summary[product_key]["prodflux_name"] = prod_name
-            products_summary[product_key]["orders"].append({
-                "order_id": order["id"],
-                "status": order["status"],
+        # Use Prodflux name as key if matched, otherwise WooCommerce name
+        product_key = prod_name if prod_id else wc_name
+
+        info = products_summary.get(product_key)
+        if info is None:
+            if remove:
+                continue
+            info = products_summary[product_key] = {"total_quantity": 0}
+            if not summary_only:
+                info["orders"] = []
+            info["prodflux_id"] = prod_id
+            info["prodflux_name"] = prod_name
+        touched.add(product_key)
+
+        # Update product summary with customer info
+        info["total_quantity"] += sign * quantity
+        if remove and not summary_only:
+            info["orders"] = [
+                o for o in info["orders"] if o["order_id"] != order_id
+            ]
+        elif not summary_only:
+            info["orders"].append({
+                "order_id": order_id,
+                "status": order_status,
                 "quantity": quantity,
-                "total": order["total"],
-                "currency": order["currency"],
+                "total": str(total),
+                "currency": currency,
                 "customer_name": customer_name,
                 "customer_country": customer_country,
                 "customer_city": customer_city,
-                "date_created": order.get("date_created", ""),
+                "date_created": date_created.isoformat() if date_created else "",
                 "wc_product_name": wc_name,
                 "wc_sku": wc_sku,
                 "match_type": match_type
             })
 
-            # Update adapter counters
-            total_adapter_count += quantity
-            adapter_counter[product_key] += quantity
+        # Update adapter counters
+        adapter_count["total"] += sign * quantity
+        by_type = adapter_count["by_type"]
+        by_type[product_key] = by_type.get(product_key, 0) + sign * quantity
 
-    # Collect all prodflux_ids for stock lookup
-    prodflux_ids = [
-        info["prodflux_id"]
-        for info in products_summary.values()
-        if info["prodflux_id"] is not None
-    ]
+        if remove and info["total_quantity"] <= 0 and not info.get("orders"):
+            del products_summary[product_key]
+            by_type.pop(product_key, None)
 
-    # Get stock information for all mapped products
-    product_stocks = get_product_stocks(prodflux_ids)
+    return touched
 
-    # Add stock info to each product summary
-    for product_key, info in products_summary.items():
-        pid = info.get("prodflux_id")
-        if pid and pid in product_stocks:
-            info["stocks"] = product_stocks[pid]
-        else:
-            info["stocks"] = {}
 
-    return Response({
-        "order_count": len(all_orders),
+def build_orders_summary(statuses: list, filters=None,
+                         summary_only=False) -> dict:
+    """
+    Aggregate the mirrored orders of ``statuses`` per Prodflux product.
+
+    With ``summary_only`` the products carry only their totals, without
+    the nested ``orders`` arrays - aggregated in the database, so the size
+    does not grow with the order history.
+
+    Stock figures are not included - they change independently of orders
+    and are overlaid per request (see woocommerce_orders_view).
+    """
+    order_count = WooOrder.objects.filter(
+        **get_orders_lookups(statuses, filters)
+    ).count()
+    item_lookups = get_orders_lookups(statuses, filters, prefix="order__")
+
+    if summary_only:
+        return build_orders_totals(item_lookups, order_count)
+
+    # Orders come from the local mirror (filled by the cache scheduler)
+    summary = {
+        "order_count": order_count,
+        "adapter_count": {"total": 0, "by_type": {}},
+        "products": {},
+    }
+    apply_summary_rows(summary, get_summary_rows(**item_lookups))
+    return summary
+
+
+def build_orders_totals(item_lookups: dict, order_count: int) -> dict:
+    """Per-product totals of the matching line items (summary-only mode)."""
+    rows = WooOrderLineItem.objects.filter(**item_lookups).values(
+        'sku', 'name'
+    ).annotate(quantity=Sum('quantity')).order_by('-quantity', 'sku', 'name')
+
+    products_summary = defaultdict(lambda: {
+        "total_quantity": 0,
+        "prodflux_id": None,
+        "prodflux_name": None
+    })
+    total_adapter_count = 0
+    sku_index = get_sku_index()
+
+    for row in rows:
+        prod_id, prod_name, _ = map_woocommerce_to_prodflux(
+            row["sku"], row["name"], sku_index=sku_index
+        )
+        product_key = prod_name if prod_id else row["name"]
+        products_summary[product_key]["total_quantity"] += row["quantity"]
+        products_summary[product_key]["prodflux_id"] = prod_id
+        products_summary[product_key]["prodflux_name"] = prod_name
+        total_adapter_count += row["quantity"]
+
+    return {
+        "order_count": order_count,
         "adapter_count": {
             "total": total_adapter_count,
-            "by_type": dict(adapter_counter)
+            "by_type": {
+                key: info["total_quantity"]
+                for key, info in products_summary.items()
+            }
         },
         "products": dict(products_summary),
-        "cached": not force_refresh
-    })
+    }
+
+
+def encode_orders_cursor(value, order_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([str(value), order_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_orders_cursor(cursor: str, field: str) -> tuple:
+    """Returns (sort_value, order_id); raises ValueError if invalid."""
+    try:
+        value, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if field == "date_created":
+            return (datetime.fromisoformat(value), int(order_id))
+        return (Decimal(value), int(order_id))
+    except (TypeError, ValueError, InvalidOperation) as e:
+        raise ValueError("Ungültiger Cursor.") from e
+
+
+def paginate_orders(statuses: list, filters=None,
+                    ordering="-date_created", cursor=None,
+                    limit=ORDERS_PAGE_SIZE) -> tuple:
+    """
+    One page of mirrored orders (keyset pagination).
+
+    The cursor encodes the sort value and id of the last returned order,
+    so every page costs the same regardless of its position.
+
+    Returns:
+        tuple: (orders, next_cursor) - next_cursor is None on the last page
+    """
+    field = ordering.lstrip("-")
+    descending = ordering.startswith("-")
+    sort_value = (
+        Coalesce(field, Value(_NO_DATE, output_field=DateTimeField()))
+        if field == "date_created" else F(field)
+    )
+    queryset = WooOrder.objects.filter(
+        **get_orders_lookups(statuses, filters)
+    ).annotate(sort_value=sort_value).defer('data')
+
+    if cursor:
+        value, last_id = decode_orders_cursor(cursor, field)
+        if descending:
+            queryset = queryset.filter(
+                Q(sort_value__lt=value) | Q(sort_value=value, id__lt=last_id)
+            )
+        else:
+            queryset = queryset.filter(
+                Q(sort_value__gt=value) | Q(sort_value=value, id__gt=last_id)
+            )
+
+    order_by = ("-sort_value", "-id") if descending else ("sort_value", "id")
+    page = list(
+        queryset.order_by(*order_by).prefetch_related('line_items')[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_orders_cursor(page[-1].sort_value, page[-1].id)
+
+    orders = []
+    sku_index = get_sku_index()
+    for order in page:
+        line_items = []
+        for item in order.line_items.all():
+            prod_id, prod_name, match_type = map_woocommerce_to_prodflux(
+                item.sku, item.name, sku_index=sku_index
+            )
+            line_items.append({
+                "wc_product_name": item.name,
+                "wc_sku": item.sku,
+                "quantity": item.quantity,
+                "prodflux_id": prod_id,
+                "prodflux_name": prod_name,
+                "match_type": match_type
+            })
+        orders.append({
+            "order_id": order.id,
+            "number": order.number,
+            "status": order.status,
+            "total": str(order.total),
+            "currency": order.currency,
+            "customer_name": order.customer_name,
+            "customer_country": order.billing_country,
+            "customer_city": order.billing_city,
+            "date_created": (
+                order.date_created.isoformat() if order.date_created else ""
+            ),
+            "line_items": line_items
+        })
+
+    return (orders, next_cursor)
+
+
+def get_order_stats_cache_key(cache_version=None) -> str:
+    if cache_version is None:
+        cache_version = get_cache_version()
+    return f"{CACHE_KEY_PREFIX}order_stats_v{cache_version}"
+
+
+def build_order_stats(days: int = SALES_STATS_DAYS) -> dict:
+    """
+    Order statistics from the local mirror.
+
+    Counts per status come from one grouped query. Sales (active and
+    completed orders) of the last ``days`` days are added per day and per
+    Prodflux product.
+    """
+    by_status = {status: 0 for status in ALL_STATUSES}
+    for row in WooOrder.objects.order_by().values('status').annotate(
+        count=Count('id')
+    ):
+        by_status[row["status"]] = row["count"]
+
+    active = sum(by_status[status] for status in STATUS_GROUPS["active"])
+    completed = sum(
+        by_status[status] for status in STATUS_GROUPS["completed"]
+    )
+    total = sum(by_status.values())
+
+    sales_statuses = STATUS_GROUPS["active"] + STATUS_GROUPS["completed"]
+    since = timezone.localtime().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=days - 1)
+
+    by_day = [
+        {
+            "date": row["day"].isoformat(),
+            "orders": row["orders"],
+            # Same format on every backend (SQLite sums come back as '98')
+            "revenue": str(
+                Decimal(row["revenue"] or 0).quantize(Decimal("0.01"))
+            ),
+        }
+        for row in WooOrder.objects.filter(
+            status__in=sales_statuses, date_created__gte=since
+        ).annotate(day=TruncDate('date_created')).order_by('day').values(
+            'day'
+        ).annotate(orders=Count('id'), revenue=Sum('total'))
+    ]
+
+    by_product = {}
+    sku_index = get_sku_index()
+    for row in WooOrderLineItem.objects.filter(
+        order__status__in=sales_statuses, order__date_created__gte=since
+    ).order_by().values('sku', 'name').annotate(quantity=Sum('quantity')):
+        prod_id, prod_name, _ = map_woocommerce_to_prodflux(
+            row["sku"], row["name"], sku_index=sku_index
+        )
+        product_key = prod_name if prod_id else row["name"]
+        info = by_product.setdefault(product_key, {
+            "prodflux_id": prod_id, "quantity": 0
+        })
+        info["quantity"] += row["quantity"]
+
+    return {
+        "total": total,
+        "by_status": by_status,
+        "active": active,
+        "completed": completed,
+        "other": total - active - completed,
+        "sales": {
+            "days": days,
+            "since": since.date().isoformat(),
+            "by_day": by_day,
+            "by_product": dict(sorted(
+                by_product.items(), key=lambda item: -item[1]["quantity"]
+            )),
+        },
+    }
+
+
+def refresh_orders_summaries(cache_version=None) -> int:
+    """
+    Precompute the orders summary of every status group into the cache.
+
+    Called by the cache scheduler after each sync so that warm requests
+    only overlay live stock figures. Callers hold ORDER_SYNC_LOCK_KEY -
+    order updates patch the cached summaries under the same lock (see
+    save_updated_order).
+
+    Returns:
+        int: Number of cached summaries
+    """
+    groups = list(STATUS_GROUPS) + ["all"]
+    summaries = {}
+    last_good = {}
+    for group in groups:
+        statuses = resolve_order_statuses(group)
+        for summary_only in (False, True):
+            entry = make_entry(
+                build_orders_summary(statuses, summary_only=summary_only)
+            )
+            summaries[get_orders_summary_cache_key(
+                statuses, cache_version, summary_only=summary_only
+            )] = entry
+            last_good[get_orders_summary_stale_key(
+                statuses, summary_only=summary_only
+            )] = entry
+    cache.set_many(summaries, CACHE_TIMEOUT_ORDERS_SUMMARY)
+    cache.set_many(last_good, STALE_TIMEOUT)
+    return len(summaries)
+
+
+def get_order_cache_state(order_id: int) -> tuple:
+    """
+    Mirrored status and summary rows of one order, taken before an update
+    so that its old contribution can be removed from cached summaries.
+
+    Returns:
+        tuple: (status or None if not mirrored, rows)
+    """
+    status = WooOrder.objects.filter(id=order_id).values_list(
+        'status', flat=True
+    ).first()
+    if status is None:
+        return (None, [])
+    return (status, list(get_summary_rows(order_id=order_id)))
+
+
+def remove_order_from_summary(summary: dict, order_id: int) -> dict:
+    """
+    Drop an order's nested entries from a full (not summary-only) summary.
+
+    Returns:
+        dict: {product_key: quantity} of the removed entries - empty if the
+        summary did not list the order
+    """
+    quantities = {}
+    for product_key, info in summary["products"].items():
+        kept = []
+        for o in info["orders"]:
+            if o["order_id"] == order_id:
+                quantities[product_key] = (
+                    quantities.get(product_key, 0) + o["quantity"]
+                )
+            else:
+                kept.append(o)
+        info["orders"] = kept
+    return quantities
+
+
+def subtract_summary_quantities(summary: dict, quantities: dict):
+    """Subtract per-product quantities, dropping emptied products."""
+    products_summary = summary["products"]
+    adapter_count = summary["adapter_count"]
+    by_type = adapter_count["by_type"]
+
+    for product_key, quantity in quantities.items():
+        info = products_summary.get(product_key)
+        if info is None:
+            continue
+        info["total_quantity"] -= quantity
+        adapter_count["total"] -= quantity
+        by_type[product_key] = by_type.get(product_key, 0) - quantity
+        if info["total_quantity"] <= 0 and not info.get("orders"):
+            del products_summary[product_key]
+            by_type.pop(product_key, None)
+
+
+def patch_order_in_caches(order_id: int, previous_status, previous_rows):
+    """
+    Patch one updated order into the cached summaries and stats.
+
+    Instead of invalidating every cached summary (invalidate_orders_cache),
+    the order's old rows are removed from the summaries of its previous
+    status group and its new rows are added to those of its current one -
+    a status change moves the order between groups. Summaries that are not
+    cached stay untouched; filtered summaries are invalidated via the
+    orders revision.
+
+    The order is only removed (and ``order_count`` decremented) if it is
+    actually in the summary. Summary-only summaries do not list their
+    orders and follow the full summary of the same group.
+
+    Callers hold ORDER_SYNC_LOCK_KEY (see save_updated_order).
+    """
+    status = WooOrder.objects.filter(id=order_id).values_list(
+        'status', flat=True
+    ).first()
+    rows = list(get_summary_rows(order_id=order_id))
+    cache_version = get_cache_version()
+
+    for group in list(STATUS_GROUPS) + ["all"]:
+        statuses = resolve_order_statuses(group)
+        was_included = previous_status in statuses
+        is_included = status in statuses
+        if not was_included and not is_included:
+            continue
+
+        # Whether (and with which quantities) the group's summaries contain
+        # the order - taken from the full summary, which lists its orders.
+        # Orders without line items are not listed; they count if their old
+        # status belonged here.
+        present = None
+        listed = {}
+        for summary_only in (False, True):
+            key = get_orders_summary_cache_key(
+                statuses, cache_version, summary_only=summary_only
+            )
+            entry = cache.get(key)
+            if entry is None:
+                continue
+            summary = entry["value"]
+
+            if not summary_only:
+                listed = remove_order_from_summary(summary, order_id)
+                present = bool(listed) or (was_included and not previous_rows)
+                subtract_summary_quantities(summary, listed)
+            elif present is not None:
+                subtract_summary_quantities(summary, listed)
+            else:
+                # Full summary not cached - fall back to the old rows
+                present = was_included
+                if present:
+                    apply_summary_rows(
+                        summary, previous_rows, summary_only, remove=True
+                    )
+            if present:
+                summary["order_count"] -= 1
+            if is_included:
+                touched = apply_summary_rows(summary, rows, summary_only)
+                summary["order_count"] += 1
+                if not summary_only:
+                    # Keep nested orders newest first
+                    for product_key in touched:
+                        summary["products"][product_key]["orders"].sort(
+                            key=lambda o: (
+                                o["date_created"], o["order_id"]
+                            ),
+                            reverse=True
+                        )
+
+            store(
+                key,
+                get_orders_summary_stale_key(
+                    statuses, summary_only=summary_only
+                ),
+                summary,
+                CACHE_TIMEOUT_ORDERS_SUMMARY
+            )
+
+    # Stats come from the mirror - recomputing them is cheap
+    stats_key = get_order_stats_cache_key(cache_version)
+    if cache.get(stats_key) is not None:
+        store(
+            stats_key, ORDER_STATS_STALE_KEY, build_order_stats(),
+            CACHE_TIMEOUT_ORDERS
+        )
+
+    if not cache.add(ORDERS_REVISION_KEY, 1, None):
+        cache.incr(ORDERS_REVISION_KEY)
+
+
+def save_updated_order(order_id: int, order: dict):
+    """
+    Save an order returned by the WooCommerce API to the mirror and patch
+    it into the cached summaries.
+
+    Holds ORDER_SYNC_LOCK_KEY like the sync and refresh_orders_summaries,
+    so the order's previous state, the mirror update and the patch cannot
+    interleave with a rebuild of the summaries. While a sync is running
+    the cached summaries are invalidated instead.
+    """
+    with single_flight(ORDER_SYNC_LOCK_KEY) as acquired:
+        if not acquired:
+            save_orders([order], details=True)
+            invalidate_orders_cache()
+            return
+
+        previous_status, previous_rows = get_order_cache_state(order_id)
+        save_orders([order], details=True)
+        patch_order_in_caches(order_id, previous_status, previous_rows)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def woocommerce_order_detail_view(request, order_id):
-    force_refresh = request.query_params.get("refresh") == "true"
+def woocommerce_orders_view(request):
+    """
+    Orders overview per Prodflux product.
+
+    Query parameters:
+        status: Status or status group (active, completed, other, all)
+        date_from, date_to: Inclusive creation date range (YYYY-MM-DD)
+        country: Comma-separated billing countries
+        summary_only=true: Per-product totals without nested orders
+        limit, cursor: Paginated order list in ``orders`` (implies
+            summary_only); ``next_cursor`` points to the next page
+        ordering: -date_created (default), date_created, -total, total
+        refresh=true: Sync changed orders from WooCommerce first (skipped
+            while another sync is running)
+
+    A summary invalidated or expired in the cache is served from the last
+    good copy with ``stale: true`` while it is rebuilt in the background;
+    ``age`` is the summary's age in seconds.
+    """
+    params = request.query_params
+    requested_status = params.get("status")
+    force_refresh = params.get("refresh") == "true"
 
-    # Invalidate specific order cache if refresh requested
+    # Determine which statuses to show
+    statuses = resolve_order_statuses(requested_status)
+
+    filters, error = parse_orders_filters(params)
+    if error:
+        return Response(
+            {"detail": error}, status=http_status.HTTP_400_BAD_REQUEST
+        )
+
+    paginated = "limit" in params or "cursor" in params
+    summary_only = paginated or params.get("summary_only") == "true"
+    ordering = params.get("ordering", "-date_created")
+    if ordering not in ORDERS_ORDERINGS:
+        return Response(
+            {"detail": f"ordering muss einer von {', '.join(ORDERS_ORDERINGS)} sein."},
+            status=http_status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = int(params.get("limit", ORDERS_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= ORDERS_MAX_PAGE_SIZE:
+        return Response(
+            {"detail": f"limit muss zwischen 1 und {ORDERS_MAX_PAGE_SIZE} liegen."},
+            status=http_status.HTTP_400_BAD_REQUEST
+        )
+
+    # Sync changed orders into the mirror if refresh is requested - at
+    # most one sync at a time, concurrent refreshes get the current data
+    synced = False
     if force_refresh:
-        cache_key = get_cache_key("order_detail", order_id)
-        cache.delete(cache_key)
+        with single_flight(ORDER_SYNC_LOCK_KEY) as acquired:
+            if acquired:
+                try:
+                    sync_orders(get_wcapi())
+                except RuntimeError as e:
+                    return Response(
+                        {"detail": str(e)},
+                        status=http_status.HTTP_502_BAD_GATEWAY
+                    )
+                synced = True
+        if synced:
+            invalidate_orders_cache()
+
+    summary_key = get_orders_summary_cache_key(
+        statuses, filters=filters, summary_only=summary_only
+    )
+    summary_stale_key = get_orders_summary_stale_key(
+        statuses, filters=filters, summary_only=summary_only
+    )
+
+    def build():
+        return build_orders_summary(
+            statuses, filters=filters, summary_only=summary_only
+        )
 
-    # Fetch order (from cache or API)
-    order_data, error = fetch_woocommerce_order_detail(order_id)
+    if synced:
+        # Explicit refresh: answer with the just-synced data, not the
+        # last good copy
+        summary = store(
+            summary_key, summary_stale_key, build(),
+            CACHE_TIMEOUT_ORDERS_SUMMARY
+        )["value"]
+        stale, age = False, 0
+    else:
+        # Precomputed summary (by the scheduler), last good copy or build
+        summary, stale, age = get_or_revalidate(
+            summary_key, summary_stale_key, build,
+            CACHE_TIMEOUT_ORDERS_SUMMARY
+        )
+
+    # Overlay live stock information for all mapped products
+    product_stocks = get_product_stocks([
+        info["prodflux_id"]
+        for info in summary["products"].values()
+        if info["prodflux_id"] is not None
+    ])
+    products = {
+        product_key: {
+            **info,
+            "stocks": product_stocks.get(info["prodflux_id"], {})
+        }
+        for product_key, info in summary["products"].items()
+    }
+
+    last_sync = get_last_sync()
+
+    data = {
+        "order_count": summary["order_count"],
+        "adapter_count": summary["adapter_count"],
+        "products": products,
+        "cached": not synced,
+        "stale": stale,
+        "age": age,
+        "last_sync": last_sync.isoformat() if last_sync else None
+    }
+
+    if paginated:
+        try:
+            orders, next_cursor = paginate_orders(
+                statuses, filters, ordering, params.get("cursor"), limit
+            )
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)}, status=http_status.HTTP_400_BAD_REQUEST
+            )
+        data["orders"] = orders
+        data["next_cursor"] = next_cursor
+
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def woocommerce_order_detail_view(request, order_id):
+    force_refresh = request.query_params.get("refresh") == "true"
+
+    # Fetch order (from mirror or API)
+    order_data, error = fetch_woocommerce_order_detail(
+        order_id, refresh=force_refresh
+    )
     if error:
         return Response(error, status=error["status_code"])
 
@@ -494,12 +1114,10 @@ def woocommerce_order_update_view(request, order_id):
                 status=http_status.HTTP_502_BAD_GATEWAY
             )
         
-        # Invalidate caches
-        cache_key = get_cache_key("order_detail", order_id)
-        cache.delete(cache_key)
-        invalidate_orders_cache()
-        
         updated_order = response.json()
+
+        # Update mirror and patch the order into the cached summaries
+        save_updated_order(order_id, updated_order)
         
         return Response({
             "success": True,
@@ -565,12 +1183,10 @@ def woocommerce_order_update_status_view(request, order_id):
                 status=http_status.HTTP_502_BAD_GATEWAY
             )
         
-        # Invalidate caches
-        cache_key = get_cache_key("order_detail", order_id)
-        cache.delete(cache_key)
-        invalidate_orders_cache()
-        
         updated_order = response.json()
+
+        # Update mirror and patch the order into the cached summaries
+        save_updated_order(order_id, updated_order)
         
         return Response({
             "success": True,
@@ -617,11 +1233,13 @@ def woocommerce_cache_status_view(request):
     cache_version = get_cache_version()
 
     # Check if we have cached data
-    cache_key = f"{CACHE_KEY_PREFIX}order_stats_v{cache_version}"
-    has_cached_stats = cache.get(cache_key) is not None
+    has_cached_stats = cache.get(
+        get_order_stats_cache_key(cache_version)
+    ) is not None
 
     return Response({
         "scheduler_running": scheduler._running,
+        "scheduler_leader": scheduler.is_leader,
         "cache_version": cache_version,
         "has_cached_data": has_cached_stats,
     })
@@ -631,52 +1249,20 @@ def woocommerce_cache_status_view(request):
 @permission_classes([IsAuthenticated])
 def woocommerce_orders_stats_view(request):
     """
-    Get order statistics (counts per status) quickly.
-    Uses WooCommerce reports API or cached counts.
-    """
-    cache_key = f"{CACHE_KEY_PREFIX}order_stats_v{get_cache_version()}"
-
-    # Try cache first
-    cached_stats = cache.get(cache_key)
-    if cached_stats is not None:
-        return Response(cached_stats)
-
-    wcapi = get_wcapi()
-
-    # Get order counts per status (all WooCommerce statuses)
-    statuses = [
-        "processing", "pending", "on-hold",
-        "completed", "cancelled", "refunded", "failed",
-        "checkout-draft", "trash"
-    ]
+    Get order statistics (counts per status, sales per day and product).
 
-    stats = {
-        "total": 0,
-        "by_status": {},
-        "active": 0,
-        "completed": 0,
-        "other": 0
-    }
-
-    for status in statuses:
-        # Use per_page=1 and read total from headers - much faster!
-        response = wcapi.get("orders", params={"status": status, "per_page": 1})
-        if response.status_code == 200:
-            count = int(response.headers.get('X-WP-Total', 0))
-            stats["by_status"][status] = count
-            stats["total"] += count
-
-            if status in ["processing", "pending", "on-hold"]:
-                stats["active"] += count
-            elif status == "completed":
-                stats["completed"] += count
-            else:
-                stats["other"] += count
-
-    # Cache for 5 minutes
-    cache.set(cache_key, stats, CACHE_TIMEOUT_ORDERS)
+    Computed from the local order mirror (see build_order_stats) and served
+    from the cache; after an invalidation the last good stats are returned
+    with ``stale: true`` while they are refreshed in the background.
+    """
+    stats, stale, age = get_or_revalidate(
+        get_order_stats_cache_key(),
+        ORDER_STATS_STALE_KEY,
+        build_order_stats,
+        CACHE_TIMEOUT_ORDERS
+    )
 
-    return Response(stats)
+    return Response({**stats, "stale": stale, "age": age})
 
 
 # =============================================================================
@@ -1149,8 +1735,8 @@ def product_manuals_for_order(request, order_id):
     Ermittelt basierend auf den Produkten in der Bestellung und dem
     Zielland die passenden Anleitungen.
     """
-    # WooCommerce Order laden
-    order_data, error = fetch_woocommerce_order_detail(order_id)
+    # WooCommerce Order laden (Line Items und Zielland reichen - kompakt)
+    order_data, error = fetch_woocommerce_order_detail(order_id, compact=True)
     if error:
         return Response(
             {'error': 'Bestellung nicht gefunden'},